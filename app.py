@@ -1,23 +1,31 @@
 import os
-import io
-import torch
-import torch.nn as nn
-from torchvision import models
-import torchvision.transforms as T
-from PIL import Image
-import numpy as np
+import base64
 from flask import Flask, request, jsonify, Response, stream_with_context, send_from_directory, render_template_string
 from flask_cors import CORS
 import tempfile
-import cv2
+import threading
 import json
 from datetime import datetime
 import sqlite3
 import sys
 import shutil
 import time
+import queue
+from engine import DEFAULT_CLASSES, INFERENCE_BACKEND, SHARE_MODEL_MEMORY, load_backend, MicroBatchScheduler
+from video_io import iter_sampled_frames, iter_parallel_frames, VIDEO_DECODE_WORKERS, PARALLEL_MIN_SECONDS
+from result_cache import ResultCache, file_sha256
+from video_sessions import VideoSessionStore
+from stream_pipeline import StreamPipeline, NoMovementDetector, frame_event, alert_event
+from ward_monitor import WardMonitor
+from uploads import UploadRequest, upload_path, detach_upload, upload_sha256, cleanup_uploads
+from events import EventLog, SINCE_QUERY as EVENTS_SINCE_QUERY, PRUNE_QUERY as EVENTS_PRUNE_QUERY
+from db import ConnectionPool, query_plan, full_scans
+from write_behind import WriteBehindQueue, DuplicateRowError
+from presence import PresenceTracker, HEARTBEAT_QUERY, ONLINE_QUERY, EXPIRE_QUERY
 
 app = Flask(__name__)
+app.request_class = UploadRequest
+app.teardown_request(cleanup_uploads)
 CORS(app)  # Enable CORS for all routes
 
 # Persistence configuration
@@ -58,10 +66,33 @@ def index():
 def serve_static(path):
     return send_from_directory('.', path)
 
+# One WAL-mode connection per thread, reused across requests (see db.py)
+db_pool = ConnectionPool()
+
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return db_pool.connect(DB_PATH)
+
+INDEXES = {
+    # /api/alerts?status=... ORDER BY timestamp
+    'idx_alerts_status_timestamp': 'CREATE INDEX IF NOT EXISTS idx_alerts_status_timestamp ON alerts (status, timestamp)',
+    # /api/alerts ORDER BY timestamp
+    'idx_alerts_timestamp': 'CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts (timestamp)',
+    # /api/alerts?patient_id=...
+    'idx_alerts_patient': 'CREATE INDEX IF NOT EXISTS idx_alerts_patient ON alerts (patient_id, timestamp)',
+    # /api/history ORDER BY timestamp (patients are joined on their primary key)
+    'idx_analysis_history_timestamp': 'CREATE INDEX IF NOT EXISTS idx_analysis_history_timestamp ON analysis_history (timestamp)',
+    'idx_analysis_history_patient': 'CREATE INDEX IF NOT EXISTS idx_analysis_history_patient ON analysis_history (patient_id, timestamp)',
+    # Conversations: either direction of a sender/recipient pair, in id order
+    'idx_messages_pair': 'CREATE INDEX IF NOT EXISTS idx_messages_pair ON messages (sender_username, recipient_username, id)',
+    # Messages received by a user, newest per sender (/api/chat/users)
+    'idx_messages_recipient': 'CREATE INDEX IF NOT EXISTS idx_messages_recipient ON messages (recipient_username, sender_username, id)',
+    # Unread counts and marking as read; only unread messages are indexed
+    'idx_messages_unread': 'CREATE INDEX IF NOT EXISTS idx_messages_unread ON messages (recipient_username, sender_username) WHERE is_read = 0',
+    # Event pruning by age
+    'idx_events_created_at': 'CREATE INDEX IF NOT EXISTS idx_events_created_at ON events (created_at)',
+    'idx_duty_broadcasts_timestamp': 'CREATE INDEX IF NOT EXISTS idx_duty_broadcasts_timestamp '
+                                     'ON duty_broadcasts (timestamp)',
+}
 
 def init_db():
     conn = get_db_connection()
@@ -91,6 +122,17 @@ def init_db():
         type TEXT DEFAULT 'text',
         media_url TEXT
     )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS ward_beds (
+        bed_id TEXT PRIMARY KEY, source TEXT, patient_id TEXT, patient_name TEXT, created_at TEXT
+    )''')
+    # Pushed to clients over /api/events; audience is a JSON list of usernames (NULL: everyone)
+    conn.execute('''CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT, data TEXT, audience TEXT, created_at TEXT
+    )''')
+    # The last DUTY_BROADCAST_CAPACITY duty broadcasts; AUTOINCREMENT never reuses a seq
+    conn.execute('''CREATE TABLE IF NOT EXISTS duty_broadcasts (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT, nurse_name TEXT, message TEXT, timestamp REAL
+    )''')
 
     # Migration: Add expanded fields to nurses if not exist
     cursor = conn.execute("PRAGMA table_info(nurses)")
@@ -175,6 +217,16 @@ def init_db():
         except Exception as e:
             print(f"Migration failed for messages: {e}")
 
+    # Migration: secondary indexes for the hot queries (checked by `python app.py explain-db`)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    for name, ddl in INDEXES.items():
+        if name not in existing:
+            print(f"⚠️ Migrating: Creating index {name}")
+            try:
+                conn.execute(ddl)
+            except Exception as e:
+                print(f"Migration failed for {name}: {e}")
+
     conn.commit()
     conn.close()
 
@@ -184,73 +236,92 @@ try:
 except Exception as e:
     print(f"Database initialization error: {e}")
 
-# Load your model
-def load_checkpoint(weights_path):
-    try:
-        ckpt = torch.load(weights_path, map_location="cpu")
-        classes = ckpt.get("classes", ['supine', 'left', 'right'])
-        img_size = int(ckpt.get("img_size", 224))
-        state_dict = ckpt["state_dict"]
-        return state_dict, classes, img_size
-    except Exception as e:
-        print(f"Error loading checkpoint: {e}")
-        # Return default values if model loading fails
-        return None, ['supine', 'left', 'right'], 224
-
-def build_model(num_classes):
-    model = models.resnet18(weights=None)
-    model.fc = nn.Linear(model.fc.in_features, num_classes)
-    model.eval()
-    return model
-
-def get_eval_transform(img_size):
-    return T.Compose([
-        T.Grayscale(num_output_channels=3),
-        T.Resize(256),
-        T.CenterCrop(img_size),
-        T.ToTensor(),
-        T.Normalize(mean=[0.485, 0.456, 0.406],
-                    std=[0.229, 0.224, 0.225]),
-    ])
-
-def predict_one(model, transform, img_data, class_names):
-    try:
-        if isinstance(img_data, str):
-            img = Image.open(img_data).convert("L")
-        else:
-            img = Image.open(io.BytesIO(img_data)).convert("L")
-        
-        x = transform(img).unsqueeze(0)
-        with torch.no_grad():
-            logits = model(x)
-            probs = torch.softmax(logits, dim=1).cpu().numpy()[0]
-        idx = int(np.argmax(probs))
-        return class_names[idx], float(probs[idx]), probs.tolist()
-    except Exception as e:
-        raise Exception(f"Prediction error: {str(e)}")
+# Changes pushed to connected clients (see events.py)
+event_log = EventLog(get_db_connection)
+
+# Alert and history rows are committed in batches by a writer thread (see write_behind.py)
+write_queue = WriteBehindQueue(get_db_connection)
+
+def alert_record(row):
+    """An alerts row shaped like the rows of GET /api/alerts"""
+    return {**row, 'patientId': row['patient_id'], 'patientName': row['patient_name']}
+
+def publish_alerts(rows):
+    """Push newly stored alerts, one transaction per committed batch"""
+    event_log.publish_many([('alert', alert_record(row), None) for row in rows])
+
+def queue_alert(alert_id, patient_id, patient_name, position, duration, alert_type, timestamp,
+                acknowledged_by, status, analysis_result):
+    write_queue.put('alerts', {
+        'id': alert_id, 'patient_id': patient_id, 'patient_name': patient_name, 'position': position,
+        'duration': duration, 'type': alert_type, 'timestamp': timestamp, 'acknowledged_by': acknowledged_by,
+        'status': status, 'analysis_result': analysis_result,
+    }, on_commit=publish_alerts, key='id')
+
+def publish_presence(username, is_online):
+    event_log.publish('presence', {'username': username, 'is_online': 1 if is_online else 0})
+
+# Heartbeats are kept in memory and written to nurses in batches (see presence.py)
+presence = PresenceTracker(get_db_connection, on_change=publish_presence)
+
+# Model, loaded by ensure_model() on first use so that CLI commands and workers serving
+# only REST routes never import torch (see gunicorn.conf.py for loading it before forking)
+WEIGHTS_PATH = "best_model.onnx" if INFERENCE_BACKEND == 'onnx' else "best_model.pth"
+backend = None
+model = None
+classes = list(DEFAULT_CLASSES)
+img_size = channels = None
+transform = None
+frame_preprocess = None
+result_cache = None
+_model_lock = threading.Lock()
+
+def ensure_model():
+    """Import the inference backend and load WEIGHTS_PATH, once per process"""
+    global backend, model, classes, img_size, channels, transform, frame_preprocess, result_cache
+    if backend is not None:
+        return
+    with _model_lock:
+        if backend is not None:
+            return
+        # Torch backends live in inference.py; the onnx backend (onnx_backend.py) never imports torch
+        loaded = load_backend(INFERENCE_BACKEND)
+        try:
+            if not os.path.exists(WEIGHTS_PATH):
+                raise FileNotFoundError(f"Model file {WEIGHTS_PATH} not found")
+            model, classes, img_size, channels = loaded.load_model(WEIGHTS_PATH)
+            transform = loaded.get_eval_transform(img_size, channels)
+            frame_preprocess = loaded.get_frame_preprocess(img_size, channels)
+            print(f"✅ Model loaded successfully with classes: {classes} ({channels}-channel input)")
+            if SHARE_MODEL_MEMORY:
+                shared = loaded.share_memory(model)
+                if shared:
+                    print(f"✅ Moved {shared / 2**20:.1f} MB of weights to shared memory")
+            # Cached analyses are only valid for the checkpoint (and backend) that produced them
+            result_cache = ResultCache(os.path.join(DATA_DIR, 'result_cache'),
+                                       f"{INFERENCE_BACKEND}:{file_sha256(WEIGHTS_PATH)}")
+        except Exception as e:
+            print(f"❌ Error loading model: {e}")
+            print("⚠️  Using fallback mode with default classes")
+            model = None
+        # Set last: other threads skip the lock once backend is set
+        backend = loaded
 
-# Initialize model
-try:
-    WEIGHTS_PATH = "best_model.pth"
-    if os.path.exists(WEIGHTS_PATH):
-        state_dict, classes, img_size = load_checkpoint(WEIGHTS_PATH)
-        if state_dict:
-            model = build_model(len(classes))
-            model.load_state_dict(state_dict)
-            model.eval()
-            transform = get_eval_transform(img_size)
-            print(f"✅ Model loaded successfully with classes: {classes}")
-        else:
-            raise Exception("State dict is None")
-    else:
-        raise FileNotFoundError(f"Model file {WEIGHTS_PATH} not found")
-        
-except Exception as e:
-    print(f"❌ Error loading model: {e}")
-    print("⚠️  Using fallback mode with default classes")
-    classes = ['supine', 'left', 'right']
-    model = None
-    transform = None
+# Uploaded videos kept for repeated interval queries
+video_sessions = VideoSessionStore(os.path.join(DATA_DIR, 'videos'))
+
+def require_model():
+    """ensure_model(), raising if the checkpoint could not be loaded"""
+    ensure_model()
+    if model is None:
+        raise RuntimeError('Model not loaded')
+
+# Live streams share one model through the micro-batching scheduler
+def predict_frames(frames):
+    require_model()
+    return backend.predict_all(model, frame_preprocess, frames, classes)
+
+scheduler = MicroBatchScheduler(predict_frames)
 
 def format_timestamp(seconds):
     """Convert seconds to MM:SS format"""
@@ -310,11 +381,12 @@ def predict():
         return jsonify({'error': 'No selected file'}), 400
         
     try:
+        ensure_model()
         if model is None:
-            return jsonify({'error': 'Model not loaded'}), 500
+            return jsonify({'error': 'Model not loaded'}), 503
             
         img_bytes = file.read()
-        prediction, confidence, probabilities = predict_one(model, transform, img_bytes, classes)
+        prediction, confidence, probabilities = backend.predict_one(model, transform, img_bytes, classes)
         
         # Create probability dict
         prob_dict = {classes[i]: float(probabilities[i]) for i in range(len(classes))}
@@ -330,6 +402,7 @@ def predict():
 
 @app.route('/predict_video', methods=['POST'])
 def predict_video():
+    import cv2
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
         
@@ -337,12 +410,13 @@ def predict_video():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
-    # Save temp file
-    temp_dir = tempfile.mkdtemp()
-    temp_path = os.path.join(temp_dir, file.filename)
-    file.save(temp_path)
+    # Uploads are spooled to disk while the body is parsed; analyze that file in place
+    temp_path = upload_path(file)
     
     try:
+        ensure_model()
+        if model is None:
+            return jsonify({'error': 'Model not loaded'}), 503
         cap = cv2.VideoCapture(temp_path)
         ret, frame = cap.read()
         cap.release()
@@ -350,22 +424,14 @@ def predict_video():
         if not ret:
             return jsonify({'error': 'Could not read video'}), 400
             
-        # Convert BGR to RGB then to PIL Image
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(frame_rgb).convert("L")
-        
         # Predict
-        x = transform(img).unsqueeze(0)
-        with torch.no_grad():
-            logits = model(x)
-            probs = torch.softmax(logits, dim=1).cpu().numpy()[0]
-        idx = int(np.argmax(probs))
+        prediction, confidence, probs = backend.predict_all(model, frame_preprocess, [frame], classes)[0]
         
         prob_dict = {classes[i]: float(probs[i]) for i in range(len(classes))}
         
         return jsonify({
-            'prediction': classes[idx],
-            'confidence': float(probs[idx]),
+            'prediction': prediction,
+            'confidence': confidence,
             'probabilities': prob_dict,
             'all_classes': classes,
             'note': 'Analysis based on first frame only'
@@ -373,8 +439,111 @@ def predict_video():
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        shutil.rmtree(temp_dir)
+
+def cached_analysis(video_path, analyze, file_hash=None, **params):
+    """Run analyze(video_path), reusing a stored result for the same file, model and params.
+
+    file_hash is the SHA-256 of the file if already known. Returns (result, cache_hit).
+    Falsy results (nothing analyzed) are not cached.
+    """
+    ensure_model()
+    if result_cache is None:
+        return analyze(video_path), False
+    key = result_cache.key(file_hash or file_sha256(video_path), **params)
+    result = result_cache.get(key)
+    if result is not None:
+        return result, True
+    result = analyze(video_path)
+    if result:
+        try:
+            result_cache.put(key, result)
+        except OSError as e:
+            print(f"Error caching analysis result: {e}")
+    return result, False
+
+def cached_response(result, cache_hit):
+    response = jsonify(result)
+    response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+    return response
+
+def analyze_video_frames(video_path, workers=VIDEO_DECODE_WORKERS):
+    """Classify one frame per second of a video file and summarize the position changes.
+
+    Long videos are split into segments that are decoded and preprocessed in
+    parallel worker processes; predictions are merged back in frame order so
+    the result is the same as the serial pass.
+    """
+    import cv2
+    import numpy as np
+    require_model()
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    duration = total_frames / fps
+    
+    # Analyze 1 frame per second
+    frame_interval = int(fps)
+    predictions = []
+    
+    # Only sampled frames are decoded out; they are classified in batches of INFERENCE_BATCH_SIZE
+    if workers > 1 and duration >= PARALLEL_MIN_SECONDS:
+        cap.release()
+        sampled_frames = iter_parallel_frames(video_path, total_frames, frame_interval,
+                                              INFERENCE_BACKEND, img_size, channels, workers)
+        preprocess = np.stack
+    else:
+        sampled_frames = iter_sampled_frames(cap, frame_interval)
+        preprocess = frame_preprocess
+    for frame_number, (prediction, confidence, _) in backend.iter_predictions(model, preprocess, sampled_frames, classes):
+        timestamp = frame_number / fps
+        
+        predictions.append({
+            'frame_number': frame_number,
+            'timestamp': timestamp,
+            'timestamp_formatted': format_timestamp(timestamp),
+            'prediction': prediction,
+            'confidence': confidence
+        })
+        
+    cap.release()
+    
+    # Analyze movement/changes
+    position_changes = []
+    if predictions:
+        current_pos = predictions[0]['prediction']
+        for i in range(1, len(predictions)):
+            if predictions[i]['prediction'] != current_pos:
+                position_changes.append({
+                    'from': current_pos,
+                    'to': predictions[i]['prediction'],
+                    'timestamp': predictions[i]['timestamp'],
+                    'frame_number': predictions[i]['frame_number']
+                })
+                current_pos = predictions[i]['prediction']
+    
+    movement_analysis = generate_movement_analysis(position_changes, predictions, duration)
+    
+    # Calculate overall prediction (dominant)
+    counts = {}
+    for p in predictions:
+        pred = p['prediction']
+        counts[pred] = counts.get(pred, 0) + 1
+    
+    overall_prediction = max(counts, key=counts.get) if counts else "Unknown"
+    overall_confidence = sum(p['confidence'] for p in predictions) / len(predictions) if predictions else 0
+    
+    return {
+        'prediction': overall_prediction,
+        'confidence': overall_confidence,
+        'frame_predictions': predictions,
+        'position_changes': position_changes,
+        'movement_analysis': movement_analysis,
+        'video_metadata': {
+            'duration': duration,
+            'total_frames': total_frames,
+            'fps': fps
+        }
+    }
 
 @app.route('/predict_video_frames', methods=['POST'])
 def predict_video_frames():
@@ -383,94 +552,78 @@ def predict_video_frames():
         
     file = request.files['file']
     
-    # Save temp file
-    temp_dir = tempfile.mkdtemp()
-    temp_path = os.path.join(temp_dir, file.filename)
-    file.save(temp_path)
+    # Uploads are spooled to disk while the body is parsed; analyze that file in place
+    temp_path = upload_path(file)
     
     try:
-        cap = cv2.VideoCapture(temp_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps
-        
-        # Analyze 1 frame per second
-        frame_interval = int(fps)
-        predictions = []
-        
-        current_frame = 0
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            if current_frame % frame_interval == 0:
-                # Process frame
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame_rgb).convert("L")
-                
-                x = transform(img).unsqueeze(0)
-                with torch.no_grad():
-                    logits = model(x)
-                    probs = torch.softmax(logits, dim=1).cpu().numpy()[0]
-                idx = int(np.argmax(probs))
-                
-                timestamp = current_frame / fps
-                
-                predictions.append({
-                    'frame_number': current_frame,
-                    'timestamp': timestamp,
-                    'timestamp_formatted': format_timestamp(timestamp),
-                    'prediction': classes[idx],
-                    'confidence': float(probs[idx])
-                })
-                
-            current_frame += 1
-            
-        cap.release()
-        
-        # Analyze movement/changes
-        position_changes = []
-        if predictions:
-            current_pos = predictions[0]['prediction']
-            for i in range(1, len(predictions)):
-                if predictions[i]['prediction'] != current_pos:
-                    position_changes.append({
-                        'from': current_pos,
-                        'to': predictions[i]['prediction'],
-                        'timestamp': predictions[i]['timestamp'],
-                        'frame_number': predictions[i]['frame_number']
-                    })
-                    current_pos = predictions[i]['prediction']
-        
-        movement_analysis = generate_movement_analysis(position_changes, predictions, duration)
-        
-        # Calculate overall prediction (dominant)
-        counts = {}
-        for p in predictions:
-            pred = p['prediction']
-            counts[pred] = counts.get(pred, 0) + 1
-        
-        overall_prediction = max(counts, key=counts.get) if counts else "Unknown"
-        overall_confidence = sum(p['confidence'] for p in predictions) / len(predictions) if predictions else 0
-        
-        return jsonify({
-            'prediction': overall_prediction,
-            'confidence': overall_confidence,
-            'frame_predictions': predictions,
-            'position_changes': position_changes,
-            'movement_analysis': movement_analysis,
-            'video_metadata': {
-                'duration': duration,
-                'total_frames': total_frames,
-                'fps': fps
-            }
-        })
-        
+        ensure_model()
+        if model is None:
+            return jsonify({'error': 'Model not loaded'}), 503
+        # Re-uploads of the same clip are answered from the result cache
+        return cached_response(*cached_analysis(temp_path, analyze_video_frames, upload_sha256(file),
+                                                analysis='frames', samples_per_second=1))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        shutil.rmtree(temp_dir)
+
+# Analyze every 10th frame in interval for speed
+INTERVAL_FRAME_STEP = 10
+
+def summarize_interval(frame_results, fps, start_time, end_time):
+    """Build the interval response from (frame_number, prediction, confidence) in frame order.
+
+    Returns None if no frame was analyzed.
+    """
+    predictions = [{
+        'frame': frame_number,
+        'timestamp': frame_number / fps,
+        'prediction': prediction,
+        'confidence': confidence
+    } for frame_number, prediction, confidence in frame_results]
+    
+    if not predictions:
+        return None
+        
+    # Determine dominant position
+    counts = {}
+    for p in predictions:
+        pred = p['prediction']
+        counts[pred] = counts.get(pred, 0) + 1
+        
+    dominant_pos = max(counts, key=counts.get)
+    
+    # Check if label changed within interval (micro-movement)
+    label_changed = len(counts) > 1
+
+    # Format timestamps in predictions
+    for p in predictions:
+        p['timestamp_formatted'] = format_timestamp(p['timestamp'])
+    
+    return {
+        'interval_start': start_time,
+        'interval_end': end_time,
+        'dominant_position': dominant_pos,
+        'label_changed': label_changed,
+        'predictions': predictions
+    }
+
+def analyze_video_interval(video_path, start_time, end_time):
+    """Classify every INTERVAL_FRAME_STEP-th frame in [start_time, end_time)"""
+    import cv2
+    require_model()
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    
+    start_frame = int(start_time * fps)
+    end_frame = int(end_time * fps)
+    
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    
+    sampled_frames = iter_sampled_frames(cap, INTERVAL_FRAME_STEP, start_frame, end_frame)
+    frame_results = [(frame_number, prediction, confidence) for frame_number, (prediction, confidence, _)
+                     in backend.iter_predictions(model, frame_preprocess, sampled_frames, classes)]
+    cap.release()
+    
+    return summarize_interval(frame_results, fps, start_time, end_time)
 
 @app.route('/predict_video_interval', methods=['POST'])
 def predict_video_interval():
@@ -481,82 +634,240 @@ def predict_video_interval():
     start_time = float(request.form.get('start_time', 0))
     end_time = float(request.form.get('end_time', 5))
     
-    # Save temp file
-    temp_dir = tempfile.mkdtemp()
-    temp_path = os.path.join(temp_dir, file.filename)
-    file.save(temp_path)
+    # Uploads are spooled to disk while the body is parsed; analyze that file in place
+    temp_path = upload_path(file)
     
     try:
-        cap = cv2.VideoCapture(temp_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        
-        start_frame = int(start_time * fps)
-        end_frame = int(end_time * fps)
-        
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-        
-        predictions = []
-        current_frame = start_frame
-        
-        # Analyze every 10th frame in interval for speed
-        step = 10
-        
-        while current_frame < end_frame and cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            if (current_frame - start_frame) % step == 0:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame_rgb).convert("L")
-                
-                x = transform(img).unsqueeze(0)
-                with torch.no_grad():
-                    logits = model(x)
-                    probs = torch.softmax(logits, dim=1).cpu().numpy()[0]
-                idx = int(np.argmax(probs))
-                
-                predictions.append({
-                    'frame': current_frame,
-                    'timestamp': current_frame / fps,
-                    'prediction': classes[idx],
-                    'confidence': float(probs[idx])
-                })
-            
-            current_frame += 1
-            
-        cap.release()
-        
-        if not predictions:
+        ensure_model()
+        if model is None:
+            return jsonify({'error': 'Model not loaded'}), 503
+        result, cache_hit = cached_analysis(temp_path, lambda path: analyze_video_interval(path, start_time, end_time),
+                                            upload_sha256(file),
+                                            analysis='interval', start_time=start_time, end_time=end_time,
+                                            step=INTERVAL_FRAME_STEP)
+        if result is None:
             return jsonify({'error': 'No frames analyzed'}), 400
-            
-        # Determine dominant position
-        counts = {}
-        for p in predictions:
-            pred = p['prediction']
-            counts[pred] = counts.get(pred, 0) + 1
-            
-        dominant_pos = max(counts, key=counts.get)
+        return cached_response(result, cache_hit)
         
-        # Check if label changed within interval (micro-movement)
-        label_changed = len(counts) > 1
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # Format timestamps in predictions
-        for p in predictions:
-            p['timestamp_formatted'] = format_timestamp(p['timestamp'])
+# --- VIDEO SESSIONS ---
+# Upload a video once, then run interval queries against its handle
+
+@app.route('/api/videos', methods=['POST'])
+def upload_video_session():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
         
-        return jsonify({
-            'interval_start': start_time,
-            'interval_end': end_time,
-            'dominant_position': dominant_pos,
-            'label_changed': label_changed,
-            'predictions': predictions
-        })
+    file = request.files['file']
+    
+    temp_path = upload_path(file)
+    file.close()  # the session moves the spooled file into place
+    
+    try:
+        session = video_sessions.create(temp_path, file.filename, video_id=upload_sha256(file))
+        if session.total_frames <= 0:
+            video_sessions.delete(session.video_id)
+            return jsonify({'error': 'Could not read video'}), 400
+        return jsonify(session.metadata()), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/videos/<video_id>', methods=['DELETE'])
+def delete_video_session(video_id):
+    if not video_sessions.delete(video_id):
+        return jsonify({'error': 'Unknown video'}), 404
+    return jsonify({'success': True})
+
+@app.route('/api/videos/<video_id>/interval', methods=['POST'])
+def predict_session_interval(video_id):
+    session = video_sessions.get(video_id)
+    if session is None:
+        return jsonify({'error': 'Unknown video'}), 404
+        
+    data = request.get_json(silent=True) or request.form
+    start_time = float(data.get('start_time', 0))
+    end_time = float(data.get('end_time', 5))
+    
+    try:
+        ensure_model()
+        if model is None:
+            return jsonify({'error': 'Model not loaded'}), 503
+        # Same frames as /predict_video_interval; ones classified by earlier queries are not re-inferred
+        frame_numbers = range(int(start_time * session.fps), int(end_time * session.fps), INTERVAL_FRAME_STEP)
+        cached = session.predict_frames(
+            frame_numbers, lambda frames: backend.iter_predictions(model, frame_preprocess, frames, classes))
+        frame_results = [(n, *cached[n]) for n in frame_numbers if n in cached]
+        
+        result = summarize_interval(frame_results, session.fps, start_time, end_time)
+        if result is None:
+            return jsonify({'error': 'No frames analyzed'}), 400
+        return jsonify(result)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        shutil.rmtree(temp_dir)
+
+# Pages of /api/history and /api/alerts (?limit=N); without limit both return every matching row
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+HISTORY_SELECT = ('SELECT h.*, h.patient_id as patientId, p.name as patient_name, p.name as patientName '
+                  'FROM analysis_history h LEFT JOIN patients p ON h.patient_id = p.id')
+ALERTS_SELECT = 'SELECT a.*, a.patient_id as patientId, a.patient_name as patientName FROM alerts a'
+
+def encode_cursor(row):
+    return base64.urlsafe_b64encode(json.dumps([row['timestamp'], row['id']]).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        timestamp, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(timestamp), str(record_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def record_filters(args, alias, statuses=False):
+    """WHERE clauses for the patient_id, status, since and until filters (ISO timestamps, until exclusive)"""
+    clauses, params = [], []
+    if args.get('patient_id'):
+        clauses.append(f'{alias}.patient_id = ?')
+        params.append(args['patient_id'])
+    if statuses and args.get('status'):
+        clauses.append(f'{alias}.status = ?')
+        params.append(args['status'])
+    if args.get('since'):
+        clauses.append(f'{alias}.timestamp >= ?')
+        params.append(args['since'])
+    if args.get('until'):
+        clauses.append(f'{alias}.timestamp < ?')
+        params.append(args['until'])
+    return clauses, params
+
+def is_paged(args):
+    return 'limit' in args or 'cursor' in args
+
+def record_matches(row, args, statuses=False):
+    """record_filters for a row that is still in the write queue"""
+    timestamp = row['timestamp']
+    return ((not args.get('patient_id') or row['patient_id'] == args['patient_id'])
+            and (not statuses or not args.get('status') or row['status'] == args['status'])
+            and (not args.get('since') or (timestamp is not None and timestamp >= args['since']))
+            and (not args.get('until') or (timestamp is not None and timestamp < args['until'])))
+
+def unsaved(conn, table, rows):
+    """Queued rows whose batch has not been committed yet (it may have been since they were read)"""
+    if not rows:
+        return []
+    saved = {row[0] for row in conn.execute(f"SELECT id FROM {table} WHERE id IN ({', '.join('?' for _ in rows)})",
+                                            [row['id'] for row in rows])}
+    return [row for row in rows if row['id'] not in saved]
+
+def queued_alerts(conn, args, statuses=True):
+    """Alerts accepted but not committed yet that match args, shaped like ALERTS_SELECT rows"""
+    rows = [row for row in write_queue.pending('alerts') if record_matches(row, args, statuses)]
+    return [alert_record(row) for row in unsaved(conn, 'alerts', rows)]
+
+def queued_history(conn, args):
+    """History rows accepted but not committed yet that match args, shaped like HISTORY_SELECT rows"""
+    rows = unsaved(conn, 'analysis_history',
+                   [row for row in write_queue.pending('analysis_history') if record_matches(row, args)])
+    patient_ids = sorted({row['patient_id'] for row in rows if row['patient_id'] is not None})
+    names = dict(conn.execute(f"SELECT id, name FROM patients WHERE id IN ({', '.join('?' for _ in patient_ids)})",
+                              patient_ids).fetchall()) if patient_ids else {}
+    return [{**row, 'patientId': row['patient_id'], 'patient_name': names.get(row['patient_id']),
+             'patientName': names.get(row['patient_id'])} for row in rows]
+
+def sort_key(row):
+    return (row['timestamp'] or '', row['id'] or '')
+
+def where(clauses):
+    return ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+
+def records_query(select, alias, args, statuses=False, limit=None):
+    """(sql, params) of the rows query_records reads: every match, or with limit one page plus one row"""
+    clauses, params = record_filters(args, alias, statuses)
+    if limit is None:
+        return select + where(clauses) + f' ORDER BY {alias}.timestamp DESC', params
+    if args.get('cursor'):
+        clauses.append(f'({alias}.timestamp, {alias}.id) < (?, ?)')
+        params.extend(decode_cursor(args['cursor']))
+    return (select + where(clauses) + f' ORDER BY {alias}.timestamp DESC, {alias}.id DESC LIMIT ?',
+            params + [limit + 1])
+
+def count_query(table, alias, args, statuses=False):
+    clauses, params = record_filters(args, alias, statuses)
+    return f'SELECT COUNT(*) FROM {table} {alias}' + where(clauses), params
+
+def query_records(conn, select, alias, args, statuses=False, queued=None):
+    """Matching rows, newest first, and the cursor of the next page (None when unpaged or on the last page).
+
+    Pages are keyed on (timestamp, id) rather than OFFSET: every page is one
+    index range however far the client has scrolled, and rows inserted while
+    it pages do not shift the pages after the first. queued(conn, args) returns
+    matching rows still in the write queue, which are merged in so a row is
+    listed as soon as it is accepted.
+    """
+    # Read the queue before the table: a row committed in between is dropped by unsaved()
+    pending = queued(conn, args) if queued else []
+    if not is_paged(args):
+        # Legacy: every matching row
+        rows = [dict(row) for row in conn.execute(*records_query(select, alias, args, statuses))]
+        if pending:
+            rows = sorted(rows + pending, key=lambda row: row['timestamp'] or '', reverse=True)
+        return rows, None
+
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    limit = min(limit, MAX_PAGE_SIZE)
+    rows = [dict(row) for row in conn.execute(*records_query(select, alias, args, statuses, limit))]
+    if pending:
+        if args.get('cursor'):
+            after = decode_cursor(args['cursor'])
+            pending = [row for row in pending if sort_key(row) < after]
+        rows = sorted(rows + pending, key=sort_key, reverse=True)[:limit + 1]
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def count_records(conn, table, alias, args, statuses=False, queued=None):
+    pending = queued(conn, args) if queued else []
+    return conn.execute(*count_query(table, alias, args, statuses)).fetchone()[0] + len(pending)
+
+# Every non-admin user with the newest message exchanged with :me and the number :me has not read.
+# Each side of the conversations is one range of a messages index (newest id per partner),
+# unread counts come from the partial unread index, and only the newest messages are read.
+CHAT_USERS_QUERY = '''
+    WITH latest AS (
+        SELECT partner, MAX(id) AS id FROM (
+            SELECT recipient_username AS partner, MAX(id) AS id FROM messages
+            WHERE sender_username = :me GROUP BY recipient_username
+            UNION ALL
+            SELECT sender_username AS partner, MAX(id) AS id FROM messages
+            WHERE recipient_username = :me GROUP BY sender_username
+        ) GROUP BY partner
+    ),
+    unread AS (
+        SELECT sender_username AS partner, COUNT(*) AS count FROM messages
+        WHERE recipient_username = :me AND is_read = 0 GROUP BY sender_username
+    )
+    SELECT n.username, n.name, n.role, n.photo_url, n.phone, n.nurse_id, n.joined_date, n.address,
+           n.is_online, n.last_seen,
+           m.text AS last_message, m.timestamp AS last_timestamp, COALESCE(u.count, 0) AS unread_count
+    FROM nurses n
+    LEFT JOIN latest l ON l.partner = n.username
+    LEFT JOIN messages m ON m.id = l.id
+    LEFT JOIN unread u ON u.partner = n.username
+    WHERE n.role != 'admin'
+    ORDER BY n.rowid
+'''
+
+def chat_users(conn, current_user):
+    """Rows of /api/chat/users: one statement however many users and messages there are"""
+    presence.start()
+    return presence.apply([dict(row) for row in conn.execute(CHAT_USERS_QUERY, {'me': current_user})])
 
 @app.route('/api/history', methods=['GET', 'POST'])
 def handle_history():
@@ -565,15 +876,16 @@ def handle_history():
     if request.method == 'POST':
         try:
             data = request.get_json()
-            conn.execute('''INSERT INTO analysis_history 
-                          (id, timestamp, filename, file_type, prediction, confidence, probabilities, patient_id, notes, analysis_result)
-                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                          (data['id'], data['timestamp'], data['filename'], data['file_type'],
-                           data['prediction'], data['confidence'], json.dumps(data.get('probabilities', {})),
-                           data.get('patient', {}).get('id'), data.get('movementSummary'),
-                           data.get('analysis_result')))
-            conn.commit()
+            write_queue.put('analysis_history', {
+                'id': data['id'], 'timestamp': data['timestamp'], 'filename': data['filename'],
+                'file_type': data['file_type'], 'file_size': None, 'prediction': data['prediction'],
+                'confidence': data['confidence'], 'probabilities': json.dumps(data.get('probabilities', {})),
+                'patient_id': data.get('patient', {}).get('id'), 'notes': data.get('movementSummary'),
+                'analysis_result': data.get('analysis_result'),
+            }, key='id')
             return jsonify({"status": "success", "message": "History saved"})
+        except DuplicateRowError as e:
+            return jsonify({"error": str(e)}), 409
         except Exception as e:
             return jsonify({"error": str(e)}), 500
         finally:
@@ -581,19 +893,27 @@ def handle_history():
             
     else: # GET
         try:
-            cursor = conn.execute('''
-                SELECT h.*, h.patient_id as patientId, p.name as patient_name, p.name as patientName 
-                FROM analysis_history h 
-                LEFT JOIN patients p ON h.patient_id = p.id 
-                ORDER BY h.timestamp DESC
-            ''')
-            history = [dict(row) for row in cursor.fetchall()]
-            return jsonify(history)
+            history, next_cursor = query_records(conn, HISTORY_SELECT, 'h', request.args, queued=queued_history)
+            if not is_paged(request.args):
+                return jsonify(history)
+            return jsonify({"history": history, "next_cursor": next_cursor})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
         finally:
             conn.close()
 
+@app.route('/api/history/count', methods=['GET'])
+def count_history():
+    conn = get_db_connection()
+    try:
+        return jsonify({"count": count_records(conn, 'analysis_history', 'h', request.args, queued=queued_history)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+
 @app.route('/api/alert', methods=['POST'])
 def save_alert():
     """Save alert information"""
@@ -604,27 +924,25 @@ def save_alert():
             
         print(f"Alert received: {data}")
         
-        conn = get_db_connection()
-        conn.execute('''INSERT INTO alerts 
-                      (id, patient_id, patient_name, position, duration, type, timestamp, acknowledged_by, status, analysis_result)
-                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                      (data.get('id'), data.get('patientId'), data.get('patientName'), 
-                       data.get('position'), data.get('duration'), data.get('type'),
-                       data.get('timestamp'), data.get('acknowledgedBy'), data.get('status'),
-                       data.get('analysis_result')))
-        conn.commit()
-        conn.close()
-        
+        queue_alert(data.get('id'), data.get('patientId'), data.get('patientName'),
+                    data.get('position'), data.get('duration'), data.get('type'),
+                    data.get('timestamp'), data.get('acknowledgedBy'), data.get('status'),
+                    data.get('analysis_result'))
+
         return jsonify({
             "status": "success", 
             "message": "Alert logged",
             "alert_id": data.get('id')
         })
         
+    except DuplicateRowError as e:
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         print(f"Error saving alert: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+ALERT_STATUS_QUERY = 'SELECT status, acknowledged_by FROM alerts WHERE id = ?'
+
 @app.route('/api/alert/acknowledge', methods=['POST'])
 def acknowledge_alert():
     """Acknowledge an alert"""
@@ -634,11 +952,14 @@ def acknowledge_alert():
             return jsonify({"error": "No alert ID provided"}), 400
             
         print(f"Acknowledging alert: {data}")
-        
+
+        # The alert may still be in the write queue
+        if not write_queue.flush():
+            return jsonify({"error": "Queued records are still being saved, try again"}), 503
         conn = get_db_connection()
-        
+
         # Check if already acknowledged to prevent overwriting the first click
-        cursor = conn.execute("SELECT status, acknowledged_by FROM alerts WHERE id = ?", (data.get('id'),))
+        cursor = conn.execute(ALERT_STATUS_QUERY, (data.get('id'),))
         row = cursor.fetchone()
         
         if row and row['status'] == 'acknowledged':
@@ -655,6 +976,8 @@ def acknowledge_alert():
         (data.get('acknowledgedBy'), data.get('id')))
         conn.commit()
         conn.close()
+        event_log.publish('alert_acknowledged', {'id': data.get('id'), 'status': 'acknowledged',
+                                                 'acknowledged_by': data.get('acknowledgedBy')})
         
         return jsonify({
             "status": "success", 
@@ -667,34 +990,52 @@ def acknowledge_alert():
 
 @app.route('/api/alerts', methods=['GET'])
 def get_alerts():
+    conn = get_db_connection()
     try:
-        status = request.args.get('status')
-        conn = get_db_connection()
-        query = 'SELECT a.*, a.patient_id as patientId, a.patient_name as patientName FROM alerts a'
-        params = []
-        
-        if status:
-            query += ' WHERE a.status = ?'
-            params.append(status)
-            
-        query += ' ORDER BY a.timestamp DESC'
-        
-        cursor = conn.execute(query, params)
-        alerts = [dict(row) for row in cursor.fetchall()]
+        alerts, next_cursor = query_records(conn, ALERTS_SELECT, 'a', request.args, statuses=True,
+                                            queued=queued_alerts)
+        if not is_paged(request.args):
+            return jsonify({
+                "alerts": alerts,
+                "total": len(alerts)
+            })
+        return jsonify({"alerts": alerts, "next_cursor": next_cursor})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
         conn.close()
-        return jsonify({
-            "alerts": alerts,
-            "total": len(alerts)
-        })
+
+@app.route('/api/alerts/count', methods=['GET'])
+def count_alerts():
+    conn = get_db_connection()
+    try:
+        return jsonify({"count": count_records(conn, 'alerts', 'a', request.args, statuses=True,
+                                               queued=queued_alerts)})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
 
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "healthy",
         "model_loaded": model is not None,
-        "classes": classes,
+        # The model is loaded on first inference; until then its classes are not known
+        "model_state": "not_loaded" if backend is None else "loaded" if model is not None else "failed",
+        "model_path": WEIGHTS_PATH,
+        "scheduler": scheduler.stats(),
+        "result_cache": result_cache.stats() if result_cache else None,
+        "video_sessions": video_sessions.stats(),
+        "streams": len(StreamPipeline.active_stats()),
+        "ward_beds": len(ward_monitor.beds()),
+        "events": event_log.stats(),
+        "db_pool": db_pool.stats(),
+        "write_queue": write_queue.stats(),
+        "presence": presence.stats(),
+        "classes": classes if backend is not None else None,
         "timestamp": datetime.now().isoformat(),
         "version": "2.0.0"
     })
@@ -715,11 +1056,8 @@ def login():
 
         if nurse:
             # Set online status and last seen
-            conn = get_db_connection()
-            conn.execute("UPDATE nurses SET is_online = 1, last_seen = ? WHERE username = ?", 
-                         (datetime.now().isoformat(), username))
-            conn.commit()
-            conn.close()
+            presence.login(username)
+            publish_presence(username, True)
 
             return jsonify({
                 "status": "success",
@@ -743,10 +1081,8 @@ def logout():
         if not username:
             return jsonify({"error": "No username provided"}), 400
             
-        conn = get_db_connection()
-        conn.execute("UPDATE nurses SET is_online = 0, last_seen = NULL WHERE username = ?", (username,))
-        conn.commit()
-        conn.close()
+        presence.logout(username)
+        publish_presence(username, False)
         return jsonify({"status": "success", "message": "Logged out successfully"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -759,11 +1095,8 @@ def heartbeat():
         if not username:
             return jsonify({"error": "No username provided"}), 400
             
-        conn = get_db_connection()
-        conn.execute("UPDATE nurses SET is_online = 1, last_seen = ? WHERE username = ?", 
-                     (datetime.now().isoformat(), username))
-        conn.commit()
-        conn.close()
+        # Only in memory; the transition to online is written and announced by the tracker
+        presence.beat(username)
         return jsonify({"status": "success"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -909,6 +1242,25 @@ def too_large(error):
 # CLI Utility Functions
 # ==========================================
 
+def export_onnx_model():
+    """Export the PyTorch checkpoint to ONNX for the onnxruntime backend"""
+    SOURCE = 'best_model.pth'
+    DEST = 'best_model.onnx'
+    print("📦 Exporting model to ONNX...")
+    if not os.path.exists(SOURCE):
+        print(f"❌ Checkpoint not found at: {SOURCE}")
+        return
+
+    try:
+        from inference import export_onnx
+        classes, img_size, channels = export_onnx(SOURCE, DEST)
+        size = os.path.getsize(DEST) / (1024 * 1024)
+        print(f"✅ Model exported to {os.path.abspath(DEST)} ({size:.1f} MB)")
+        print(f"🎯 Classes: {classes}, img_size: {img_size}, input channels: {channels}")
+        print("💡 Serve it with INFERENCE_BACKEND=onnx")
+    except Exception as e:
+        print(f"❌ Error exporting model: {e}")
+
 def sync_database():
     """Sync database from hidden directory to current directory for inspection"""
     print("🔄 ThermalVision Database Synchronizer")
@@ -923,8 +1275,13 @@ def sync_database():
         return
 
     try:
-        # Create a copy
-        shutil.copy2(SOURCE_DB, DEST_DB)
+        # Copy through the backup API: in WAL mode recent writes may still be in history.db-wal
+        source = sqlite3.connect(SOURCE_DB)
+        dest = sqlite3.connect(DEST_DB)
+        with dest:
+            source.backup(dest)
+        dest.close()
+        source.close()
         
         # Get file stats
         size = os.path.getsize(DEST_DB) / 1024  # KB
@@ -1042,9 +1399,78 @@ def inspect_db():
     except Exception as e:
         print(f"❌ Error inspecting database: {e}")
 
+def hot_queries():
+    """(name, sql, sample parameters) of every query run on each dashboard/chat refresh or alert.
+
+    Built from the statements the handlers run, so EXPLAIN QUERY PLAN checks the
+    real queries.
+    """
+    page = {'cursor': encode_cursor({'timestamp': '2026-01-01T00:00:00', 'id': 'alert_1'})}
+    history_page = {'cursor': encode_cursor({'timestamp': '2026-01-01T00:00:00', 'id': 'analysis_1'})}
+    return [
+        ('alerts', *records_query(ALERTS_SELECT, 'a', {})),
+        ('alerts by status', *records_query(ALERTS_SELECT, 'a', {'status': 'pending'}, statuses=True)),
+        ('alerts page', *records_query(ALERTS_SELECT, 'a', page, limit=DEFAULT_PAGE_SIZE)),
+        ('alerts page by status', *records_query(ALERTS_SELECT, 'a', {**page, 'status': 'pending'}, statuses=True,
+                                                 limit=DEFAULT_PAGE_SIZE)),
+        ('alerts page by patient', *records_query(ALERTS_SELECT, 'a', {'patient_id': 'P001',
+                                                                       'since': '2026-01-01T00:00:00'},
+                                                  limit=DEFAULT_PAGE_SIZE)),
+        ('alerts count by status', *count_query('alerts', 'a', {'status': 'pending'}, statuses=True)),
+        ('alert by id', ALERT_STATUS_QUERY, ('alert_1',)),
+        ('history', *records_query(HISTORY_SELECT, 'h', {})),
+        ('history page', *records_query(HISTORY_SELECT, 'h', history_page, limit=DEFAULT_PAGE_SIZE)),
+        ('history page by patient', *records_query(HISTORY_SELECT, 'h', {**history_page, 'patient_id': 'P001'},
+                                                   limit=DEFAULT_PAGE_SIZE)),
+        ('history count by time', *count_query('analysis_history', 'h', {'since': '2026-01-01T00:00:00'})),
+        ('chat users', CHAT_USERS_QUERY, {'me': 'nurse1'}),
+        ('presence heartbeats', HEARTBEAT_QUERY, ('2026-01-01T00:00:00', 'nurse1')),
+        ('presence merge', ONLINE_QUERY, ()),
+        ('presence expiry', EXPIRE_QUERY, ('nurse1', '2026-01-01T00:00:00')),
+        ('chat history', CHAT_HISTORY_QUERY, ('nurse1', 'nurse2', 'nurse2', 'nurse1')),
+        ('chat mark read', CHAT_MARK_READ_QUERY, ('nurse2', 'nurse1')),
+        ('events since', EVENTS_SINCE_QUERY, (0, 500)),
+        ('events prune', EVENTS_PRUNE_QUERY, ('2000-01-01T00:00:00',)),
+        ('duty broadcasts since', DUTY_SINCE_QUERY, (0, 100)),
+        ('duty broadcasts recent', DUTY_RECENT_QUERY, (0.0,)),
+        ('duty broadcasts trim', DUTY_TRIM_QUERY, (0,)),
+    ]
+
+# Tables every hot query may read whole: the staff list is returned in full on each chat refresh
+FULL_SCAN_TABLES = {'nurses', 'n'}
+
+def explain_db():
+    """Print the query plan of every hot query; returns False if any of them scans a whole table"""
+    print("🔍 Checking query plans...")
+    if not os.path.exists(DB_PATH):
+        print(f"❌ Database not found at: {DB_PATH}")
+        return False
+
+    conn = sqlite3.connect(DB_PATH)
+    ok = True
+    try:
+        for name, sql, params in hot_queries():
+            plan = query_plan(conn, sql, params)
+            scans = full_scans(plan, allowed=FULL_SCAN_TABLES)
+            ok = ok and not scans
+            print(f"\n{'❌' if scans else '✅'} {name}")
+            for step in plan:
+                print(f"   {step}")
+    except Exception as e:
+        print(f"❌ Error explaining queries: {e}")
+        return False
+    finally:
+        conn.close()
+
+    print("\n" + "=" * 60)
+    print("✅ No full table scans" if ok else "❌ Full table scans found; add an index (see INDEXES)")
+    return ok
+
 @app.route('/api/history/<id>', methods=['DELETE'])
 def delete_history(id):
     try:
+        if not write_queue.flush():  # the record may not be committed yet
+            return jsonify({"error": "Queued records are still being saved, try again"}), 503
         conn = get_db_connection()
         conn.execute('DELETE FROM analysis_history WHERE id = ?', (id,))
         conn.commit()
@@ -1055,13 +1481,30 @@ def delete_history(id):
         print(f"Error deleting history: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/alert/<id>', methods=['GET'])
+def get_alert(id):
+    conn = get_db_connection()
+    try:
+        row = conn.execute(ALERTS_SELECT + ' WHERE a.id = ?', (id,)).fetchone()
+        if row is None:
+            queued = [alert for alert in write_queue.pending('alerts') if alert['id'] == id]
+            if not queued:
+                return jsonify({"error": "Alert not found"}), 404
+            return jsonify(alert_record(queued[0]))
+        return jsonify(dict(row))
+    finally:
+        conn.close()
+
 @app.route('/api/alert/<id>', methods=['DELETE'])
 def delete_alert(id):
     try:
+        if not write_queue.flush():  # the record may not be committed yet
+            return jsonify({"error": "Queued records are still being saved, try again"}), 503
         conn = get_db_connection()
         conn.execute('DELETE FROM alerts WHERE id = ?', (id,))
         conn.commit()
         conn.close()
+        event_log.publish('alert_deleted', {'id': id})
         print(f"Deleted alert record: {id}")
         return jsonify({"status": "success", "message": "Alert deleted"})
     except Exception as e:
@@ -1071,12 +1514,15 @@ def delete_alert(id):
 @app.route('/api/history/all', methods=['DELETE'])
 def clear_all_history():
     try:
+        if not write_queue.flush():  # queued rows would otherwise be inserted after the delete
+            return jsonify({"error": "Queued records are still being saved, try again"}), 503
         conn = get_db_connection()
         # Delete all records from both tables
         conn.execute('DELETE FROM analysis_history')
         conn.execute('DELETE FROM alerts')
         conn.commit()
         conn.close()
+        event_log.publish('history_cleared', {})
         print("Deleted all history and alerts")
         return jsonify({"status": "success", "message": "All history and alerts cleared"})
     except Exception as e:
@@ -1089,17 +1535,19 @@ def stream_video_analysis():
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
         
+    ensure_model()
+    if model is None:
+        return jsonify({'error': 'Model not loaded'}), 503
+
     file = request.files['file']
     patient_id = request.form.get('patientId')
     patient_name = request.form.get('patientName')
 
-    # Save temp file
-    temp_dir = tempfile.mkdtemp()
-    temp_path = os.path.join(temp_dir, file.filename)
-    file.save(temp_path)
+    # Uploads are spooled to disk while the body is parsed; the stream deletes that file when it ends
+    temp_path = detach_upload(file)
 
     return Response(
-        stream_with_context(generate_analysis_stream(temp_path, patient_id, patient_name, is_file=True, cleanup_dir=temp_dir)),
+        stream_with_context(generate_analysis_stream(temp_path, patient_id, patient_name, is_file=True, cleanup_file=temp_path)),
         mimetype='application/x-ndjson'
     )
 
@@ -1109,6 +1557,9 @@ def stream_rtsp_analysis():
     data = request.get_json()
     if not data or 'url' not in data:
         return jsonify({'error': 'No RTSP URL provided'}), 400
+    ensure_model()
+    if model is None:
+        return jsonify({'error': 'Model not loaded'}), 503
         
     rtsp_url = data['url']
     patient_id = data.get('patientId')
@@ -1121,154 +1572,243 @@ def stream_rtsp_analysis():
 
 
 
-def generate_analysis_stream(source, patient_id, patient_name, is_file=True, cleanup_dir=None):
+@app.route('/api/streams', methods=['GET'])
+def stream_stats():
+    """Per-stage queue depths and frame counters of every running analysis stream"""
+    return jsonify({'streams': StreamPipeline.active_stats()})
+
+
+def insert_stream_alert(alert_id, patient_id, patient_name, position, stable_duration, analysis_result='Video Analysis'):
+    """Queue a no-movement alert raised by a stream (never blocks the frame loop on a commit)"""
+    try:
+        queue_alert(alert_id, patient_id, patient_name,
+                    position, f"{stable_duration:.1f}", 'No Movement Detected',
+                    datetime.now().isoformat(), None, 'pending',
+                    analysis_result)
+        print(f"Alert queued: {alert_id}")
+    except Exception as e:
+        print(f"Error saving alert: {e}")
+
+
+def normalize_source(source):
+    """Strip quotes around a user-supplied stream source and normalize local paths"""
     # Auto-detect if source is a local file
     source = source.strip().strip('"').strip("'")
     
     # Don't normalize RTSP/HTTP URLs as it breaks them on Windows
     if not (source.lower().startswith('rtsp://') or source.lower().startswith('http://') or source.lower().startswith('https://')):
         source = os.path.normpath(source)
+    return source
+
+
+def stream_metadata(cap, source):
+    """(fps, metadata event) of an opened stream source"""
+    import cv2
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    
+    if fps <= 0 or fps > 1000: # Handle weird OpenCV FPS values
+        fps = 30 
+        
+    duration = total_frames / fps if total_frames > 0 else 0
+    
+    print(f"DEBUG: Starting stream analysis. Source: {source}, FPS: {fps}, Total Frames: {total_frames}, Duration: {duration}s")
+
+    return fps, {
+        'type': 'metadata',
+        'duration': duration,
+        'fps': fps,
+        'total_frames': total_frames,
+        'isLive': False
+    }
+
+
+def generate_analysis_stream(source, patient_id, patient_name, is_file=True, cleanup_file=None):
+    import cv2
+    source = normalize_source(source)
 
     cap = cv2.VideoCapture(source)
     if not cap.isOpened():
         error_msg = f"Could not open source: {source}"
         print(f"ERROR: {error_msg}")
+        if cleanup_file and os.path.exists(cleanup_file):
+            os.remove(cleanup_file)
         yield json.dumps({'type': 'error', 'message': error_msg}) + '\n'
         return
 
+    pipeline = None
     try:
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        if fps <= 0 or fps > 1000: # Handle weird OpenCV FPS values
-            fps = 30 
-            
-        duration = total_frames / fps if total_frames > 0 else 0
-        
-        print(f"DEBUG: Starting stream analysis. Source: {source}, FPS: {fps}, Total Frames: {total_frames}, Duration: {duration}s")
+        fps, metadata = stream_metadata(cap, source)
 
         # Send initial metadata
-        yield json.dumps({
-            'type': 'metadata',
-            'duration': duration,
-            'fps': fps,
-            'total_frames': total_frames,
-            'isLive': False
-        }) + '\n'
+        yield json.dumps(metadata) + '\n'
 
         # Real-time synchronization variables
         start_analysis_time = time.time()
         
-        # Track process timing
-        next_process_time = 0.0
-        current_frame = 0
-        
-        previous_position = None
-        stable_start_time = 0
-        
-        # Track alerts to avoid duplicates for same event
-        last_alert_time = -10 
+        detector = NoMovementDetector(threshold=5.0)
 
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Use MSEC for accurate video timing, fallback to frame-based for live/buggy streams
-            msec = cap.get(cv2.CAP_PROP_POS_MSEC)
-            timestamp = msec / 1000.0 if msec > 0 else (current_frame / fps)
-                
-            if timestamp >= next_process_time:
-                # Process frame
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame_rgb).convert("L")
-                
-                x = transform(img).unsqueeze(0)
-                with torch.no_grad():
-                    logits = model(x)
-                    probs = torch.softmax(logits, dim=1).cpu().numpy()[0]
-                idx = int(np.argmax(probs))
-                prediction = classes[idx]
-                confidence = float(probs[idx])
-                
-                # --- REAL-TIME SYNC ---
-                # Ensure analysis doesn't run faster than the video itself
-                elapsed_real_time = time.time() - start_analysis_time
-                if timestamp > elapsed_real_time:
-                    delay = timestamp - elapsed_real_time
-                    time.sleep(delay)
-
-                minutes = int(timestamp // 60)
-                seconds = int(timestamp % 60)
-                timestamp_formatted = f"{minutes:02}:{seconds:02}"
-
-                # Increment for next second
-                next_process_time += 1.0
-
-                # --- ALERT LOGIC ---
-                if prediction == previous_position:
-                    # Position is stable
-                    stable_duration = timestamp - stable_start_time
-                    
-                    # Check for 5s threshold
-                    if stable_duration >= 5.0 and (timestamp - last_alert_time) > 5.0:
-                        # TRIGGER ALERT
-                        alert_id = f"alert_{int(time.time()*1000)}"
-                        
-                        # 1. Save to DB
-                        try:
-                            conn = get_db_connection()
-                            conn.execute('''INSERT INTO alerts 
-                                          (id, patient_id, patient_name, position, duration, type, timestamp, status, analysis_result)
-                                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                                          (alert_id, patient_id, patient_name, 
-                                           prediction, f"{stable_duration:.1f}", 'No Movement Detected',
-                                           datetime.now().isoformat(), 'pending',
-                                           'Video Analysis'))
-                            conn.commit()
-                            conn.close()
-                            print(f"Alert saved: {alert_id}")
-                        except Exception as e:
-                            print(f"Error saving alert: {e}")
-
-                        # 2. Stream Alert Event
-                        try:
-                            yield json.dumps({
-                                'type': 'alert',
-                                'alert_id': alert_id,
-                                'timestamp': timestamp,
-                                'position': prediction,
-                                'duration': stable_duration,
-                                'message': f'Patient in {prediction} for {stable_duration:.1f}s'
-                            }) + '\n'
-                        except Exception as e:
-                            print(f"Error yielding alert: {e}")
-                            
-                        last_alert_time = timestamp
-                        
-                else:
-                    # Position changed, reset counter
-                    previous_position = prediction
-                    stable_start_time = timestamp
-
-                # Stream Frame Result
-                yield json.dumps({
-                    'type': 'frame',
-                    'timestamp': timestamp,
-                    'timestamp_formatted': timestamp_formatted,
-                    'frame': current_frame,
-                    'prediction': prediction,
-                    'confidence': confidence
-                }) + '\n'
+        # Capture and inference run on their own threads; this generator only emits
+        pipeline = StreamPipeline(cap, fps, scheduler.predict, live=not is_file, source=source).start()
+
+        for timestamp, current_frame, prediction, confidence, latency_ms in pipeline:
+            # --- REAL-TIME SYNC ---
+            # Ensure analysis doesn't run faster than the video itself (live sources already run in real time)
+            elapsed_real_time = time.time() - start_analysis_time
+            if is_file and timestamp > elapsed_real_time:
+                delay = timestamp - elapsed_real_time
+                time.sleep(delay)
+
+            # --- ALERT LOGIC ---
+            stable_duration = detector.update(timestamp, prediction)
+            if stable_duration is not None:
+                # TRIGGER ALERT
+                alert_id = f"alert_{int(time.time()*1000)}"
                 
-            current_frame += 1
+                # 1. Save to DB
+                insert_stream_alert(alert_id, patient_id, patient_name, prediction, stable_duration)
+
+                # 2. Stream Alert Event
+                try:
+                    yield json.dumps(alert_event(alert_id, timestamp, prediction, stable_duration)) + '\n'
+                except Exception as e:
+                    print(f"Error yielding alert: {e}")
+
+            # Stream Frame Result
+            yield json.dumps(frame_event(timestamp, current_frame, prediction, confidence, latency_ms)) + '\n'
             
     except Exception as e:
         yield json.dumps({'type': 'error', 'message': str(e)}) + '\n'
     finally:
-        cap.release()
-        if cleanup_dir and os.path.exists(cleanup_dir):
-            shutil.rmtree(cleanup_dir)
+        # Once started, the capture thread owns (and releases) the capture
+        if pipeline is not None:
+            pipeline.close()
+        else:
+            cap.release()
+        if cleanup_file and os.path.exists(cleanup_file):
+            os.remove(cleanup_file)
+
+# --- WARD MONITOR ---
+# Bed cameras analyzed continuously in this process, independent of connected clients
+
+WARD_MONITOR_ENABLED = os.environ.get('WARD_MONITOR_ENABLED', '1') == '1'
+
+ward_monitor = WardMonitor(scheduler.predict,
+                           lambda *alert: insert_stream_alert(*alert, analysis_result='Ward Monitor'))
+_ward_monitor_started = False
+
+def start_ward_monitor():
+    """Start monitoring every registered bed (once per process)"""
+    global _ward_monitor_started
+    if _ward_monitor_started or not WARD_MONITOR_ENABLED:
+        return
+    _ward_monitor_started = True
+    conn = get_db_connection()
+    beds = conn.execute("SELECT bed_id, source, patient_id, patient_name FROM ward_beds").fetchall()
+    conn.close()
+    for bed in beds:
+        ward_monitor.add_bed(bed['bed_id'], bed['source'], bed['patient_id'], bed['patient_name'])
+    if beds:
+        print(f"🛏️  Ward monitor started for {len(beds)} bed(s)")
+
+@app.route('/api/ward/beds', methods=['GET', 'POST'])
+def ward_beds():
+    if request.method == 'POST':
+        if not WARD_MONITOR_ENABLED:
+            return jsonify({'error': 'The ward monitor is disabled (WARD_MONITOR_ENABLED=0)'}), 503
+        data = request.get_json() or {}
+        bed_id = data.get('bed_id')
+        source = data.get('source') or data.get('url') or ''
+        if not isinstance(bed_id, str) or not isinstance(source, str):
+            return jsonify({'error': 'bed_id and source must be strings'}), 400
+        source = source.strip()
+        if not bed_id or not source:
+            return jsonify({'error': 'bed_id and source are required'}), 400
+        try:
+            monitor = ward_monitor.add_bed(bed_id, source, data.get('patientId'), data.get('patientName'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        conn = get_db_connection()
+        conn.execute('''INSERT OR REPLACE INTO ward_beds (bed_id, source, patient_id, patient_name, created_at)
+                        VALUES (?, ?, ?, ?, ?)''',
+                     (bed_id, source, data.get('patientId'), data.get('patientName'), datetime.now().isoformat()))
+        conn.commit()
+        conn.close()
+        return jsonify(monitor.info()), 201
+
+    start_ward_monitor()
+    return jsonify({'beds': ward_monitor.beds()})
+
+@app.route('/api/ward/beds/<bed_id>', methods=['DELETE'])
+def remove_ward_bed(bed_id):
+    removed = ward_monitor.remove_bed(bed_id)
+    conn = get_db_connection()
+    deleted = conn.execute("DELETE FROM ward_beds WHERE bed_id = ?", (bed_id,)).rowcount
+    conn.commit()
+    conn.close()
+    if not removed and not deleted:
+        return jsonify({'error': 'Unknown bed'}), 404
+    return jsonify({'success': True})
+
+def ward_bed_metadata(bed_id):
+    """First event of a bed feed, shaped like the metadata of a live stream"""
+    return {
+        'type': 'metadata',
+        'bed_id': bed_id,
+        'duration': 0,
+        'fps': 0,
+        'total_frames': 0,
+        'isLive': True
+    }
+
+@app.route('/api/ward/beds/<bed_id>/events', methods=['GET'])
+def ward_bed_events(bed_id):
+    """NDJSON feed of one bed's frame, alert and error events, as they happen"""
+    start_ward_monitor()
+    monitor = ward_monitor.get(bed_id)
+    if monitor is None:
+        return jsonify({'error': 'Unknown bed'}), 404
+
+    def generate():
+        events = monitor.subscribe()
+        try:
+            yield json.dumps(ward_bed_metadata(bed_id)) + '\n'
+            if monitor.last_event is not None:
+                yield json.dumps(monitor.last_event) + '\n'
+            while ward_monitor.get(bed_id) is monitor:
+                try:
+                    event = events.get(timeout=15)
+                except queue.Empty:
+                    continue
+                yield json.dumps(event) + '\n'
+        finally:
+            monitor.unsubscribe(events)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+# --- EVENT CHANNEL ---
+
+def event_stream_args(headers, args):
+    """(last_event_id, username, types) of an /api/events request"""
+    last_event_id = headers.get('Last-Event-ID') or args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    types = {t for t in args.get('types', '').split(',') if t} or None
+    return last_event_id, args.get('username'), types
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+@app.route('/api/events', methods=['GET'])
+def event_stream():
+    """Server-sent events: alert, alert_acknowledged, alert_deleted, history_cleared,
+    message, messages_read, presence and duty. Resumes after Last-Event-ID."""
+    last_event_id, username, types = event_stream_args(request.headers, request.args)
+    return Response(stream_with_context(event_log.stream(last_event_id, username, types)),
+                    mimetype='text/event-stream', headers=SSE_HEADERS)
+
 
 # --- CHAT ENDPOINTS ---
 
@@ -1277,82 +1817,40 @@ def get_chat_users():
     current_user = request.args.get('current_user') # Keep for identifying history later
     conn = get_db_connection()
     try:
-        # Show all nurses/users, only exclude those with 'admin' role
-        # Also dynamically update who is online based on last_seen (within 60 seconds)
-        cursor = conn.execute("SELECT username, name, role, photo_url, phone, nurse_id, joined_date, address, is_online, last_seen FROM nurses WHERE role != 'admin'")
-        raw_users = [dict(row) for row in cursor.fetchall()]
-        
-        users = []
-        now = datetime.now()
-        for user in raw_users:
-            is_online = user['is_online'] == 1
-            if is_online and user['last_seen']:
-                try:
-                    last_seen = datetime.fromisoformat(user['last_seen'])
-                    if (now - last_seen).total_seconds() > 60:
-                        is_online = False
-                        # Update DB to persist this offline status
-                        try:
-                            conn_update = get_db_connection()
-                            conn_update.execute("UPDATE nurses SET is_online = 0 WHERE username = ?", (user['username'],))
-                            conn_update.commit()
-                            conn_update.close()
-                        except:
-                            pass
-                except:
-                    pass
-            
-            user['is_online'] = 1 if is_online else 0
-            users.append(user)
-        
-        # Optionally add last message info for each user
-        for user in users:
-            last_msg_cursor = conn.execute('''
-                SELECT text, timestamp FROM messages 
-                WHERE (sender_username = ? AND recipient_username = ?)
-                OR (sender_username = ? AND recipient_username = ?)
-                ORDER BY id DESC LIMIT 1
-            ''', (current_user, user['username'], user['username'], current_user))
-            last_msg = last_msg_cursor.fetchone()
-            if last_msg:
-                user['last_message'] = last_msg['text']
-                user['last_timestamp'] = last_msg['timestamp']
-            else:
-                user['last_message'] = None
-                user['last_timestamp'] = None
-            
-            # Add unread counts
-            unread_cursor = conn.execute('''
-                SELECT COUNT(*) FROM messages 
-                WHERE sender_username = ? AND recipient_username = ? AND is_read = 0
-            ''', (user['username'], current_user))
-            user['unread_count'] = unread_cursor.fetchone()[0]
-                
-        return jsonify(users)
+        # Show all nurses/users, only exclude those with 'admin' role,
+        # with online status from the presence tracker
+        return jsonify(chat_users(conn, current_user))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
         conn.close()
 
+CHAT_HISTORY_QUERY = '''
+    SELECT * FROM messages 
+    WHERE (sender_username = ? AND recipient_username = ?)
+    OR (sender_username = ? AND recipient_username = ?)
+    ORDER BY id ASC
+'''
+
+CHAT_MARK_READ_QUERY = '''
+    UPDATE messages SET is_read = 1 
+    WHERE sender_username = ? AND recipient_username = ? AND is_read = 0
+'''
+
 @app.route('/api/chat/history/<recipient>', methods=['GET'])
 def get_chat_history(recipient):
     sender = request.args.get('sender')
     conn = get_db_connection()
     try:
-        cursor = conn.execute('''
-            SELECT * FROM messages 
-            WHERE (sender_username = ? AND recipient_username = ?)
-            OR (sender_username = ? AND recipient_username = ?)
-            ORDER BY id ASC
-        ''', (sender, recipient, recipient, sender))
+        cursor = conn.execute(CHAT_HISTORY_QUERY, (sender, recipient, recipient, sender))
         history = [dict(row) for row in cursor.fetchall()]
         
         # Mark messages as read
-        conn.execute('''
-            UPDATE messages SET is_read = 1 
-            WHERE sender_username = ? AND recipient_username = ?
-        ''', (recipient, sender))
+        marked = conn.execute(CHAT_MARK_READ_QUERY, (recipient, sender)).rowcount
         conn.commit()
+        if marked:
+            event_log.publish('messages_read', {'reader': sender, 'sender': recipient, 'count': marked},
+                              audience=[sender, recipient])
         
         return jsonify(history)
     except Exception as e:
@@ -1365,18 +1863,29 @@ def send_message():
     data = request.get_json()
     conn = get_db_connection()
     try:
-        conn.execute('''
+        message = {
+            'sender_username': data['sender'],
+            'recipient_username': data['recipient'],
+            'text': data['text'],
+            'timestamp': datetime.now().isoformat(),
+            'is_read': 0,
+            'type': data.get('type', 'text'),
+            'media_url': data.get('media_url')
+        }
+        cursor = conn.execute('''
             INSERT INTO messages (sender_username, recipient_username, text, timestamp, type, media_url)
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (
-            data['sender'], 
-            data['recipient'], 
-            data['text'], 
-            datetime.now().isoformat(),
-            data.get('type', 'text'),
-            data.get('media_url')
+            message['sender_username'], 
+            message['recipient_username'], 
+            message['text'], 
+            message['timestamp'],
+            message['type'],
+            message['media_url']
         ))
         conn.commit()
+        message['id'] = cursor.lastrowid
+        event_log.publish('message', message, audience=[message['sender_username'], message['recipient_username']])
         return jsonify({"status": "success"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1414,7 +1923,18 @@ def serve_chat_media(filename):
     return send_from_directory(CHAT_AUDIO_FOLDER, filename)
 
 # --- DUTY BROADCAST ENDPOINTS ---
-duty_broadcasts = []
+# Broadcasts live in the duty_broadcasts table, so every worker process serves the same ones
+
+# Broadcasts kept; older ones are deleted as new ones arrive
+DUTY_BROADCAST_CAPACITY = int(os.environ.get('DUTY_BROADCAST_CAPACITY', 100))
+
+# GET /api/duty/broadcasts without ?since= returns the broadcasts of this many seconds
+DUTY_RECENT_SECONDS = 10
+
+DUTY_SELECT = 'SELECT seq, id, nurse_name AS nurseName, timestamp, message FROM duty_broadcasts'
+DUTY_SINCE_QUERY = DUTY_SELECT + ' WHERE seq > ? ORDER BY seq LIMIT ?'
+DUTY_RECENT_QUERY = DUTY_SELECT + ' WHERE timestamp >= ? ORDER BY timestamp'
+DUTY_TRIM_QUERY = 'DELETE FROM duty_broadcasts WHERE seq <= ?'
 
 @app.route('/api/duty/broadcast', methods=['POST'])
 def duty_broadcast():
@@ -1431,13 +1951,18 @@ def duty_broadcast():
             'message': f"{data['nurseName']} is now On Duty 👋"
         }
         
-        # Keep only last 20 broadcasts and remove those older than 30 seconds
-        global duty_broadcasts
-        current_time = time.time()
-        duty_broadcasts = [b for b in duty_broadcasts if (current_time - b['timestamp']) < 30]
-        duty_broadcasts.append(new_broadcast)
-        if len(duty_broadcasts) > 20:
-            duty_broadcasts.pop(0)
+        conn = get_db_connection()
+        try:
+            new_broadcast['seq'] = conn.execute(
+                "INSERT INTO duty_broadcasts (id, nurse_name, message, timestamp) VALUES (?, ?, ?, ?) RETURNING seq",
+                (broadcast_id, new_broadcast['nurseName'], new_broadcast['message'], new_broadcast['timestamp'])
+            ).fetchone()[0]
+            # Ring buffer: drop whatever fell out of the last DUTY_BROADCAST_CAPACITY
+            conn.execute(DUTY_TRIM_QUERY, (new_broadcast['seq'] - DUTY_BROADCAST_CAPACITY,))
+            conn.commit()
+        finally:
+            conn.close()
+        event_log.publish('duty', new_broadcast)
             
         return jsonify({"status": "success", "broadcast_id": broadcast_id})
     except Exception as e:
@@ -1445,13 +1970,32 @@ def duty_broadcast():
 
 @app.route('/api/duty/broadcasts', methods=['GET'])
 def get_duty_broadcasts():
+    """Broadcasts after ?since=<seq> as {"broadcasts", "last_seq", "missed"}; without it, the list of the last 10 seconds"""
+    since = request.args.get('since', type=int)
+    conn = get_db_connection()
     try:
-        current_time = time.time()
-        # Return broadcasts from the last 10 seconds to account for polling delays
-        recent = [b for b in duty_broadcasts if (current_time - b['timestamp']) < 10]
-        return jsonify(recent)
+        if since is None:
+            # Return broadcasts from the last 10 seconds to account for polling delays
+            recent = conn.execute(DUTY_RECENT_QUERY, (time.time() - DUTY_RECENT_SECONDS,)).fetchall()
+            return jsonify([dict(row) for row in recent])
+
+        limit = max(1, min(request.args.get('limit', DUTY_BROADCAST_CAPACITY, type=int), DUTY_BROADCAST_CAPACITY))
+        broadcasts = [dict(row) for row in conn.execute(DUTY_SINCE_QUERY, (since, limit))]
+        if broadcasts:
+            last_seq = broadcasts[-1]['seq']
+        else:
+            # A since beyond the newest seq (e.g. a recreated database) is moved back so the client catches up
+            last_seq = min(since, conn.execute("SELECT COALESCE(MAX(seq), 0) FROM duty_broadcasts").fetchone()[0])
+        return jsonify({
+            "broadcasts": broadcasts,
+            "last_seq": last_seq,
+            # Broadcasts after since were already dropped from the ring buffer
+            "missed": bool(broadcasts) and broadcasts[0]['seq'] > since + 1,
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
 
 # --- PATIENT MANAGEMENT ENDPOINTS ---
 
@@ -1698,6 +2242,10 @@ if __name__ == '__main__':
             view_database()
         elif command == 'inspect-db':
             inspect_db()
+        elif command == 'explain-db':
+            sys.exit(0 if explain_db() else 1)
+        elif command == 'export-onnx':
+            export_onnx_model()
         elif command == 'init-db':
             try:
                 init_db()
@@ -1710,13 +2258,16 @@ if __name__ == '__main__':
             print("  python app.py sync-db   # Sync DB from hidden folder to local snapshot")
             print("  python app.py view-db   # View DB contents")
             print("  python app.py inspect-db # Export DB schema to JSON")
+            print("  python app.py explain-db # Check hot queries use indexes (exits 1 on a full table scan)")
             print("  python app.py init-db   # Initialize database tables")
+            print("  python app.py export-onnx # Export best_model.pth to best_model.onnx")
         else:
             print(f"Unknown command: {command}")
             print("Use 'python app.py help' for available commands.")
     else:
         # Default behavior: Start Server
         print("🚀 Starting ThermalVision AI Server...")
+        ensure_model()
         print(f"📁 Model loaded: {model is not None}")
         print(f"🎯 Available classes: {classes}")
         print("🌐 Server running on http://127.0.0.1:5000")
@@ -1732,6 +2283,10 @@ if __name__ == '__main__':
         print("   DELETE /api/history/<id> - Delete history record")
         print("   DELETE /api/alert/<id> - Delete alert record")
         print("   DELETE /api/history/all - Clear all history/alerts")
+        print("   GET  /api/ward/beds/<bed_id>/events - Live event feed of a monitored bed")
         
+        # With the debug reloader the server runs in a child process; only that one monitors beds
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            start_ward_monitor()
         app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -0,0 +1,268 @@
+"""ASGI entry point: the analysis streams as coroutines, every other route served by the Flask app.
+
+Under gthread each open analysis stream holds a worker thread for as long as
+it runs, mostly asleep between frames, so a few dozen viewers exhaust the pool
+and REST calls queue behind them. Here a stream is a coroutine that costs
+nothing while idle: OpenCV calls run on a small decode pool, frames are
+classified through the app's micro-batching scheduler and real-time pacing is
+an asyncio.sleep. The Flask routes keep a thread pool of their own, so they are
+never starved by streams. Live cameras still need one drain thread each
+(LatestFrameReader), as a blocking grab() cannot be awaited.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Run a single worker process: the scheduler, ward monitor and stream registry
+live in the process, exactly as with the gthread worker.
+"""
+import asyncio
+import contextlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as server
+from stream_pipeline import SAMPLE_INTERVAL, NoMovementDetector, frame_event, alert_event
+from events import KEEPALIVE, KEEPALIVE_SECONDS, RETRY_MS, format_event
+from uploads import receive_multipart
+from video_io import LatestFrameReader, iter_timed_samples
+
+# Threads serving the Flask routes (what --threads was for gthread)
+ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 32))
+
+# Threads for blocking OpenCV calls of the async streams (opening sources, decoding samples)
+ASGI_DECODE_THREADS = int(os.environ.get('ASGI_DECODE_THREADS', 8))
+
+# Seconds between keep-alive checks of an idle bed feed
+FEED_POLL_SECONDS = 15
+
+decode_executor = ThreadPoolExecutor(ASGI_DECODE_THREADS, thread_name_prefix='asgi-decode')
+
+def ndjson(event):
+    return json.dumps(event) + '\n'
+
+async def analysis_stream(source, patient_id, patient_name, is_file=True, cleanup_file=None):
+    """Coroutine version of app.generate_analysis_stream, emitting the same events"""
+    import cv2
+    loop = asyncio.get_running_loop()
+    source = server.normalize_source(source)
+    reader = None
+    pending = None
+
+    def close():
+        # Runs on the decode pool once no decode is in flight
+        if reader is not None:
+            reader.release()
+        else:
+            cap.release()
+        if cleanup_file and os.path.exists(cleanup_file):
+            os.remove(cleanup_file)
+
+    cap = await loop.run_in_executor(decode_executor, cv2.VideoCapture, source)
+    try:
+        if not cap.isOpened():
+            error_msg = f"Could not open source: {source}"
+            print(f"ERROR: {error_msg}")
+            yield ndjson({'type': 'error', 'message': error_msg})
+            return
+
+        fps, metadata = server.stream_metadata(cap, source)
+        yield ndjson(metadata)
+
+        if is_file:
+            samples = iter_timed_samples(cap, fps, SAMPLE_INTERVAL)
+
+            def next_sample():
+                sample = next(samples, None)
+                return sample and (*sample, time.time())
+        else:
+            reader = LatestFrameReader(cap)
+
+            def next_sample():
+                item = reader.read()
+                if item is None:
+                    return None
+                frame_number, grabbed_at, msec, frame = item
+                timestamp = msec / 1000.0 if msec > 0 else (frame_number / fps)
+                return timestamp, frame_number, frame, grabbed_at
+
+        start_analysis_time = time.time()
+        next_live_sample = start_analysis_time
+        detector = NoMovementDetector(threshold=5.0)
+
+        pending = decode_executor.submit(next_sample)
+        while True:
+            sample = await asyncio.wrap_future(pending)
+            if sample is None:
+                break
+            timestamp, current_frame, frame, captured_at = sample
+            if is_file:
+                # Decode the next second of video while this frame is classified and paced
+                pending = decode_executor.submit(next_sample)
+
+            prediction, confidence, _ = await asyncio.wrap_future(server.scheduler.submit(frame))
+            latency_ms = round((time.time() - captured_at) * 1000, 1)
+
+            if is_file:
+                # Don't run faster than the video itself
+                delay = timestamp - (time.time() - start_analysis_time)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            stable_duration = detector.update(timestamp, prediction)
+            if stable_duration is not None:
+                alert_id = f"alert_{int(time.time()*1000)}"
+                # Only queues the row (see write_behind.py), so it can run on the event loop
+                server.insert_stream_alert(alert_id, patient_id, patient_name, prediction, stable_duration)
+                yield ndjson(alert_event(alert_id, timestamp, prediction, stable_duration))
+
+            yield ndjson(frame_event(timestamp, current_frame, prediction, confidence, latency_ms))
+
+            if not is_file:
+                # Live sources: analyze the newest frame once per interval
+                next_live_sample += SAMPLE_INTERVAL
+                delay = next_live_sample - time.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    next_live_sample = time.time()
+                pending = decode_executor.submit(next_sample)
+    except Exception as e:
+        yield ndjson({'type': 'error', 'message': str(e)})
+    finally:
+        # Never await here: a disconnected client cancels this generator
+        try:
+            if pending is None or pending.done():
+                decode_executor.submit(close)
+            else:
+                pending.add_done_callback(lambda _: decode_executor.submit(close))
+        except RuntimeError:
+            pass  # executor shut down with the process
+
+async def model_loaded():
+    # The first stream of the process loads the model; keep that off the event loop
+    await run_in_threadpool(server.ensure_model)
+    return server.model is not None
+
+async def stream_video_analysis(request):
+    fields, files = await receive_multipart(request.headers.get('content-type'), request.stream())
+    upload = files.pop('file', None)
+    for extra in files.values():
+        os.remove(extra.name)
+    if upload is None:
+        return JSONResponse({'error': 'No file part'}, status_code=400)
+    if not await model_loaded():
+        os.remove(upload.name)
+        return JSONResponse({'error': 'Model not loaded'}, status_code=503)
+
+    # The stream deletes the spooled upload when it ends
+    return StreamingResponse(
+        analysis_stream(upload.name, fields.get('patientId'), fields.get('patientName'),
+                        is_file=True, cleanup_file=upload.name),
+        media_type='application/x-ndjson'
+    )
+
+async def stream_rtsp_analysis(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or 'url' not in data:
+        return JSONResponse({'error': 'No RTSP URL provided'}, status_code=400)
+    if not await model_loaded():
+        return JSONResponse({'error': 'Model not loaded'}, status_code=503)
+
+    return StreamingResponse(
+        analysis_stream(data['url'], data.get('patientId'), data.get('patientName'), is_file=False),
+        media_type='application/x-ndjson'
+    )
+
+async def ward_bed_events(request):
+    """NDJSON feed of one bed's events, delivered to this coroutine by the bed's thread"""
+    bed_id = request.path_params['bed_id']
+    await run_in_threadpool(server.start_ward_monitor)
+    monitor = server.ward_monitor.get(bed_id)
+    if monitor is None:
+        return JSONResponse({'error': 'Unknown bed'}, status_code=404)
+
+    async def generate():
+        events = monitor.subscribe_async(asyncio.get_running_loop())
+        try:
+            yield ndjson(server.ward_bed_metadata(bed_id))
+            if monitor.last_event is not None:
+                yield ndjson(monitor.last_event)
+            while server.ward_monitor.get(bed_id) is monitor:
+                try:
+                    event = await asyncio.wait_for(events.get(), FEED_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    continue
+                yield ndjson(event)
+        finally:
+            monitor.unsubscribe(events)
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+async def event_stream(request):
+    """/api/events as a coroutine: woken by the event log instead of holding a thread"""
+    last_event_id, username, types = server.event_stream_args(request.headers, request.query_params)
+    event_log = server.event_log
+
+    async def generate():
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def listener():
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+        event_log.add_listener(listener)
+        try:
+            cursor, reset = await run_in_threadpool(event_log.start, last_event_id)
+            yield f"retry: {RETRY_MS}\n\n"
+            if reset:
+                yield format_event(cursor, 'reset', '{}')
+            while True:
+                wake.clear()
+                events, cursor, more = await run_in_threadpool(event_log.since, cursor, username, types)
+                for event in events:
+                    yield event
+                if more or (event_log.last_id or 0) > cursor:
+                    continue
+                try:
+                    await asyncio.wait_for(wake.wait(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+        finally:
+            event_log.remove_listener(listener)
+
+    return StreamingResponse(generate(), media_type='text/event-stream', headers=server.SSE_HEADERS)
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    server.start_ward_monitor()
+    yield
+    server.ward_monitor.stop()
+
+# Flask-CORS covers the mounted app; the native routes need their own headers
+cors = [Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])]
+
+app = Starlette(
+    routes=[
+        Route('/stream_video_analysis', stream_video_analysis, methods=['POST', 'OPTIONS'], middleware=cors),
+        Route('/stream_rtsp_analysis', stream_rtsp_analysis, methods=['POST', 'OPTIONS'], middleware=cors),
+        Route('/api/ward/beds/{bed_id}/events', ward_bed_events, methods=['GET', 'OPTIONS'], middleware=cors),
+        Route('/api/events', event_stream, methods=['GET', 'OPTIONS'], middleware=cors),
+        Mount('/', app=WSGIMiddleware(server.app, workers=ASGI_WSGI_THREADS)),
+    ],
+    lifespan=lifespan,
+)
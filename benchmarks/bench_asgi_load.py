@@ -0,0 +1,107 @@
+"""REST latency while --streams video analysis streams are open: gthread worker vs ASGI.
+
+Starts the server the way the Procfile does (gunicorn gthread, then uvicorn
+asgi:app) with a scratch HOME so the real database is untouched, opens --streams
+concurrent /stream_video_analysis uploads, and while they run polls
+/api/alerts and /health, reporting latency percentiles and timeouts.
+
+python benchmarks/bench_asgi_load.py --streams 50 --seconds 15
+"""
+import argparse, asyncio, os, statistics, subprocess, tempfile, time
+from pathlib import Path
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SERVERS = {
+    "gthread": ["gunicorn", "app:app", "--worker-class", "gthread", "--threads", "32", "--bind", "127.0.0.1:{port}"],
+    "asgi": ["uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", "{port}"],
+}
+
+def start_server(mode, port):
+    home = tempfile.mkdtemp()
+    env = dict(os.environ, HOME=home, WARD_MONITOR_ENABLED="0")
+    cmd = [part.format(port=port) for part in SERVERS[mode]]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=2).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+async def stream(client, url, video, frames, first_frame):
+    with open(video, "rb") as f:
+        data = f.read()
+    start = time.perf_counter()
+    async with client.stream("POST", url + "/stream_video_analysis", files={"file": ("clip.mp4", data, "video/mp4")},
+                             data={"patientId": "bench"}) as response:
+        async for line in response.aiter_lines():
+            if '"frame"' in line:
+                if not frames:
+                    first_frame.append(time.perf_counter() - start)
+                frames.append(line)
+
+async def poll(client, url, path, seconds, latencies, timeouts):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        try:
+            r = await client.get(url + path, timeout=30)
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+        except httpx.HTTPError:
+            timeouts.append(path)
+        await asyncio.sleep(0.2)
+
+async def load(url, video, streams, seconds, warmup):
+    limits = httpx.Limits(max_connections=streams + 10, max_keepalive_connections=streams + 10)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        baseline = []
+        await poll(client, url, "/api/alerts", 2, baseline, [])
+        frame_counts = [[] for _ in range(streams)]
+        first_frames = []
+        tasks = [asyncio.create_task(stream(client, url, video, frames, first_frames)) for frames in frame_counts]
+        await asyncio.sleep(warmup)
+        latencies, timeouts = [], []
+        await asyncio.gather(poll(client, url, "/api/alerts", seconds, latencies, timeouts),
+                             poll(client, url, "/health", seconds, latencies, timeouts))
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return baseline, latencies, timeouts, frame_counts, first_frames
+
+def pct(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else (values[0] if values else float("nan"))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", default=str(ROOT / "test" / "test.mp4"))
+    ap.add_argument("--streams", type=int, default=50)
+    ap.add_argument("--seconds", type=float, default=15)
+    ap.add_argument("--warmup", type=float, default=3, help="Seconds between opening the streams and polling")
+    ap.add_argument("--modes", nargs="+", default=list(SERVERS))
+    args = ap.parse_args()
+
+    print(f"{args.streams} concurrent streams of {Path(args.video).name}, polling for {args.seconds:.0f}s\n")
+    print(f"{'mode':<8} {'idle p50':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'requests':>9} {'timeouts':>9} "
+          f"{'streams w/ frames':>18} {'1st frame s':>12}")
+    for i, mode in enumerate(args.modes):
+        port = 5600 + i
+        proc = start_server(mode, port)
+        try:
+            baseline, latencies, timeouts, frame_counts, first_frames = asyncio.run(
+                load(f"http://127.0.0.1:{port}", args.video, args.streams, args.seconds, args.warmup))
+        finally:
+            proc.terminate()
+            proc.wait(30)
+        served = sum(1 for frames in frame_counts if frames)
+        print(f"{mode:<8} {pct(baseline, 50):>9.1f} {pct(latencies, 50):>8.1f} {pct(latencies, 95):>8.1f} "
+              f"{max(latencies, default=float('nan')):>8.1f} {len(latencies):>9} {len(timeouts):>9} "
+              f"{served:>11}/{args.streams:<6} {pct(first_frames, 50):>12.1f}")
+
+if __name__ == "__main__":
+    main()
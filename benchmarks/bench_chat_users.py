@@ -0,0 +1,112 @@
+"""/api/chat/users: per-user queries (N+1) vs. the single aggregated query.
+
+Seeds a scratch database with --users users and --messages messages between
+random pairs of them, then builds the chat user list for a few users both
+ways. Reports statements executed and latency, and checks that both return
+the same rows.
+
+python benchmarks/bench_chat_users.py --users 500 --messages 1000000
+"""
+import argparse, os, random, statistics, sys, tempfile, time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ["WARD_MONITOR_ENABLED"] = "0"
+os.environ["HOME"] = tempfile.mkdtemp()
+import app
+
+def seed(conn, users, messages):
+    now = datetime.now()
+    conn.executemany("INSERT INTO nurses (username, password, name, role, is_online, last_seen) VALUES (?, ?, ?, 'user', ?, ?)",
+                     [(f"user{i}", "x", f"User {i}", i % 3 == 0,
+                       (now - timedelta(seconds=random.choice((5, 600)))).isoformat()) for i in range(users)])
+    start = now - timedelta(days=90)
+    batch = []
+    for i in range(messages):
+        sender, recipient = random.sample(range(users), 2)
+        batch.append((f"user{sender}", f"user{recipient}", f"message {i}",
+                      (start + timedelta(seconds=i * 7)).isoformat(), int(random.random() > 0.05)))
+        if len(batch) == 100000:
+            conn.executemany("INSERT INTO messages (sender_username, recipient_username, text, timestamp, is_read) "
+                             "VALUES (?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO messages (sender_username, recipient_username, text, timestamp, is_read) "
+                         "VALUES (?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.execute("ANALYZE")
+
+def legacy_chat_users(conn, current_user):
+    """The previous implementation: one user query, then two queries (and maybe an update) per user"""
+    raw_users = [dict(row) for row in conn.execute(
+        "SELECT username, name, role, photo_url, phone, nurse_id, joined_date, address, is_online, last_seen "
+        "FROM nurses WHERE role != 'admin'")]
+    users = []
+    now = datetime.now()
+    for user in raw_users:
+        is_online = user['is_online'] == 1
+        if is_online and user['last_seen']:
+            if (now - datetime.fromisoformat(user['last_seen'])).total_seconds() > app.PRESENCE_TIMEOUT_SECONDS:
+                is_online = False
+                conn.execute("UPDATE nurses SET is_online = 0 WHERE username = ?", (user['username'],))
+                conn.commit()
+        user['is_online'] = 1 if is_online else 0
+        users.append(user)
+    for user in users:
+        last_msg = conn.execute('''
+            SELECT text, timestamp FROM messages
+            WHERE (sender_username = ? AND recipient_username = ?)
+            OR (sender_username = ? AND recipient_username = ?)
+            ORDER BY id DESC LIMIT 1
+        ''', (current_user, user['username'], user['username'], current_user)).fetchone()
+        user['last_message'] = last_msg['text'] if last_msg else None
+        user['last_timestamp'] = last_msg['timestamp'] if last_msg else None
+        user['unread_count'] = conn.execute('''
+            SELECT COUNT(*) FROM messages
+            WHERE sender_username = ? AND recipient_username = ? AND is_read = 0
+        ''', (user['username'], current_user)).fetchone()[0]
+    return users
+
+def aggregated_chat_users(conn, current_user):
+    return app.chat_users(conn, current_user)
+
+def measure(fn, conn, current_users, repeat):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    timings, results = [], {}
+    for current_user in current_users:
+        for _ in range(repeat):
+            statements.clear()
+            start = time.perf_counter()
+            results[current_user] = fn(conn, current_user)
+            timings.append(time.perf_counter() - start)
+    conn.set_trace_callback(None)
+    return timings, len(statements), results
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--messages", type=int, default=1000000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    conn = app.get_db_connection()
+    start = time.perf_counter()
+    seed(conn, args.users, args.messages)
+    print(f"seeded {args.users} users / {args.messages} messages in {time.perf_counter() - start:.1f}s\n")
+
+    current_users = ["user1", "user2", "user3"]
+    print(f"{'implementation':<12} {'statements':>11} {'p50 ms':>9} {'p95 ms':>9}")
+    results = {}
+    for name, fn in (("n+1", legacy_chat_users), ("aggregated", aggregated_chat_users)):
+        timings, statements, results[name] = measure(fn, conn, current_users, args.repeat)
+        q = statistics.quantiles(timings, n=20)
+        print(f"{name:<12} {statements:>11} {statistics.median(timings) * 1000:>9.1f} {q[18] * 1000:>9.1f}")
+
+    same = all(results["n+1"][u] == results["aggregated"][u] for u in current_users)
+    print(f"\nidentical results: {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Decode throughput of the /predict_video_frames sampler: read-every-frame vs grab() vs seek.
+
+python benchmarks/bench_decode.py --video test/test.mp4
+"""
+import argparse, sys, time
+from pathlib import Path
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from video_io import iter_sampled_frames
+
+def read_every_frame(cap, step):
+    # The original loop: decode and retrieve everything, keep one frame in step
+    current_frame = 0
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if current_frame % step == 0:
+            yield current_frame, frame
+        current_frame += 1
+
+def run(video, mode, step):
+    cap = cv2.VideoCapture(video)
+    start = time.perf_counter()
+    if mode == "read":
+        frames = list(read_every_frame(cap, step))
+    else:
+        frames = list(iter_sampled_frames(cap, step, mode=mode))
+    elapsed = time.perf_counter() - start
+    cap.release()
+    return elapsed, frames
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", default="test/test.mp4")
+    ap.add_argument("--step", type=int, help="Frames between samples (default: 1 per second)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    cap = cv2.VideoCapture(args.video)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    step = args.step or int(fps)
+    print(f"{args.video}: {total} frames at {fps:.1f} fps, sampling every {step} frames")
+
+    reference = None
+    print(f"\n{'mode':<6} {'seconds':>8} {'video fps':>10} {'sampled':>8}  identical")
+    for mode in ("read", "grab", "seek"):
+        elapsed, frames = min((run(args.video, mode, step) for _ in range(args.repeat)), key=lambda r: r[0])
+        if reference is None:
+            reference = frames
+        identical = (len(frames) == len(reference) and
+                     all(a[0] == b[0] and np.array_equal(a[1], b[1]) for a, b in zip(frames, reference)))
+        print(f"{mode:<6} {elapsed:>8.2f} {total / elapsed:>10.1f} {len(frames):>8}  {'yes' if identical else 'NO'}")
+
+if __name__ == "__main__":
+    main()
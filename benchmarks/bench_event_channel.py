@@ -0,0 +1,125 @@
+"""Dashboard clients polling vs. subscribed to /api/events.
+
+Starts uvicorn asgi:app with a scratch HOME, connects --clients clients for
+--seconds and raises one alert every --event-interval seconds. Polling clients
+repeat the old app timers (pending alerts every 5 s, chat users every 4 s,
+duty broadcasts every 3 s); event clients hold one /api/events stream each.
+Reports HTTP requests made, server CPU time and how long clients took to see
+each alert.
+
+python benchmarks/bench_event_channel.py --clients 50 --seconds 30
+"""
+import argparse, asyncio, json, os, random, statistics, subprocess, tempfile, time
+from pathlib import Path
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+POLLS = [("/api/alerts?status=pending", 5.0), ("/api/chat/users?current_user={user}", 4.0), ("/api/duty/broadcasts", 3.0)]
+
+def start_server(port):
+    env = dict(os.environ, HOME=tempfile.mkdtemp(), WARD_MONITOR_ENABLED="0")
+    proc = subprocess.Popen(["uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port)],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=2).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+class Run:
+    def __init__(self):
+        self.requests = 0
+        self.raised = {}    # alert id -> time raised
+        self.seen = []      # seconds from raise to a client seeing it
+
+    def saw(self, alert_id, seen_ids):
+        if alert_id in self.raised and alert_id not in seen_ids:
+            seen_ids.add(alert_id)
+            self.seen.append(time.perf_counter() - self.raised[alert_id])
+
+async def poller(client, url, user, run, end):
+    seen_ids = set()
+    async def loop(path, interval):
+        await asyncio.sleep(random.uniform(0, interval))
+        while time.perf_counter() < end:
+            r = await client.get(url + path.format(user=user))
+            run.requests += 1
+            if path.startswith("/api/alerts"):
+                for alert in r.json()["alerts"]:
+                    run.saw(alert["id"], seen_ids)
+            await asyncio.sleep(interval)
+    await asyncio.gather(*(loop(path, interval) for path, interval in POLLS))
+
+async def subscriber(client, url, user, run, end):
+    seen_ids = set()
+    run.requests += 1
+    async with client.stream("GET", f"{url}/api/events?username={user}") as response:
+        event_type = None
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event_type = line[6:].strip()
+            elif line.startswith("data:") and event_type == "alert":
+                run.saw(json.loads(line[5:])["id"], seen_ids)
+            if time.perf_counter() >= end:
+                break
+
+async def raise_alerts(client, url, run, end, interval):
+    i = 0
+    while time.perf_counter() < end - interval:
+        await asyncio.sleep(interval)
+        alert_id = f"bench_{i}"
+        run.raised[alert_id] = time.perf_counter()
+        await client.post(url + "/api/alert", json={"id": alert_id, "patientId": "P1", "patientName": "Bench",
+                                                    "position": "supine", "duration": "5.0", "status": "pending",
+                                                    "type": "No Movement Detected", "timestamp": "now"})
+        i += 1
+
+async def load(url, mode, clients, seconds, event_interval):
+    run = Run()
+    end = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=clients * 3 + 10)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        worker = poller if mode == "poll" else subscriber
+        tasks = [asyncio.create_task(worker(client, url, f"nurse{i % 5 + 1}", run, end)) for i in range(clients)]
+        await raise_alerts(client, url, run, end, event_interval)
+        await asyncio.wait(tasks, timeout=max(0.0, end - time.perf_counter()) + 5)
+        for task in tasks:
+            task.cancel()
+    return run
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=50)
+    ap.add_argument("--seconds", type=float, default=30)
+    ap.add_argument("--event-interval", type=float, default=2.0)
+    args = ap.parse_args()
+
+    print(f"{args.clients} clients for {args.seconds:.0f}s, one alert every {args.event_interval:.0f}s\n")
+    print(f"{'mode':<7} {'requests':>9} {'req/s':>7} {'server cpu s':>13} {'seen p50 s':>11} {'seen p95 s':>11} {'deliveries':>11}")
+    for i, mode in enumerate(("poll", "events")):
+        port = 5700 + i
+        proc = start_server(port)
+        try:
+            cpu_before = cpu_seconds(proc.pid)
+            run = asyncio.run(load(f"http://127.0.0.1:{port}", mode, args.clients, args.seconds, args.event_interval))
+            cpu = cpu_seconds(proc.pid) - cpu_before
+        finally:
+            proc.terminate()
+            proc.wait(30)
+        q = statistics.quantiles(run.seen, n=20) if len(run.seen) > 1 else [float("nan")] * 19
+        print(f"{mode:<7} {run.requests:>9} {run.requests / args.seconds:>7.1f} {cpu:>13.2f} "
+              f"{statistics.median(run.seen) if run.seen else float('nan'):>11.2f} {q[18]:>11.2f} "
+              f"{len(run.seen):>5}/{len(run.raised) * args.clients}")
+
+if __name__ == "__main__":
+    main()
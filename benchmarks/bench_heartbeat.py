@@ -0,0 +1,103 @@
+"""Heartbeat throughput: an UPDATE and commit per heartbeat vs. the presence tracker.
+
+--users nurses are created in a scratch database and logged in; --threads
+threads then post POST /api/heartbeat for random users through the Flask test
+client for --seconds. "update" is the previous handler (SELECT, UPDATE, commit
+on nurses), registered on a separate route; "tracker" is the current one.
+Reports heartbeats per second, p50/p95 latency and the database transactions
+made. Meanwhile a reader thread requests /api/chat/users, as the chat screens
+do, and its latency is reported too.
+
+python benchmarks/bench_heartbeat.py --users 500 --threads 16 --seconds 5
+"""
+import argparse, os, random, statistics, sys, tempfile, threading, time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ["WARD_MONITOR_ENABLED"] = "0"
+os.environ["HOME"] = tempfile.mkdtemp()
+import app
+from flask import jsonify, request
+
+def legacy_heartbeat():
+    """The previous /api/heartbeat"""
+    username = request.get_json().get('username')
+    conn = app.get_db_connection()
+    row = conn.execute("SELECT is_online FROM nurses WHERE username = ?", (username,)).fetchone()
+    conn.execute("UPDATE nurses SET is_online = 1, last_seen = ? WHERE username = ?",
+                 (datetime.now().isoformat(), username))
+    conn.commit()
+    conn.close()
+    if row and row['is_online'] != 1:
+        app.publish_presence(username, True)
+    return jsonify({"status": "success"})
+
+app.app.add_url_rule('/bench/legacy_heartbeat', 'legacy_heartbeat', legacy_heartbeat, methods=['POST'])
+
+def setup(users):
+    app.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    app.init_db()
+    conn = app.get_db_connection()
+    conn.executemany("INSERT INTO nurses (username, password, name, role) VALUES (?, 'pw', ?, 'nurse')",
+                     [(f"bench{i}", f"Nurse {i}") for i in range(users)])
+    conn.commit()
+    conn.close()
+    client = app.app.test_client()
+    for i in range(users):
+        client.post('/api/login', json={'username': f"bench{i}", 'password': 'pw', 'role': 'nurse'})
+
+def run(path, users, threads, seconds):
+    setup(users)
+    lock = threading.Lock()
+    latencies, reads = [], []
+    stop = time.perf_counter() + seconds
+    transactions = app.presence.transactions
+
+    def beat():
+        client = app.app.test_client()
+        rng = random.Random()
+        times = []
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            client.post(path, json={'username': f"bench{rng.randrange(users)}"})
+            times.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(times)
+
+    def read():
+        client = app.app.test_client()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            client.get('/api/chat/users?current_user=bench0')
+            reads.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=beat) for _ in range(threads)] + [threading.Thread(target=read)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    # The previous handler commits once per heartbeat
+    commits = len(latencies) if path.startswith('/bench') else app.presence.transactions - transactions
+    return latencies, reads, commits
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=5)
+    args = ap.parse_args()
+
+    rows = [(mode, *run(path, args.users, args.threads, args.seconds))
+            for mode, path in (("update", "/bench/legacy_heartbeat"), ("tracker", "/api/heartbeat"))]
+
+    print(f"{args.users} users, {args.threads} heartbeat threads, {args.seconds:g} s\n")
+    print(f"{'mode':<8} {'beats/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'commits':>8} {'chat users p50 ms':>18}")
+    for mode, latencies, reads, commits in rows:
+        q = statistics.quantiles(latencies, n=20)
+        print(f"{mode:<8} {len(latencies) / args.seconds:>9.0f} {statistics.median(latencies) * 1000:>8.2f} "
+              f"{q[18] * 1000:>8.2f} {commits:>8} {statistics.median(reads) * 1000:>18.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Start-up cost of every entry point, measured with python -X importtime.
+
+Each entry point runs --repeat times in a fresh interpreter with a scratch
+HOME and working directory (the CLI commands write their output there).
+Reports the best wall time, the time spent importing, the slowest top-level
+imports and which of the heavy ML modules got imported. None of the entry
+points should import them: the model stack is loaded on first inference.
+
+Exits with status 1 if an entry point imports a heavy module or, with
+--budget-ms, imports for longer than that, so it can run in CI.
+
+python benchmarks/bench_import_time.py --repeat 5
+"""
+import argparse, os, re, subprocess, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = str(ROOT / "app.py")
+
+ENTRY_POINTS = {
+    "gunicorn app:app": ["-c", "import app"],
+    "uvicorn asgi:app": ["-c", "import asgi"],
+    "app.py help": [APP, "help"],
+    "app.py init-db": [APP, "init-db"],
+    "app.py view-db": [APP, "view-db"],
+    "app.py inspect-db": [APP, "inspect-db"],
+    "app.py sync-db": [APP, "sync-db"],
+    "app.py explain-db": [APP, "explain-db"],
+}
+
+HEAVY = ("torch", "torchvision", "cv2", "numpy", "onnxruntime")
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+def measure(args):
+    """(wall ms, import ms, {top-level module: cumulative ms}, set of heavy modules imported)"""
+    cwd = tempfile.mkdtemp()
+    env = dict(os.environ, HOME=cwd, WARD_MONITOR_ENABLED="0", PYTHONPATH=str(ROOT))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=cwd, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = (time.perf_counter() - start) * 1000
+    top, heavy = {}, set()
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)) / 1000, len(match.group(3)), match.group(4)
+        if indent == 0:
+            top[name] = top.get(name, 0) + cumulative
+        if name in HEAVY:
+            heavy.add(name)
+    return wall, sum(top.values()), top, heavy
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--budget-ms", type=float, help="fail if an entry point spends longer than this importing")
+    ap.add_argument("--top", type=int, default=3, help="slowest top-level imports to list")
+    args = ap.parse_args()
+
+    failed = False
+    print(f"{'entry point':<20} {'wall ms':>8} {'import ms':>10}  {'heavy':<12} slowest imports")
+    for name, command in ENTRY_POINTS.items():
+        runs = [measure(command) for _ in range(args.repeat)]
+        wall, imports, top, heavy = min(runs, key=lambda run: run[0])
+        slowest = ", ".join(f"{module} {ms:.0f}" for module, ms in sorted(top.items(), key=lambda t: -t[1])[:args.top])
+        print(f"{name:<20} {wall:>8.0f} {imports:>10.0f}  {','.join(sorted(heavy)) or '-':<12} {slowest}")
+        if heavy or (args.budget_ms and imports > args.budget_ms):
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Compare the onnxruntime backend with the torch path: output parity, startup time and RSS.
+
+python app.py export-onnx
+python benchmarks/bench_onnx.py --video test/test.mp4
+"""
+import argparse, os, subprocess, sys, time
+from pathlib import Path
+import cv2
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Max allowed absolute difference between class probabilities
+PROB_TOLERANCE = 1e-3
+
+# VmHWM is the child's own peak RSS; ru_maxrss would include the parent's footprint at fork
+STARTUP_PROBE = (
+    "import sys, app; app.ensure_model(); "
+    "hwm = [l.split()[1] for l in open('/proc/self/status') if l.startswith('VmHWM')][0]; "
+    "print(hwm); "
+    "print('model_loaded=%s torch_imported=%s' % (app.model is not None, 'torch' in sys.modules))"
+)
+
+def read_frames(video, count):
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def parity(weights, onnx_path, frames):
+    import inference
+    import onnx_backend
+
+    t_model, classes, img_size, channels = inference.load_model(weights, backend='eager')
+    o_model, _, _, _ = onnx_backend.load_model(onnx_path)
+
+    # Same input tensor through both runtimes
+    x = inference.preprocess_frames(frames, img_size, channels)
+    a = inference.predict_batch(t_model, x, classes)
+    b = onnx_backend.predict_batch(o_model, x.numpy(), classes)
+    model_diff = max(max(abs(p - q) for p, q in zip(r[2], s[2])) for r, s in zip(a, b))
+
+    # End to end, each backend with its own preprocessing
+    c = onnx_backend.predict_all(o_model, onnx_backend.get_frame_preprocess(img_size, channels), frames, classes)
+    e2e_diff = max(max(abs(p - q) for p, q in zip(r[2], s[2])) for r, s in zip(a, c))
+    agree = sum(r[0] == s[0] for r, s in zip(a, c))
+    return model_diff, e2e_diff, agree
+
+def startup(backend, runs):
+    env = dict(os.environ, INFERENCE_BACKEND=backend)
+    times, rss, probe = [], [], ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-c", STARTUP_PROBE], cwd=ROOT, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        out, _ = proc.communicate()
+        times.append(time.perf_counter() - start)
+        lines = out.strip().splitlines()
+        if len(lines) < 2:
+            return min(times), float("nan"), "probe failed"
+        rss.append(int(lines[-2]) / 1024)
+        probe = lines[-1]
+    return min(times), min(rss), probe
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--weights", default="best_model.pth")
+    ap.add_argument("--onnx", default="best_model.onnx")
+    ap.add_argument("--video", default="test/test.mp4")
+    ap.add_argument("--frames", type=int, default=32)
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    model_diff, e2e_diff, agree = parity(args.weights, args.onnx, frames)
+    print(f"{len(frames)} frames from {args.video}")
+    print(f"max |prob diff| same input:      {model_diff:.2e}")
+    print(f"max |prob diff| end to end:      {e2e_diff:.2e}  (labels agree {agree}/{len(frames)})")
+
+    print(f"\n{'backend':<8} {'startup s':>9} {'max RSS MB':>10}  probe")
+    for backend in ("eager", "onnx"):
+        t, rss, probe = startup(backend, args.runs)
+        print(f"{backend:<8} {t:>9.2f} {rss:>10.1f}  {probe}")
+
+    if model_diff > PROB_TOLERANCE or e2e_diff > PROB_TOLERANCE:
+        print(f"❌ Outputs differ by more than {PROB_TOLERANCE}")
+        sys.exit(1)
+    print("✅ onnxruntime matches torch within tolerance")
+
+if __name__ == "__main__":
+    main()
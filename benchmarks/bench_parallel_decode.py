@@ -0,0 +1,59 @@
+"""Serial vs parallel segment decoding for /predict_video_frames, checking the results are identical.
+
+"first s" is the first call on a fresh pool, which also spawns the workers and
+imports the decoding stack in each of them; "seconds" is a later call. With
+few cores or short videos the parallel pass can be slower than the serial one.
+
+python benchmarks/bench_parallel_decode.py --video long_recording.mp4 --workers 2 4
+"""
+import argparse, os, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Parallelize regardless of length so short test clips exercise the pool too
+os.environ.setdefault("PARALLEL_MIN_SECONDS", "0")
+import app
+import video_io
+
+def run(video, workers):
+    start = time.perf_counter()
+    result = app.analyze_video_frames(video, workers=workers)
+    return time.perf_counter() - start, result
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", default="test/test.mp4")
+    ap.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    args = ap.parse_args()
+
+    app.ensure_model()
+    if app.model is None:
+        raise SystemExit("Model failed to load")
+    serial_time, reference = run(args.video, 1)
+    meta = reference["video_metadata"]
+    print(f"{args.video}: {meta['duration']:.1f}s, {len(reference['frame_predictions'])} sampled frames, "
+          f"{len(reference['position_changes'])} position changes, {os.cpu_count()} CPUs")
+
+    failed = False
+    print(f"\n{'workers':>7} {'first s':>8} {'seconds':>8} {'vs serial':>9}  identical")
+    print(f"{1:>7} {'-':>8} {serial_time:>8.2f} {1.0:>8.2f}x  -")
+    for workers in args.workers:
+        # Fresh pool per size; the first call also pays for spawning the workers
+        video_io._pool = None
+        first, _ = run(args.video, workers)
+        elapsed, result = run(args.video, workers)
+        identical = (result["frame_predictions"] == reference["frame_predictions"] and
+                     result["position_changes"] == reference["position_changes"] and
+                     result["movement_analysis"] == reference["movement_analysis"])
+        failed |= not identical
+        print(f"{workers:>7} {first:>8.2f} {elapsed:>8.2f} {serial_time / elapsed:>8.2f}x  {'yes' if identical else 'NO'}"
+              + ("  (slower than serial)" if elapsed > serial_time else ""))
+        video_io.get_decode_pool(workers).shutdown()
+
+    if failed:
+        print("❌ Parallel results differ from the serial pass")
+        sys.exit(1)
+    print("✅ Parallel results match the serial pass")
+
+if __name__ == "__main__":
+    main()
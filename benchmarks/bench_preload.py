@@ -0,0 +1,94 @@
+"""Worker memory and boot time: model loaded in every gunicorn worker vs. preloaded in the master.
+
+For each --workers count, starts gunicorn (gthread, as in the Procfile) with a
+scratch HOME, once with GUNICORN_PRELOAD=0 and once with preloading, and
+reports:
+  boot s        from launch until every worker logged "Worker ready"
+  RSS/worker    resident memory of one worker (counts shared pages in full)
+  USS/worker    memory private to one worker, i.e. what each extra worker costs
+  total PSS     master and workers together, shared pages split between them
+after --requests POST /predict calls, so every worker has run the model.
+Without preloading a worker loads the model on its first inference request
+(app.ensure_model), so that load is not part of its boot time.
+
+python benchmarks/bench_preload.py --workers 1 4 8
+"""
+import argparse, os, re, statistics, subprocess, sys, tempfile, threading, time
+from pathlib import Path
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+IMAGE = ROOT / "test" / "R (3284).png"
+
+def memory(pid):
+    """(rss, pss, uss) in MB from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return fields["Rss"], fields["Pss"], fields["Private_Clean"] + fields["Private_Dirty"]
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+def run(workers, preload, port, requests):
+    env = dict(os.environ, HOME=tempfile.mkdtemp(), WARD_MONITOR_ENABLED="0",
+               GUNICORN_PRELOAD="1" if preload else "0")
+    cmd = ["gunicorn", "app:app", "--worker-class", "gthread", "--threads", "4", "--workers", str(workers),
+           "--bind", f"127.0.0.1:{port}", "--timeout", "300", "--log-level", "info"]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    ready = set()
+    all_ready = threading.Event()
+
+    def read_log():
+        for line in proc.stderr:
+            match = re.search(r"Worker ready \(pid: (\d+)\)", line)
+            if match:
+                ready.add(int(match.group(1)))
+                if len(ready) == workers:
+                    all_ready.set()
+
+    threading.Thread(target=read_log, daemon=True).start()
+    try:
+        if not all_ready.wait(300):
+            raise RuntimeError(f"only {len(ready)} of {workers} workers came up")
+        boot = time.perf_counter() - start
+
+        image = IMAGE.read_bytes()
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+            for _ in range(requests):
+                # A new connection each time, so the requests spread over the workers
+                client.post("/predict", files={"file": ("frame.png", image, "image/png")},
+                            headers={"Connection": "close"}).raise_for_status()
+        time.sleep(1)
+
+        worker_pids = children(proc.pid)
+        worker_memory = [memory(pid) for pid in worker_pids]
+        total_pss = memory(proc.pid)[1] + sum(pss for _, pss, _ in worker_memory)
+        return (boot, statistics.mean(rss for rss, _, _ in worker_memory),
+                statistics.mean(uss for _, _, uss in worker_memory), total_pss)
+    finally:
+        proc.terminate()
+        proc.wait(60)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    ap.add_argument("--port", type=int, default=5071)
+    ap.add_argument("--requests", type=int, default=0, help="POST /predict calls (default: 4 per worker)")
+    args = ap.parse_args()
+    if not (ROOT / "best_model.pth").exists():
+        sys.exit("best_model.pth is needed to measure the model's share of memory")
+
+    print(f"{'workers':>7} {'mode':<10} {'boot s':>7} {'RSS/worker MB':>14} {'USS/worker MB':>14} {'total PSS MB':>13}")
+    for workers in args.workers:
+        for mode, preload in (("per-worker", False), ("preload", True)):
+            boot, rss, uss, pss = run(workers, preload, args.port, args.requests or 4 * workers)
+            print(f"{workers:>7} {mode:<10} {boot:>7.1f} {rss:>14.0f} {uss:>14.0f} {pss:>13.0f}", flush=True)
+
+if __name__ == "__main__":
+    main()
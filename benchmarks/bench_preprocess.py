@@ -0,0 +1,86 @@
+"""Parity check and per-frame latency of the ndarray preprocessing vs the PIL transform.
+
+python benchmarks/bench_preprocess.py --video test/test.mp4 --frames 64
+"""
+import argparse, os, sys, time
+from pathlib import Path
+import cv2
+import torch
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from inference import get_eval_transform, preprocess_frames, load_checkpoint, build_model, predict_batch
+
+# One grey level of rounding in the antialiased resize, after normalization
+PARITY_TOLERANCE = 1.0 / 255 / min(0.229, 0.224, 0.225) + 1e-4
+
+def read_frames(video, count):
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def pil_path(frames, transform):
+    imgs = [Image.fromarray(cv2.cvtColor(f, cv2.COLOR_BGR2RGB)).convert("L") for f in frames]
+    return torch.stack([transform(img) for img in imgs])
+
+def time_per_frame(fn, frames, batch_size, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(0, len(frames), batch_size):
+            fn(frames[i:i + batch_size])
+        best = min(best, time.perf_counter() - start)
+    return best / len(frames) * 1000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", default="test/test.mp4")
+    ap.add_argument("--frames", type=int, default=64)
+    ap.add_argument("--img_size", type=int, default=224)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--weights", default="best_model.pth", help="Optional: also compare predictions")
+    args = ap.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    if not frames:
+        raise SystemExit(f"Could not read frames from {args.video}")
+    transform = get_eval_transform(args.img_size)
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]} from {args.video}")
+
+    # Parity
+    ref = pil_path(frames, transform)
+    out = preprocess_frames(frames, args.img_size)
+    diff = (out - ref).abs()
+    print(f"max |diff| = {diff.max().item():.5f}  mean |diff| = {diff.mean().item():.6f}  (tolerance {PARITY_TOLERANCE:.5f})")
+
+    if os.path.exists(args.weights):
+        state_dict, classes, _ = load_checkpoint(args.weights)
+        model = build_model(len(classes))
+        model.load_state_dict(state_dict)
+        model.eval()
+        a = predict_batch(model, ref, classes)
+        b = predict_batch(model, out, classes)
+        agree = sum(x[0] == y[0] for x, y in zip(a, b))
+        drift = max(abs(x[1] - y[1]) for x, y in zip(a, b))
+        print(f"prediction agreement {agree}/{len(a)}  max confidence drift {drift:.6f}")
+
+    # Latency
+    print(f"\n{'batch':>5}  {'PIL ms/frame':>12}  {'ndarray ms/frame':>16}  {'speedup':>7}")
+    for batch_size in (1, 8, 32):
+        t_pil = time_per_frame(lambda b: pil_path(b, transform), frames, batch_size, args.repeat)
+        t_np = time_per_frame(lambda b: preprocess_frames(b, args.img_size), frames, batch_size, args.repeat)
+        print(f"{batch_size:>5}  {t_pil:>12.2f}  {t_np:>16.2f}  {t_pil / t_np:>6.1f}x")
+
+    if diff.max().item() > PARITY_TOLERANCE:
+        print("❌ Parity check failed")
+        sys.exit(1)
+    print("✅ Parity check passed")
+
+if __name__ == "__main__":
+    main()
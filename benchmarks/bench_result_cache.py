@@ -0,0 +1,52 @@
+"""Latency of a repeat upload answered from the result cache vs a full analysis.
+
+python benchmarks/bench_result_cache.py --video test/test.mp4
+"""
+import argparse, json, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import app
+
+def upload(client, endpoint, video, form):
+    with open(video, "rb") as f:
+        data = dict(form, file=(f, Path(video).name))
+        start = time.perf_counter()
+        response = client.post(endpoint, data=data, content_type="multipart/form-data")
+        elapsed = time.perf_counter() - start
+    return elapsed, response
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", default="test/test.mp4")
+    args = ap.parse_args()
+
+    app.ensure_model()
+    if app.result_cache is None:
+        raise SystemExit("Model failed to load, so the result cache is disabled")
+    # Start cold so the first upload is a miss
+    app.result_cache.max_bytes, max_bytes = 0, app.result_cache.max_bytes
+    app.result_cache.evict()
+    app.result_cache.max_bytes = max_bytes
+
+    client = app.app.test_client()
+    failed = False
+    print(f"{'endpoint':<24} {'miss ms':>9} {'hit ms':>8} {'speedup':>8}  identical")
+    for endpoint, form in (("/predict_video_frames", {}),
+                           ("/predict_video_interval", {"start_time": "0", "end_time": "5"})):
+        t_miss, miss = upload(client, endpoint, args.video, form)
+        t_hit, hit = upload(client, endpoint, args.video, form)
+        identical = miss.get_json() == hit.get_json()
+        ok = identical and miss.headers.get("X-Cache") == "MISS" and hit.headers.get("X-Cache") == "HIT"
+        failed |= not ok
+        print(f"{endpoint:<24} {t_miss * 1000:>9.1f} {t_hit * 1000:>8.1f} {t_miss / t_hit:>7.0f}x  "
+              f"{'yes' if identical else 'NO'} ({miss.headers.get('X-Cache')}, {hit.headers.get('X-Cache')})")
+
+    print(json.dumps(app.result_cache.stats()))
+    if failed:
+        print("❌ Cached responses differ from the fresh analysis")
+        sys.exit(1)
+    print("✅ Cached responses match the fresh analysis")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""/api/alerts and /api/chat/send throughput with concurrent writers: connection per call vs pooled WAL.
+
+Each mode gets a fresh scratch database seeded with --alerts alerts and
+--messages messages. --writers threads post chat messages and alerts (as the
+stream and ward threads do) while --readers threads load the dashboard's alert
+list, all through the Flask app for --seconds.
+
+python benchmarks/bench_sqlite_pool.py --writers 4 --readers 8 --seconds 10
+"""
+import argparse, os, statistics, sys, tempfile, threading, time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ["WARD_MONITOR_ENABLED"] = "0"
+import app
+from db import ConnectionPool
+
+def seed(alerts, messages):
+    conn = app.get_db_connection()
+    start = datetime(2026, 1, 1)
+    conn.executemany("INSERT INTO alerts (id, patient_id, patient_name, position, duration, type, timestamp, status) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     [(f"seed_{i}", f"P{i % 40}", f"Patient {i % 40}", "supine", "5.0", "No Movement Detected",
+                       (start + timedelta(seconds=i)).isoformat(), "pending" if i % 10 == 0 else "acknowledged")
+                      for i in range(alerts)])
+    conn.executemany("INSERT INTO messages (sender_username, recipient_username, text, timestamp) VALUES (?, ?, ?, ?)",
+                     [(f"nurse{i % 5 + 1}", f"nurse{(i + 1) % 5 + 1}", f"message {i}",
+                       (start + timedelta(seconds=i)).isoformat()) for i in range(messages)])
+    conn.commit()
+    conn.close()
+
+def worker(client, requests, end, latencies, errors):
+    i = 0
+    while time.perf_counter() < end:
+        name, method, path, body = requests(i)
+        start = time.perf_counter()
+        r = client.open(path, method=method, json=body)
+        elapsed = time.perf_counter() - start
+        if r.status_code == 200:
+            latencies.setdefault(name, []).append(elapsed)
+        else:
+            errors.append((name, r.status_code, r.get_data(as_text=True)[:80]))
+        i += 1
+
+def writer_requests(n):
+    def requests(i):
+        if i % 2:
+            return ("alert", "POST", "/api/alert",
+                    {"id": f"bench_{n}_{i}", "patientId": "P1", "patientName": "Bench", "position": "left",
+                     "duration": "5.0", "type": "No Movement Detected", "timestamp": datetime.now().isoformat(),
+                     "status": "pending"})
+        return ("chat/send", "POST", "/api/chat/send", {"sender": "nurse1", "recipient": "nurse2", "text": f"hi {i}"})
+    return requests
+
+def reader_requests(i):
+    if i % 2:
+        return ("alerts?status=pending", "GET", "/api/alerts?status=pending", None)
+    return ("alerts", "GET", "/api/alerts", None)
+
+def run(pooled, args):
+    ConnectionPool.enabled = pooled
+    app.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    app.init_db()
+    seed(args.alerts, args.messages)
+    client = app.app.test_client()
+    end = time.perf_counter() + args.seconds
+    latencies, errors = {}, []
+    threads = ([threading.Thread(target=worker, args=(client, writer_requests(n), end, latencies, errors))
+                for n in range(args.writers)] +
+               [threading.Thread(target=worker, args=(client, reader_requests, end, latencies, errors))
+                for _ in range(args.readers)])
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--writers", type=int, default=4)
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--alerts", type=int, default=5000)
+    ap.add_argument("--messages", type=int, default=20000)
+    args = ap.parse_args()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s, "
+          f"{args.alerts} alerts / {args.messages} messages seeded\n")
+    print(f"{'mode':<8} {'endpoint':<22} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for pooled in (False, True):
+        mode = "pooled" if pooled else "legacy"
+        latencies, errors = run(pooled, args)
+        for name in sorted(latencies):
+            values = latencies[name]
+            q = statistics.quantiles(values, n=20) if len(values) > 1 else values * 19
+            failed = sum(1 for e in errors if e[0] == name)
+            print(f"{mode:<8} {name:<22} {len(values) / args.seconds:>8.1f} {statistics.median(values) * 1000:>8.1f} "
+                  f"{q[18] * 1000:>8.1f} {failed:>7}")
+        if errors:
+            print(f"         first error: {errors[0]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Time to first prediction for video uploads of growing size: spooled in place vs parse-then-copy.
+
+Test videos are written as MJPG AVI (large files quickly) by looping the source clip.
+
+python benchmarks/bench_upload.py --video test/test.mp4 --loops 1 4 8
+"""
+import argparse, io, json, os, sys, tempfile, time
+from pathlib import Path
+import cv2
+from werkzeug.datastructures import FileStorage
+from werkzeug.test import encode_multipart
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import app
+from uploads import UploadRequest
+
+def write_looped(video, loops, path):
+    cap = cv2.VideoCapture(video)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    h, w = frames[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (w, h))
+    for _ in range(loops):
+        for frame in frames:
+            writer.write(frame)
+    writer.release()
+
+def encode(path, fields):
+    with open(path, "rb") as f:
+        data = f.read()
+    return encode_multipart(dict(fields, file=FileStorage(io.BytesIO(data), Path(path).name, content_type="video/x-msvideo")))
+
+def first_prediction(client, endpoint, body, boundary):
+    start = time.perf_counter()
+    response = client.post(endpoint, input_stream=io.BytesIO(body), content_length=len(body),
+                           content_type=f"multipart/form-data; boundary={boundary}", buffered=False)
+    if response.status_code != 200:
+        raise SystemExit(f"{endpoint} failed: {response.status_code} {response.get_data(as_text=True)}")
+    if endpoint == "/stream_video_analysis":
+        for line in response.response:
+            if json.loads(line).get("type") == "frame":
+                break
+    else:
+        response.get_data()
+    elapsed = time.perf_counter() - start
+    response.close()
+    return elapsed
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", default="test/test.mp4")
+    ap.add_argument("--loops", type=int, nargs="+", default=[1, 4, 8])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    client = app.app.test_client()
+    workdir = tempfile.mkdtemp()
+    print(f"{'size MB':>8} {'endpoint':<24} {'copy ms':>8} {'spooled ms':>10} {'saved ms':>9}")
+    for loops in args.loops:
+        path = os.path.join(workdir, f"clip_x{loops}.avi")
+        write_looped(args.video, loops, path)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        for endpoint in ("/predict_video", "/stream_video_analysis"):
+            boundary, body = encode(path, {"patientId": "bench", "patientName": "bench"})
+            times = {}
+            for spool in (False, True):
+                UploadRequest.spool_to_disk = spool
+                times[spool] = min(first_prediction(client, endpoint, body, boundary) for _ in range(args.repeat))
+            UploadRequest.spool_to_disk = True
+            print(f"{size_mb:>8.1f} {endpoint:<24} {times[False] * 1000:>8.1f} {times[True] * 1000:>10.1f} "
+                  f"{(times[False] - times[True]) * 1000:>9.1f}")
+        os.remove(path)
+    os.rmdir(workdir)
+    leftovers = os.listdir(app.TMP_DIR)
+    print(f"\nFiles left in {app.TMP_DIR}: {len(leftovers)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Alert persistence: one commit per alert vs. the write-behind queue.
+
+--streams threads each raise --alerts alerts through app.insert_stream_alert,
+as the analysis streams and ward beds do, against a scratch database. Reports
+how long the raising thread was blocked per alert, rows committed per second,
+commits made and (write-behind) queue-to-commit latency. Afterwards every
+alert must be in the table.
+
+python benchmarks/bench_write_behind.py --streams 16 --alerts 200
+"""
+import argparse, os, statistics, sys, tempfile, threading, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ["WARD_MONITOR_ENABLED"] = "0"
+os.environ["HOME"] = tempfile.mkdtemp()
+import app
+import builtins
+
+def run(flush_ms, streams, alerts):
+    app.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    app.init_db()
+    queue = app.write_queue
+    queue.flush_seconds = flush_ms / 1000
+    batches_before = queue.batches
+    blocked = []
+    lock = threading.Lock()
+
+    def stream(n):
+        times = []
+        for i in range(alerts):
+            start = time.perf_counter()
+            app.insert_stream_alert(f"bench_{flush_ms}_{n}_{i}", f"P{n}", f"Bed {n}", "supine", 5.0)
+            times.append(time.perf_counter() - start)
+        with lock:
+            blocked.extend(times)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=stream, args=(n,)) for n in range(streams)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    queue.flush()
+    elapsed = time.perf_counter() - start
+
+    conn = app.get_db_connection()
+    stored = conn.execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+    conn.close()
+    return blocked, elapsed, queue.batches - batches_before, stored, queue.stats()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--streams", type=int, default=16)
+    ap.add_argument("--alerts", type=int, default=200)
+    ap.add_argument("--flush-ms", type=float, default=200)
+    args = ap.parse_args()
+
+    # The app logs every alert; keep the table readable
+    print_ = builtins.print
+    builtins.print = lambda *a, **k: None
+
+    rows = []
+    for mode, flush_ms in (("sync", 0), ("write-behind", args.flush_ms)):
+        blocked, elapsed, commits, stored, stats = run(flush_ms, args.streams, args.alerts)
+        rows.append((mode, blocked, elapsed, commits, stored, stats))
+    builtins.print = print_
+
+    total = args.streams * args.alerts
+    print(f"{args.streams} streams x {args.alerts} alerts\n")
+    print(f"{'mode':<13} {'blocked p50 ms':>15} {'p95 ms':>8} {'rows/s':>9} {'commits':>8} {'stored':>11} {'flush p50/p95 ms':>17}")
+    for mode, blocked, elapsed, commits, stored, stats in rows:
+        q = statistics.quantiles(blocked, n=20)
+        flush = stats['flush_latency_ms']
+        flush_text = f"{flush['p50']}/{flush['p95']}" if mode != "sync" else "-"
+        print(f"{mode:<13} {statistics.median(blocked) * 1000:>15.3f} {q[18] * 1000:>8.3f} {total / elapsed:>9.0f} "
+              f"{commits:>8} {stored:>5}/{total:<5} {flush_text:>17}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Accuracy drift and latency of each inference backend against eager fp32.
+
+The folder uses the pred.py layout: images, optionally in class subfolders
+(supine/, left/, right/) so ground truth can be derived from the path.
+
+python benchmarks/eval_backends.py --weights best_model.pth --folder data/labelled
+"""
+import argparse, json, sys, time
+from pathlib import Path
+import torch
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from engine import TORCH_BACKENDS, list_images
+from inference import load_model, get_eval_transform, predict_batch
+
+def ground_truth(path, classes):
+    for c in classes:
+        if f"/{c}/" in path.as_posix() or path.parent.name.lower() == c.lower():
+            return c
+    return None
+
+def run(model, x, classes, batch_size):
+    results = []
+    for i in range(0, len(x), batch_size):
+        results.extend(predict_batch(model, x[i:i + batch_size], classes))
+    return results
+
+def latency_ms(model, x, batch_size, repeat):
+    batch = x[:batch_size]
+    with torch.no_grad():
+        model(batch)  # warm-up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model(batch)
+    return (time.perf_counter() - start) / repeat / len(batch) * 1000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--weights", default="best_model.pth")
+    ap.add_argument("--folder", required=True, help="Labelled images in the pred.py folder layout")
+    ap.add_argument("--calibration", help="Calibration images for int8 (defaults to --folder)")
+    ap.add_argument("--batch_size", type=int, default=32)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--save_json", help="Optional: save the report to this JSON file")
+    args = ap.parse_args()
+
+    files = list_images(args.folder)
+    if not files:
+        raise SystemExit(f"No images found in {args.folder}")
+    images = [Image.open(p).convert("L") for p in files]
+
+    report = {}
+    reference = None
+    for backend in TORCH_BACKENDS:
+        model, classes, img_size, channels = load_model(args.weights, backend=backend,
+                                                         calibration_dir=args.calibration or args.folder)
+        transform = get_eval_transform(img_size, channels)
+        x = torch.stack([transform(img) for img in images])
+        preds = run(model, x, classes, args.batch_size)
+        if reference is None:
+            reference = preds
+
+        gts = [ground_truth(p, classes) for p in files]
+        labelled = [(pred, gt) for pred, gt in zip(preds, gts) if gt is not None]
+        accuracy = sum(pred[0] == gt for pred, gt in labelled) / len(labelled) if labelled else None
+        agreement = sum(a[0] == b[0] for a, b in zip(preds, reference)) / len(preds)
+        drift = max(max(abs(p - q) for p, q in zip(a[2], b[2])) for a, b in zip(preds, reference))
+
+        report[backend] = {
+            "accuracy": accuracy,
+            "agreement_with_fp32": agreement,
+            "max_prob_drift": drift,
+            "latency_ms_batch1": latency_ms(model, x, 1, args.repeat),
+            f"latency_ms_batch{args.batch_size}": latency_ms(model, x, args.batch_size, args.repeat),
+        }
+
+    print(f"\n{len(files)} images from {args.folder}")
+    print(f"{'backend':<12} {'accuracy':>8} {'agree':>7} {'max drift':>9} {'ms/img b1':>9} {f'ms/img b{args.batch_size}':>10}")
+    for backend, r in report.items():
+        acc = f"{r['accuracy'] * 100:.2f}%" if r["accuracy"] is not None else "-"
+        print(f"{backend:<12} {acc:>8} {r['agreement_with_fp32'] * 100:>6.1f}% {r['max_prob_drift']:>9.4f} "
+              f"{r['latency_ms_batch1']:>9.2f} {r[f'latency_ms_batch{args.batch_size}']:>10.2f}")
+
+    if args.save_json:
+        with open(args.save_json, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Saved report:", args.save_json)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Per-thread pooled SQLite connections in WAL mode.
+
+Every request used to open (and tear down) its own connection, so the page
+cache and the prepared-statement cache were always cold, and the default
+rollback journal made the stream and ward threads' alert inserts block
+dashboard reads. Each thread now keeps one connection per database, opened
+with WAL journaling and tuned pragmas; close() only ends any open transaction
+and leaves the connection to the next request served by that thread.
+"""
+import os
+import re
+import sqlite3
+import threading
+
+# Page cache per connection
+SQLITE_CACHE_MB = int(os.environ.get('SQLITE_CACHE_MB', 16))
+# How long a writer waits for the lock before failing with "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+# NORMAL is durable across application crashes in WAL mode; FULL also survives power loss
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+# Prepared statements kept per connection (Python's default is 128)
+SQLITE_CACHED_STATEMENTS = 256
+
+class PooledConnection(sqlite3.Connection):
+    """Connection whose close() returns it to its thread instead of closing it"""
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def discard(self):
+        sqlite3.Connection.close(self)
+
+class ConnectionPool:
+    # Turned off only to measure the old connection-per-call behaviour
+    enabled = True
+
+    def __init__(self, row_factory=sqlite3.Row):
+        self.row_factory = row_factory
+        self.opened = 0
+        self.reused = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self.reset)
+
+    def connect(self, path):
+        if not self.enabled:
+            conn = sqlite3.connect(path)
+            conn.row_factory = self.row_factory
+            return conn
+
+        conns = self._connections()
+        conn = conns.get(path)
+        if conn is None:
+            conn = conns[path] = self._open(path)
+        else:
+            # A handler that failed before commit/close must not leak its transaction
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                self.reused += 1
+        return conn
+
+    def _connections(self):
+        conns = getattr(self._local, 'connections', None)
+        if conns is None:
+            conns = self._local.connections = {}
+        return conns
+
+    def _open(self, path):
+        conn = sqlite3.connect(path, factory=PooledConnection, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                               cached_statements=SQLITE_CACHED_STATEMENTS)
+        conn.row_factory = self.row_factory
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+        conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def close_thread(self):
+        """Really close this thread's connections (e.g. before the thread exits)"""
+        for conn in self._connections().values():
+            conn.discard()
+        self._local.connections = {}
+
+    def reset(self):
+        # Connections must not be shared with a forked child; it opens its own
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        return {'enabled': self.enabled, 'opened': self.opened, 'reused': self.reused}
+
+def query_plan(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN details of one statement, e.g. 'SEARCH a USING INDEX ... (status=?)'"""
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+def full_scans(plan, allowed=()):
+    """Steps of a query plan that read a whole table without an index (tables or aliases in allowed excepted)"""
+    return [step for step in plan
+            if (match := re.fullmatch(r'SCAN (\w+)', step)) and match.group(1) not in allowed]
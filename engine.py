@@ -0,0 +1,150 @@
+"""Backend-independent parts of the inference engine: configuration, batching and scheduling.
+
+Nothing here imports torch, so the onnx backend can share it, and numpy is only imported
+when results are produced, so the app starts without it.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+DEFAULT_CLASSES = ['supine', 'left', 'right']
+
+RESIZE_SIZE = 256
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"}
+
+# Number of frames stacked into a single forward pass
+INFERENCE_BATCH_SIZE = int(os.environ.get('INFERENCE_BATCH_SIZE', 32))
+
+# Cross-stream micro-batching: flush when either limit is reached
+SCHEDULER_MAX_BATCH = int(os.environ.get('SCHEDULER_MAX_BATCH', 32))
+SCHEDULER_MAX_WAIT_MS = float(os.environ.get('SCHEDULER_MAX_WAIT_MS', 20))
+
+# Inference backend: eager (fp32), torchscript (traced + frozen), int8 (static quantization)
+# or onnx (onnxruntime, no torch import)
+BACKENDS = ('eager', 'torchscript', 'int8', 'onnx')
+TORCH_BACKENDS = ('eager', 'torchscript', 'int8')
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'eager')
+
+# Keep the loaded weights in shared memory, so worker processes forked after loading
+# (gunicorn preload_app) map the same pages instead of copying them
+SHARE_MODEL_MEMORY = os.environ.get('SHARE_MODEL_MEMORY', '1') == '1'
+
+def load_backend(name=INFERENCE_BACKEND):
+    """Import the module implementing the given backend"""
+    if name == 'onnx':
+        import onnx_backend as backend
+    else:
+        import inference as backend
+    return backend
+
+def list_images(folder):
+    return sorted(p for p in Path(folder).rglob("*") if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS)
+
+def to_results(probs, class_names):
+    """Turn an NxK array of class probabilities into (label, confidence, probs) tuples"""
+    import numpy as np
+    results = []
+    for p in probs:
+        idx = int(np.argmax(p))
+        results.append((class_names[idx], float(p[idx]), p.tolist()))
+    return results
+
+def iter_batched(run_batch, items, batch_size=INFERENCE_BATCH_SIZE):
+    """Feed (key, input) pairs to run_batch in groups, yielding (key, result) in input order.
+
+    Items are consumed lazily so callers can feed frames straight from a decoder
+    without holding the whole video in memory.
+    """
+    batch_size = max(1, int(batch_size))
+    keys, inputs = [], []
+    for key, item in items:
+        keys.append(key)
+        inputs.append(item)
+        if len(inputs) >= batch_size:
+            yield from zip(keys, run_batch(inputs))
+            keys, inputs = [], []
+    if inputs:
+        yield from zip(keys, run_batch(inputs))
+
+class MicroBatchScheduler:
+    """Queues single frames from concurrent streams and classifies them together.
+
+    Each caller gets a Future for its own frame, so results always go back to
+    the stream that submitted them. A batch is flushed as soon as max_batch_size
+    frames are waiting or the oldest frame has waited max_wait_ms. run_batch
+    takes a list of raw inputs and returns one result per input, so
+    preprocessing is batched across streams as well.
+    """
+
+    def __init__(self, run_batch, max_batch_size=SCHEDULER_MAX_BATCH, max_wait_ms=SCHEDULER_MAX_WAIT_MS):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.batches_run = 0
+        self.frames_run = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="micro-batch-scheduler", daemon=True)
+                self._thread.start()
+
+    def submit(self, x):
+        """Queue one input and return a Future of its result"""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((x, future))
+        return future
+
+    def predict(self, x):
+        """Blocking helper for callers that just want the result"""
+        return self.submit(x).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Skip frames whose stream has gone away and cancelled its Future
+            batch = [(x, f) for x, f in self._collect() if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            inputs = [x for x, _ in batch]
+            futures = [f for _, f in batch]
+            try:
+                results = self.run_batch(inputs)
+            except Exception as e:
+                for f in futures:
+                    f.set_exception(e)
+                continue
+            self.batches_run += 1
+            self.frames_run += len(futures)
+            for f, result in zip(futures, results):
+                f.set_result(result)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'batches_run': self.batches_run,
+            'frames_run': self.frames_run,
+            'avg_batch_size': self.frames_run / self.batches_run if self.batches_run else 0,
+        }
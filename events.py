@@ -0,0 +1,219 @@
+"""Persistent event log behind the /api/events server-sent event channel.
+
+Every change clients used to poll for (new alerts and acknowledgements, chat
+messages and read receipts, presence, duty broadcasts) is appended to the
+`events` table as it happens. The autoincrement id doubles as the SSE event id,
+so a client that reconnects with Last-Event-ID receives exactly what it
+missed, even across server restarts; one that fell behind the retention window
+gets a `reset` event and reloads its state instead.
+
+Subscribers register a listener that is called whenever new events exist.
+Events published in this process notify them directly; events written by other
+worker processes are picked up by one watcher thread per process that checks
+the latest id every EVENT_POLL_SECONDS while anyone is subscribed. Events
+older than EVENT_RETENTION_HOURS are deleted by the publishing process, at most
+every PRUNE_INTERVAL_SECONDS, whether or not anyone is subscribed.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+# How long events are kept for clients resuming with Last-Event-ID
+EVENT_RETENTION_HOURS = float(os.environ.get('EVENT_RETENTION_HOURS', 24))
+
+# How often the watcher looks for events written by other processes
+EVENT_POLL_SECONDS = float(os.environ.get('EVENT_POLL_SECONDS', 1.0))
+
+# Idle streams get a comment line this often so proxies keep them open
+KEEPALIVE_SECONDS = 15
+
+# Reconnect delay suggested to EventSource clients
+RETRY_MS = 3000
+
+# Events read per query while a client catches up
+EVENT_BATCH = 500
+
+PRUNE_INTERVAL_SECONDS = 600
+
+KEEPALIVE = ': keepalive\n\n'
+
+# Also checked by `python app.py explain-db`
+SINCE_QUERY = "SELECT id, type, data, audience FROM events WHERE id > ? ORDER BY id LIMIT ?"
+PRUNE_QUERY = "DELETE FROM events WHERE created_at < ?"
+
+def format_event(event_id, event_type, data):
+    """One server-sent event; data is already JSON"""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+class EventLog:
+    def __init__(self, connect, retention_hours=EVENT_RETENTION_HOURS, poll_seconds=EVENT_POLL_SECONDS):
+        self.connect = connect
+        self.retention = timedelta(hours=retention_hours)
+        self.poll_seconds = poll_seconds
+        self.last_id = None
+        self.published = 0
+        self._listeners = set()
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._last_prune = 0.0
+
+    # --- writing ---
+
+    def publish(self, event_type, data, audience=None):
+        """Append an event; audience limits it to those usernames (None: everyone). Returns its id."""
+        ids = self.publish_many([(event_type, data, audience)])
+        return ids[0] if ids else None
+
+    def publish_many(self, events):
+        """Append (event_type, data, audience) events in one transaction. Returns their ids."""
+        created_at = datetime.now().isoformat()
+        try:
+            conn = self.connect()
+            try:
+                ids = [conn.execute(
+                           "INSERT INTO events (type, data, audience, created_at) VALUES (?, ?, ?, ?)",
+                           (event_type, json.dumps(data),
+                            json.dumps(sorted(set(audience))) if audience else None,
+                            created_at)).lastrowid
+                       for event_type, data, audience in events]
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Error publishing {', '.join(sorted({event[0] for event in events}))} event: {e}")
+            return []
+        self.published += len(ids)
+        if ids:
+            self._advance(ids[-1])
+        self._prune_if_due()
+        return ids
+
+    def _prune_if_due(self):
+        with self._lock:
+            if time.time() - self._last_prune < PRUNE_INTERVAL_SECONDS:
+                return
+            self._last_prune = time.time()
+        try:
+            self.prune()
+        except sqlite3.Error as e:
+            print(f"Error pruning events: {e}")
+
+    def prune(self):
+        cutoff = (datetime.now() - self.retention).isoformat()
+        conn = self.connect()
+        try:
+            conn.execute(PRUNE_QUERY, (cutoff,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    # --- reading ---
+
+    def current_id(self):
+        """Id of the newest event ever written (ids are never reused, even after pruning)"""
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+
+    def start(self, last_event_id):
+        """(cursor, reset) for a client connecting with last_event_id (None: only new events)"""
+        current = self.current_id()
+        if last_event_id is None or last_event_id > current:
+            return current, False
+        conn = self.connect()
+        try:
+            first = conn.execute("SELECT MIN(id) FROM events").fetchone()[0]
+        finally:
+            conn.close()
+        # Events after last_event_id were pruned before this client came back
+        oldest_kept = first if first is not None else current + 1
+        if last_event_id < oldest_kept - 1:
+            return current, True
+        return last_event_id, False
+
+    def since(self, cursor, username=None, types=None, limit=EVENT_BATCH):
+        """(events, new_cursor, more): SSE-formatted events after cursor that username may see"""
+        conn = self.connect()
+        try:
+            rows = conn.execute(SINCE_QUERY, (cursor, limit)).fetchall()
+        finally:
+            conn.close()
+        events = []
+        for event_id, event_type, data, audience in rows:
+            cursor = event_id
+            if types and event_type not in types:
+                continue
+            if audience is not None and username not in json.loads(audience):
+                continue
+            events.append(format_event(event_id, event_type, data))
+        return events, cursor, len(rows) == limit
+
+    def stream(self, last_event_id=None, username=None, types=None):
+        """Blocking generator of SSE text for one client: missed events first, then live ones"""
+        wake = threading.Event()
+        self.add_listener(wake.set)
+        try:
+            cursor, reset = self.start(last_event_id)
+            yield f"retry: {RETRY_MS}\n\n"
+            if reset:
+                yield format_event(cursor, 'reset', '{}')
+            while True:
+                wake.clear()
+                events, cursor, more = self.since(cursor, username, types)
+                yield from events
+                if more or (self.last_id or 0) > cursor:
+                    continue
+                if not wake.wait(KEEPALIVE_SECONDS):
+                    yield KEEPALIVE
+        finally:
+            self.remove_listener(wake.set)
+
+    # --- notification ---
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.add(listener)
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name='event-watcher', daemon=True)
+                self._watcher.start()
+
+    def remove_listener(self, listener):
+        with self._lock:
+            self._listeners.discard(listener)
+
+    def subscribers(self):
+        return len(self._listeners)
+
+    def _advance(self, event_id):
+        with self._lock:
+            if self.last_id is not None and event_id <= self.last_id:
+                return
+            self.last_id = event_id
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def _watch(self):
+        while True:
+            with self._lock:
+                if not self._listeners:
+                    self._watcher = None
+                    return
+            try:
+                self._advance(self.current_id())
+            except sqlite3.Error as e:
+                print(f"Event watcher error: {e}")
+            time.sleep(self.poll_seconds)
+
+    def stats(self):
+        return {
+            'last_id': self.last_id,
+            'published': self.published,
+            'subscribers': self.subscribers(),
+        }
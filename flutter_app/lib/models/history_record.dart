@@ -41,3 +41,11 @@ class HistoryRecord {
     );
   }
 }
+
+/// One page of /api/history or /api/alerts, newest first
+class RecordPage {
+  final List<HistoryRecord> records;
+  final String? nextCursor; // null on the last page
+
+  RecordPage(this.records, this.nextCursor);
+}
@@ -11,6 +11,7 @@ import '../models/patient.dart';
 import '../models/analysis_result.dart';
 import '../services/api_service.dart';
 import '../services/auth_service.dart';
+import '../services/event_service.dart';
 import '../widgets/patient_modal.dart';
 import '../widgets/alert_popup.dart';
 import '../widgets/result_card.dart';
@@ -60,7 +61,7 @@ class _AnalysisScreenState extends State<AnalysisScreen> {
   VideoPlayerController? _videoPlayerController;
   ChewieController? _chewieController;
   final AudioPlayer _audioPlayer = AudioPlayer();
-  Timer? _dutyPollingTimer;
+  StreamSubscription<ServerEvent>? _dutySubscription;
   bool _showDutyNotification = false;
   String _currentDutyMessage = '';
   final Set<String> _shownDutyBroadcastIds = {};
@@ -74,12 +75,12 @@ class _AnalysisScreenState extends State<AnalysisScreen> {
     super.initState();
     _loadCurrentUser();
     _loadAllData(); // Load doctors, nurses, and patients
-    _startDutyPolling();
+    _listenForDutyBroadcasts();
   }
 
   @override
   void dispose() {
-    _dutyPollingTimer?.cancel();
+    _dutySubscription?.cancel();
     _videoPlayerController?.dispose();
     _chewieController?.dispose();
     _audioPlayer.dispose();
@@ -88,19 +89,13 @@ class _AnalysisScreenState extends State<AnalysisScreen> {
     super.dispose();
   }
 
-  void _startDutyPolling() {
-    _dutyPollingTimer = Timer.periodic(const Duration(seconds: 3), (timer) async {
-      final broadcasts = await _apiService.getDutyBroadcasts();
-      if (broadcasts.isNotEmpty && mounted) {
-        for (final b in broadcasts) {
-          final id = b['id'] as String;
-          if (!_shownDutyBroadcastIds.contains(id)) {
-            _shownDutyBroadcastIds.add(id);
-            _triggerDutyNotification(b['message'] as String);
-            // Only show the most recent one if multiple arrive at same time
-            break; 
-          }
-        }
+  void _listenForDutyBroadcasts() {
+    // Broadcasts are pushed over the event channel as they are sent
+    _dutySubscription = EventService().on('duty').listen((event) {
+      final id = event.data['id'] as String;
+      if (mounted && !_shownDutyBroadcastIds.contains(id)) {
+        _shownDutyBroadcastIds.add(id);
+        _triggerDutyNotification(event.data['message'] as String);
       }
     });
   }
@@ -1199,15 +1194,17 @@ class _AnalysisScreenState extends State<AnalysisScreen> {
     _playAlertSound();
     
     bool locallyAcknowledged = false;
-    Timer? remoteCheckTimer;
+    StreamSubscription<ServerEvent>? remoteAcknowledgement;
 
     // 2. Show Dialog
     if (mounted) {
-      // Start polling for remote acknowledgement
-      remoteCheckTimer = Timer.periodic(const Duration(seconds: 2), (timer) async {
-        final status = await _apiService.getAlertStatus(alertId);
-        if (status == 'acknowledged' && !locallyAcknowledged && mounted) {
-          timer.cancel();
+      // Close the dialog when someone else acknowledges the alert
+      remoteAcknowledgement = EventService()
+          .on('alert_acknowledged')
+          .where((e) => e.data['id'] == alertId)
+          .listen((_) {
+        remoteAcknowledgement?.cancel();
+        if (!locallyAcknowledged && mounted) {
           Navigator.of(context).pop(); // Close dialog remotely
         }
       });
@@ -1221,7 +1218,7 @@ class _AnalysisScreenState extends State<AnalysisScreen> {
           duration: '$duration seconds',
           onAcknowledge: () async {
             locallyAcknowledged = true;
-            remoteCheckTimer?.cancel();
+            remoteAcknowledgement?.cancel();
             _stopAlertSound();
             Navigator.of(context).pop();
             // 3. Acknowledge on server
@@ -1230,7 +1227,7 @@ class _AnalysisScreenState extends State<AnalysisScreen> {
         ),
       );
       
-      remoteCheckTimer?.cancel();
+      remoteAcknowledgement?.cancel();
       _stopAlertSound();
 
       // 4. RESUME VIDEO after alert is handled
@@ -10,6 +10,7 @@ import 'package:image_picker/image_picker.dart';
 import 'package:url_launcher/url_launcher.dart';
 import 'dart:io';
 import '../services/api_service.dart';
+import '../services/event_service.dart';
 import '../models/chat_message.dart';
 import '../models/chat_user.dart';
 import '../models/user.dart';
@@ -36,7 +37,7 @@ class _ChatDetailScreenState extends State<ChatDetailScreen> {
   final _audioPlayer = AudioPlayer();
   
   List<ChatMessage> _messages = [];
-  Timer? _pollingTimer;
+  StreamSubscription<ServerEvent>? _eventSubscription;
   bool _isLoading = true;
   bool _isRecording = false;
   bool _isRecorderInitializing = false;
@@ -51,13 +52,29 @@ class _ChatDetailScreenState extends State<ChatDetailScreen> {
     super.initState();
     _isRecipientOnline = widget.recipient.isOnline;
     _fetchMessages();
-    // Start polling every 3 seconds
-    _pollingTimer = Timer.periodic(const Duration(seconds: 3), (_) => _fetchMessages(silent: true));
+    // New messages in this conversation and the recipient's presence are pushed by the server
+    _eventSubscription = EventService().events.listen(_onServerEvent);
+  }
+
+  void _onServerEvent(ServerEvent event) {
+    final me = widget.currentUser.username;
+    final them = widget.recipient.username;
+    if (event.type == 'message') {
+      final sender = event.data['sender_username'];
+      final recipient = event.data['recipient_username'];
+      if ((sender == me && recipient == them) || (sender == them && recipient == me)) {
+        _fetchMessages(silent: true);
+      }
+    } else if (event.type == 'presence' && event.data['username'] == them) {
+      if (mounted) setState(() => _isRecipientOnline = event.data['is_online'] == 1);
+    } else if (event.type == 'reset') {
+      _fetchMessages(silent: true);
+    }
   }
 
   @override
   void dispose() {
-    _pollingTimer?.cancel();
+    _eventSubscription?.cancel();
     _messageController.dispose();
     _scrollController.dispose();
     _audioRecorder.dispose();
@@ -195,17 +212,6 @@ class _ChatDetailScreenState extends State<ChatDetailScreen> {
   Future<void> _fetchMessages({bool silent = false}) async {
     final baseUrl = await _apiService.getBaseUrl();
     try {
-      // Also refresh recipient status periodically (every 2nd poll)
-      if (DateTime.now().second % 6 < 3) {
-        final users = await _apiService.getChatUsers(widget.currentUser.username);
-        final currentRecipient = users.where((u) => u.username == widget.recipient.username).firstOrNull;
-        if (currentRecipient != null && mounted) {
-           if (_isRecipientOnline != currentRecipient.isOnline) {
-             setState(() => _isRecipientOnline = currentRecipient.isOnline);
-           }
-        }
-      }
-
       final history = await _apiService.getChatHistory(
         widget.currentUser.username,
         widget.recipient.username,
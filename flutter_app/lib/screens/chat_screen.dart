@@ -3,6 +3,7 @@ import 'package:flutter/material.dart';
 import 'package:intl/intl.dart';
 import '../services/api_service.dart';
 import '../services/auth_service.dart';
+import '../services/event_service.dart';
 import '../models/chat_user.dart';
 import '../models/user.dart';
 import 'chat_detail_screen.dart';
@@ -26,19 +27,30 @@ class _ChatScreenState extends State<ChatScreen> {
   User? _currentUser;
   String? _baseUrl;
   String _selectedTab = 'All';
-  Timer? _pollingTimer;
+  StreamSubscription<ServerEvent>? _eventSubscription;
+  Timer? _refreshDebounce;
 
   @override
   void initState() {
     super.initState();
     _loadData();
     _searchController.addListener(_onSearchChanged);
-    _pollingTimer = Timer.periodic(const Duration(seconds: 10), (_) => _loadData(silent: true));
+    // Refresh last messages, unread counts and online status when they change
+    _eventSubscription = EventService().events
+        .where((e) => const {'message', 'messages_read', 'presence', 'reset'}.contains(e.type))
+        .listen((_) => _scheduleRefresh());
+  }
+
+  void _scheduleRefresh() {
+    // Coalesce bursts of events into one reload
+    _refreshDebounce?.cancel();
+    _refreshDebounce = Timer(const Duration(milliseconds: 300), () => _loadData(silent: true));
   }
 
   @override
   void dispose() {
-    _pollingTimer?.cancel();
+    _eventSubscription?.cancel();
+    _refreshDebounce?.cancel();
     _searchController.dispose();
     super.dispose();
   }
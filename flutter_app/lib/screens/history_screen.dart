@@ -1,7 +1,7 @@
 import 'package:flutter/material.dart';
 import '../models/history_record.dart';
 import '../widgets/fade_in_entry.dart';
-import '../services/api_service.dart';
+import '../services/history_feed.dart';
 import 'package:intl/intl.dart';
 
 class HistoryScreen extends StatefulWidget {
@@ -12,10 +12,11 @@ class HistoryScreen extends StatefulWidget {
 }
 
 class _HistoryScreenState extends State<HistoryScreen> {
-  final _apiService = ApiService();
+  HistoryFeed _feed = HistoryFeed();
   List<HistoryRecord> _allRecords = [];
   List<HistoryRecord> _filteredRecords = [];
   bool _isLoading = true;
+  bool _isLoadingMore = false;
   String _searchQuery = '';
   String _filterType = 'all'; // all, critical, warning
 
@@ -28,9 +29,12 @@ class _HistoryScreenState extends State<HistoryScreen> {
   Future<void> _loadHistory() async {
     setState(() => _isLoading = true);
     try {
-      final records = await _apiService.getHistory();
+      final feed = HistoryFeed();
+      _feed = feed;
+      await feed.loadMore();
+      if (!mounted || feed != _feed) return;
       setState(() {
-        _allRecords = records;
+        _allRecords = feed.records;
         _applyFilters();
         _isLoading = false;
       });
@@ -44,6 +48,30 @@ class _HistoryScreenState extends State<HistoryScreen> {
     }
   }
 
+  Future<void> _loadMore() async {
+    final feed = _feed;
+    if (_isLoading || _isLoadingMore || !feed.hasMore) return;
+    setState(() => _isLoadingMore = true);
+    try {
+      await feed.loadMore();
+      if (!mounted || feed != _feed) return;
+      setState(() {
+        _allRecords = feed.records;
+        _applyFilters();
+      });
+    } catch (e) {
+      print('Error loading more history: $e');
+    } finally {
+      if (mounted) setState(() => _isLoadingMore = false);
+    }
+  }
+
+  bool _onScroll(ScrollNotification notification) {
+    // Fetch the next page before the user reaches the end of the list
+    if (notification.metrics.extentAfter < 600) _loadMore();
+    return false;
+  }
+
   void _applyFilters() {
     setState(() {
       _filteredRecords = _allRecords.where((record) {
@@ -70,113 +98,123 @@ class _HistoryScreenState extends State<HistoryScreen> {
   Widget build(BuildContext context) {
     return Scaffold(
       backgroundColor: const Color(0xFFF8FAFC),
-      body: CustomScrollView(
-        slivers: [
-          // Professional Header
-          SliverToBoxAdapter(
-            child: Padding(
-              padding: const EdgeInsets.only(left: 24, right: 24, top: 40, bottom: 16),
-              child: Column(
-                crossAxisAlignment: CrossAxisAlignment.start,
-                children: [
-                  Row(
-                    mainAxisAlignment: MainAxisAlignment.spaceBetween,
-                    children: [
-                      const Text(
-                        'Alert History',
-                        style: TextStyle(
-                          fontSize: 28,
-                          fontWeight: FontWeight.bold,
-                          color: Color(0xFF1E293B),
-                          fontFamily: 'Gilroy',
-                        ),
-                      ),
-                      Container(
-                        padding: const EdgeInsets.all(10),
-                        decoration: BoxDecoration(
-                          color: Colors.white,
-                          shape: BoxShape.circle,
-                          boxShadow: [
-                            BoxShadow(color: Colors.black.withOpacity(0.05), blurRadius: 10, offset: const Offset(0, 4)),
-                          ],
+      body: NotificationListener<ScrollNotification>(
+        onNotification: _onScroll,
+        child: CustomScrollView(
+          slivers: [
+            // Professional Header
+            SliverToBoxAdapter(
+              child: Padding(
+                padding: const EdgeInsets.only(left: 24, right: 24, top: 40, bottom: 16),
+                child: Column(
+                  crossAxisAlignment: CrossAxisAlignment.start,
+                  children: [
+                    Row(
+                      mainAxisAlignment: MainAxisAlignment.spaceBetween,
+                      children: [
+                        const Text(
+                          'Alert History',
+                          style: TextStyle(
+                            fontSize: 28,
+                            fontWeight: FontWeight.bold,
+                            color: Color(0xFF1E293B),
+                            fontFamily: 'Gilroy',
+                          ),
                         ),
-                        child: IconButton(
-                          padding: EdgeInsets.zero,
-                          constraints: const BoxConstraints(),
-                          icon: const Icon(Icons.refresh_rounded, color: Color(0xFF64748B)),
-                          onPressed: _loadHistory,
+                        Container(
+                          padding: const EdgeInsets.all(10),
+                          decoration: BoxDecoration(
+                            color: Colors.white,
+                            shape: BoxShape.circle,
+                            boxShadow: [
+                              BoxShadow(color: Colors.black.withOpacity(0.05), blurRadius: 10, offset: const Offset(0, 4)),
+                            ],
+                          ),
+                          child: IconButton(
+                            padding: EdgeInsets.zero,
+                            constraints: const BoxConstraints(),
+                            icon: const Icon(Icons.refresh_rounded, color: Color(0xFF64748B)),
+                            onPressed: _loadHistory,
+                          ),
                         ),
-                      ),
-                    ],
-                  ),
-                  const SizedBox(height: 24),
-                  // Search Bar
-                  Container(
-                    decoration: BoxDecoration(
-                      color: Colors.white,
-                      borderRadius: BorderRadius.circular(16),
-                      boxShadow: [
-                        BoxShadow(color: Colors.black.withOpacity(0.03), blurRadius: 10, offset: const Offset(0, 4)),
                       ],
                     ),
-                    child: TextField(
-                      style: const TextStyle(color: Color(0xFF1E293B), fontWeight: FontWeight.bold, fontFamily: 'Gilroy'),
-                      decoration: const InputDecoration(
-                        hintText: 'Search alerts...',
-                        hintStyle: TextStyle(color: Color(0xFF94A3B8), fontFamily: 'Gilroy'),
-                        prefixIcon: Icon(Icons.search, color: Color(0xFF64748B)),
-                        border: InputBorder.none,
-                        contentPadding: EdgeInsets.symmetric(vertical: 16),
+                    const SizedBox(height: 24),
+                    // Search Bar
+                    Container(
+                      decoration: BoxDecoration(
+                        color: Colors.white,
+                        borderRadius: BorderRadius.circular(16),
+                        boxShadow: [
+                          BoxShadow(color: Colors.black.withOpacity(0.03), blurRadius: 10, offset: const Offset(0, 4)),
+                        ],
+                      ),
+                      child: TextField(
+                        style: const TextStyle(color: Color(0xFF1E293B), fontWeight: FontWeight.bold, fontFamily: 'Gilroy'),
+                        decoration: const InputDecoration(
+                          hintText: 'Search alerts...',
+                          hintStyle: TextStyle(color: Color(0xFF94A3B8), fontFamily: 'Gilroy'),
+                          prefixIcon: Icon(Icons.search, color: Color(0xFF64748B)),
+                          border: InputBorder.none,
+                          contentPadding: EdgeInsets.symmetric(vertical: 16),
+                        ),
+                        onChanged: (value) {
+                          _searchQuery = value;
+                          _applyFilters();
+                        },
                       ),
-                      onChanged: (value) {
-                        _searchQuery = value;
-                        _applyFilters();
-                      },
                     ),
-                  ),
-                  const SizedBox(height: 16),
-                  // Filters
-                  SingleChildScrollView(
-                    scrollDirection: Axis.horizontal,
-                    child: Row(
-                      children: [
-                        _buildFilterChip('All Alerts', 'all'),
-                        const SizedBox(width: 8),
-                        _buildFilterChip('Critical', 'critical'),
-                        const SizedBox(width: 8),
-                        _buildFilterChip('Warnings', 'warning'),
-                      ],
+                    const SizedBox(height: 16),
+                    // Filters
+                    SingleChildScrollView(
+                      scrollDirection: Axis.horizontal,
+                      child: Row(
+                        children: [
+                          _buildFilterChip('All Alerts', 'all'),
+                          const SizedBox(width: 8),
+                          _buildFilterChip('Critical', 'critical'),
+                          const SizedBox(width: 8),
+                          _buildFilterChip('Warnings', 'warning'),
+                        ],
+                      ),
                     ),
-                  ),
-                ],
+                  ],
+                ),
               ),
             ),
-          ),
 
-          // History List
-          _isLoading
-              ? const SliverFillRemaining(child: Center(child: CircularProgressIndicator()))
-              : _filteredRecords.isEmpty
-                  ? const SliverFillRemaining(
-                      child: Center(
-                        child: Text(
-                          'No history available',
-                          style: TextStyle(color: Colors.grey, fontFamily: 'Gilroy'),
+            // History List
+            _isLoading
+                ? const SliverFillRemaining(child: Center(child: CircularProgressIndicator()))
+                : _filteredRecords.isEmpty
+                    ? const SliverFillRemaining(
+                        child: Center(
+                          child: Text(
+                            'No history available',
+                            style: TextStyle(color: Colors.grey, fontFamily: 'Gilroy'),
+                          ),
                         ),
-                      ),
-                    )
-                  : SliverPadding(
-                      padding: const EdgeInsets.symmetric(horizontal: 24, vertical: 8),
-                      sliver: SliverList(
-                        delegate: SliverChildBuilderDelegate(
-                          (context, index) {
-                            return _buildHistoryCard(_filteredRecords[index]);
-                          },
-                          childCount: _filteredRecords.length,
+                      )
+                    : SliverPadding(
+                        padding: const EdgeInsets.symmetric(horizontal: 24, vertical: 8),
+                        sliver: SliverList(
+                          delegate: SliverChildBuilderDelegate(
+                            (context, index) {
+                              return _buildHistoryCard(_filteredRecords[index]);
+                            },
+                            childCount: _filteredRecords.length,
+                          ),
                         ),
                       ),
-                    ),
-        ],
+            if (_isLoadingMore)
+              const SliverToBoxAdapter(
+                child: Padding(
+                  padding: EdgeInsets.symmetric(vertical: 24),
+                  child: Center(child: CircularProgressIndicator()),
+                ),
+              ),
+          ],
+        ),
       ),
     );
   }
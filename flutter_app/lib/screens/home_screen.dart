@@ -8,6 +8,7 @@ import 'nurse_screen.dart';
 import 'settings_screen.dart';
 import '../services/auth_service.dart';
 import '../services/api_service.dart';
+import '../services/event_service.dart';
 import '../widgets/alert_popup.dart';
 import '../models/history_record.dart';
 import 'package:audioplayers/audioplayers.dart';
@@ -30,64 +31,82 @@ class _HomeScreenState extends State<HomeScreen> {
   int _currentIndex = 0;
   final _authService = AuthService();
   final _apiService = ApiService();
-  Timer? _alertTimer;
+  final _eventService = EventService();
+  StreamSubscription<ServerEvent>? _eventSubscription;
   final AudioPlayer _audioPlayer = AudioPlayer();
   final Set<String> _shownAlertIds = {};
   bool _isShowingAlert = false;
   bool _isNavBarVisible = false;
   Timer? _navBarHideTimer;
-  Timer? _messagePollingTimer;
-  Map<String, int> _lastUnreadCounts = {};
+  Timer? _heartbeatTimer;
   OverlayEntry? _currentNotification;
   Timer? _notificationTimeout;
 
   @override
   void initState() {
     super.initState();
-    _startAlertPolling();
-    _startMessagePolling();
+    _connectEvents();
     // Show Nav Bar on initial load
     WidgetsBinding.instance.addPostFrameCallback((_) => _showNavBar());
   }
 
   @override
   void dispose() {
-    _alertTimer?.cancel();
+    _eventSubscription?.cancel();
+    _eventService.disconnect();
     _navBarHideTimer?.cancel();
-    _messagePollingTimer?.cancel();
+    _heartbeatTimer?.cancel();
     _notificationTimeout?.cancel();
     _hideNotification();
     _audioPlayer.dispose();
     super.dispose();
   }
 
-  void _startAlertPolling() {
-    _alertTimer = Timer.periodic(const Duration(seconds: 5), (timer) {
-      _checkPendingAlerts();
-    });
-  }
+  Future<void> _connectEvents() async {
+    final user = await _authService.getCurrentUser();
+    if (user == null || !mounted) return;
 
-  void _startMessagePolling() {
-    _messagePollingTimer = Timer.periodic(const Duration(seconds: 4), (timer) {
-      _checkNewMessages();
+    // Alerts, acknowledgements and messages are pushed by the server instead of polled
+    _eventService.connect(user.username);
+    _eventSubscription = _eventService.events.listen((event) => _onServerEvent(event, user.username));
+
+    // Heartbeat keeps this user shown as online to others
+    _apiService.sendHeartbeat(user.username);
+    _heartbeatTimer = Timer.periodic(const Duration(seconds: 20), (timer) {
+      _apiService.sendHeartbeat(user.username);
     });
-  }
 
-  Future<void> _checkNewMessages() async {
-    final user = await _authService.getCurrentUser();
-    if (user == null) return;
+    // Catch up on alerts raised before we connected
+    _checkPendingAlerts();
+  }
 
-    // Send heartbeat during polling to keep status "online"
-    _apiService.sendHeartbeat(user.username);
+  void _onServerEvent(ServerEvent event, String username) {
+    switch (event.type) {
+      case 'alert':
+        if (event.data['status'] == 'pending') {
+          final alert = HistoryRecord.fromJson({...event.data, 'isAlert': true});
+          if (!_isShowingAlert && !ApiService.shownAlertIds.contains(alert.id) && mounted) {
+            _showAlert(alert);
+          }
+        }
+        break;
+      case 'reset':
+        // Too many events were missed to replay; reload the current state
+        _checkPendingAlerts();
+        break;
+      case 'message':
+        if (event.data['recipient_username'] == username && event.data['sender_username'] != username) {
+          _checkNewMessage(username, event.data['sender_username']);
+        }
+        break;
+    }
+  }
 
-    final chatUsers = await _apiService.getChatUsers(user.username);
-    for (var chatUser in chatUsers) {
-      final lastCount = _lastUnreadCounts[chatUser.username] ?? 0;
-      if (chatUser.unreadCount > lastCount) {
-        // New message detected!
-        _showNewMessageNotification(chatUser);
-      }
-      _lastUnreadCounts[chatUser.username] = chatUser.unreadCount;
+  Future<void> _checkNewMessage(String username, String sender) async {
+    final chatUsers = await _apiService.getChatUsers(username);
+    final chatUser = chatUsers.where((u) => u.username == sender).firstOrNull;
+    if (chatUser != null) {
+      _showNewMessageNotification(chatUser);
     }
   }
 
@@ -201,17 +220,17 @@ class _HomeScreenState extends State<HomeScreen> {
     _playAlertSound();
 
     bool locallyAcknowledged = false;
-    Timer? remoteCheckTimer;
+    StreamSubscription<ServerEvent>? remoteAcknowledgement;
 
     if (mounted) {
-      // Start polling for remote acknowledgement
-      remoteCheckTimer = Timer.periodic(const Duration(seconds: 2), (timer) async {
-        final status = await _apiService.getAlertStatus(alert.id);
-        if (status == 'acknowledged' && !locallyAcknowledged && mounted) {
-          timer.cancel();
-          if (Navigator.of(context).canPop()) {
-            Navigator.of(context).pop(); // Close dialog remotely
-          }
+      // Close the dialog when someone else acknowledges the alert
+      remoteAcknowledgement = _eventService
+          .on('alert_acknowledged')
+          .where((e) => e.data['id'] == alert.id)
+          .listen((_) {
+        remoteAcknowledgement?.cancel();
+        if (!locallyAcknowledged && mounted && Navigator.of(context).canPop()) {
+          Navigator.of(context).pop(); // Close dialog remotely
         }
       });
 
@@ -224,7 +243,7 @@ class _HomeScreenState extends State<HomeScreen> {
           duration: alert.duration ?? 'unknown',
           onAcknowledge: () async {
             locallyAcknowledged = true;
-            remoteCheckTimer?.cancel();
+            remoteAcknowledgement?.cancel();
             _stopAlertSound();
             final user = await _authService.getCurrentUser();
             await _apiService.acknowledgeAlert(alert.id, user?.name ?? 'Nurse');
@@ -233,11 +252,14 @@ class _HomeScreenState extends State<HomeScreen> {
         ),
       );
       
-      remoteCheckTimer?.cancel();
+      remoteAcknowledgement?.cancel();
       _stopAlertSound();
     }
 
+    if (!mounted) return;
     setState(() => _isShowingAlert = false);
+    // Alerts that arrived while this one was open
+    _checkPendingAlerts();
   }
 
   final List<Widget> _screens = [
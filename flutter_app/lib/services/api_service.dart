@@ -215,6 +215,54 @@ class ApiService {
     }
   }
   
+  /// One page of analysis history (alerts: false) or alerts, newest first.
+  /// Pass the previous page's nextCursor to continue after it.
+  Future<RecordPage> getRecordPage({
+    required bool alerts,
+    String? cursor,
+    int limit = 50,
+    String? patientId,
+    String? status,
+  }) async {
+    final baseUrl = await getBaseUrl();
+    final key = alerts ? 'alerts' : 'history';
+    final uri = Uri.parse('$baseUrl/api/$key').replace(queryParameters: {
+      'limit': '$limit',
+      if (cursor != null) 'cursor': cursor,
+      if (patientId != null) 'patient_id': patientId,
+      if (status != null) 'status': status,
+    });
+    final response = await http.get(uri);
+    if (response.statusCode != 200) {
+      throw Exception('Failed to fetch $key: ${response.statusCode}');
+    }
+    final Map<String, dynamic> data = jsonDecode(response.body);
+    final List<dynamic> rows = data[key] ?? [];
+    return RecordPage(
+      rows.map((e) => HistoryRecord.fromJson(alerts ? {...e, 'isAlert': true} : e)).toList(),
+      data['next_cursor'],
+    );
+  }
+
+  /// Number of matching records, without fetching them
+  Future<int> getRecordCount({required bool alerts, String? patientId, String? status}) async {
+    final baseUrl = await getBaseUrl();
+    final uri = Uri.parse('$baseUrl/api/${alerts ? 'alerts' : 'history'}/count').replace(queryParameters: {
+      if (patientId != null) 'patient_id': patientId,
+      if (status != null) 'status': status,
+    });
+    try {
+      final response = await http.get(uri);
+      if (response.statusCode == 200) {
+        return jsonDecode(response.body)['count'] ?? 0;
+      }
+      return 0;
+    } catch (e) {
+      print('Error counting records: $e');
+      return 0;
+    }
+  }
+
   Future<bool> saveHistory(Map<String, dynamic> data) async {
      final baseUrl = await getBaseUrl();
      
@@ -314,12 +362,10 @@ class ApiService {
   Future<String?> getAlertStatus(String alertId) async {
     final baseUrl = await getBaseUrl();
     try {
-      final response = await http.get(Uri.parse('$baseUrl/api/alerts'));
+      final response = await http.get(Uri.parse('$baseUrl/api/alert/${Uri.encodeComponent(alertId)}'));
       if (response.statusCode == 200) {
-        final Map<String, dynamic> data = jsonDecode(response.body);
-        final List<dynamic> alerts = data['alerts'] ?? [];
-        final alert = alerts.firstWhere((a) => a['id'] == alertId, orElse: () => null);
-        return alert?['status'];
+        final Map<String, dynamic> alert = jsonDecode(response.body);
+        return alert['status'];
       }
       return null;
     } catch (e) {
@@ -2,6 +2,7 @@ import 'dart:convert';
 import 'package:shared_preferences/shared_preferences.dart';
 import '../models/user.dart';
 import 'api_service.dart';
+import 'event_service.dart';
 
 class AuthService {
   static const String _userKey = 'currentUser';
@@ -24,6 +25,7 @@ class AuthService {
   }
 
   Future<void> logout() async {
+    EventService().disconnect();
     final prefs = await SharedPreferences.getInstance();
     final userStr = prefs.getString(_userKey);
     if (userStr != null) {
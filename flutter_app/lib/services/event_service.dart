@@ -0,0 +1,127 @@
+import 'dart:async';
+import 'dart:convert';
+import 'package:http/http.dart' as http;
+import 'api_service.dart';
+
+/// One event pushed by the server over /api/events
+class ServerEvent {
+  final int? id;
+  final String type;
+  final Map<String, dynamic> data;
+
+  ServerEvent(this.id, this.type, this.data);
+}
+
+/// Shared connection to the server's event channel (server-sent events).
+///
+/// Alerts, acknowledgements, chat messages, presence changes and duty
+/// broadcasts arrive here as they happen, instead of every screen polling
+/// for them. After a dropped connection it reconnects with Last-Event-ID,
+/// so events sent in between are still delivered.
+class EventService {
+  static final EventService _instance = EventService._internal();
+  factory EventService() => _instance;
+  EventService._internal();
+
+  final _apiService = ApiService();
+  final _controller = StreamController<ServerEvent>.broadcast();
+  String? _username;
+  int? _lastEventId;
+  int _generation = 0;
+  http.Client? _client;
+  Duration _retry = const Duration(seconds: 3);
+
+  Stream<ServerEvent> get events => _controller.stream;
+
+  Stream<ServerEvent> on(String type) => events.where((e) => e.type == type);
+
+  void connect(String username) {
+    if (_client != null && _username == username) return;
+    disconnect();
+    _username = username;
+    _run(++_generation);
+  }
+
+  void disconnect() {
+    _generation++;
+    _client?.close();
+    _client = null;
+  }
+
+  Future<void> _run(int generation) async {
+    while (generation == _generation) {
+      final client = http.Client();
+      _client = client;
+      try {
+        final baseUrl = await _apiService.getBaseUrl();
+        final request = http.Request(
+          'GET',
+          Uri.parse('$baseUrl/api/events?username=${Uri.encodeQueryComponent(_username ?? '')}'),
+        );
+        request.headers['Accept'] = 'text/event-stream';
+        if (_lastEventId != null) {
+          request.headers['Last-Event-ID'] = '$_lastEventId';
+        }
+        final response = await client.send(request);
+        if (response.statusCode == 200) {
+          await _read(response.stream, generation);
+        }
+      } catch (e) {
+        if (generation == _generation) print('Event channel error: $e');
+      } finally {
+        client.close();
+      }
+      if (generation == _generation) await Future.delayed(_retry);
+    }
+  }
+
+  Future<void> _read(Stream<List<int>> stream, int generation) async {
+    String? type;
+    int? id;
+    final data = StringBuffer();
+
+    await for (final line in stream.transform(utf8.decoder).transform(const LineSplitter())) {
+      if (generation != _generation) break;
+      if (line.isEmpty) {
+        // Blank line ends an event
+        if (id != null) _lastEventId = id;
+        if (data.isNotEmpty) {
+          try {
+            final decoded = jsonDecode(data.toString());
+            _controller.add(ServerEvent(id, type ?? 'message',
+                decoded is Map<String, dynamic> ? decoded : <String, dynamic>{}));
+          } catch (e) {
+            print('Malformed server event: $e');
+          }
+        }
+        type = null;
+        id = null;
+        data.clear();
+        continue;
+      }
+      if (line.startsWith(':')) continue; // keep-alive comment
+
+      final colon = line.indexOf(':');
+      final field = colon < 0 ? line : line.substring(0, colon);
+      var value = colon < 0 ? '' : line.substring(colon + 1);
+      if (value.startsWith(' ')) value = value.substring(1);
+
+      switch (field) {
+        case 'event':
+          type = value;
+          break;
+        case 'data':
+          if (data.isNotEmpty) data.write('\n');
+          data.write(value);
+          break;
+        case 'id':
+          id = int.tryParse(value);
+          break;
+        case 'retry':
+          final ms = int.tryParse(value);
+          if (ms != null) _retry = Duration(milliseconds: ms);
+          break;
+      }
+    }
+  }
+}
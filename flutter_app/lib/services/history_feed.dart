@@ -0,0 +1,59 @@
+import '../models/history_record.dart';
+import 'api_service.dart';
+
+/// Analysis history and alerts merged newest first, fetched a page at a time.
+///
+/// Both endpoints are paged separately, so a record is only shown once it is
+/// newer than the oldest record loaded from every table that still has more
+/// pages; older ones follow with the next loadMore().
+class HistoryFeed {
+  final int pageSize;
+  final _apiService = ApiService();
+  final _history = _Source(alerts: false);
+  final _alerts = _Source(alerts: true);
+
+  HistoryFeed({this.pageSize = 50});
+
+  bool get hasMore => !_history.done || !_alerts.done;
+
+  List<HistoryRecord> get records {
+    String? boundary;
+    for (final source in [_history, _alerts]) {
+      if (source.done || source.records.isEmpty) continue;
+      final oldest = source.records.last.timestamp;
+      if (boundary == null || oldest.compareTo(boundary) > 0) boundary = oldest;
+    }
+    final merged = [..._history.records, ..._alerts.records]
+        .where((r) => boundary == null || r.timestamp.compareTo(boundary) >= 0)
+        .toList();
+    merged.sort((a, b) => b.timestamp.compareTo(a.timestamp));
+    return merged;
+  }
+
+  Future<void> loadMore() async {
+    await Future.wait([
+      for (final source in [_history, _alerts])
+        if (!source.done) _load(source),
+    ]);
+  }
+
+  Future<void> _load(_Source source) async {
+    final page = await _apiService.getRecordPage(
+      alerts: source.alerts,
+      cursor: source.cursor,
+      limit: pageSize,
+    );
+    source.records.addAll(page.records);
+    source.cursor = page.nextCursor;
+    source.done = page.nextCursor == null;
+  }
+}
+
+class _Source {
+  final bool alerts;
+  final List<HistoryRecord> records = [];
+  String? cursor;
+  bool done = false;
+
+  _Source({required this.alerts});
+}
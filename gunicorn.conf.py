@@ -0,0 +1,52 @@
+# Loaded automatically by gunicorn from the working directory (see Procfile)
+import gc
+import os
+
+# Import the app, and with it load the model, once in the master. Workers are forked from it
+# and share the weights and imported modules instead of each loading its own copy.
+# GUNICORN_PRELOAD=0 loads them in every worker again (needed for --reload).
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+def on_starting(server):
+    # Bed cameras are monitored inside one worker process, which also owns the beds registered
+    # through it. More workers would each monitor (and alert on) every bed, so they are only
+    # allowed with the monitor turned off.
+    if server.cfg.workers > 1 and os.environ.get('WARD_MONITOR_ENABLED', '1') == '1':
+        server.log.error("The ward monitor needs a single worker: run with -w 1, "
+                         "or set WARD_MONITOR_ENABLED=0 for REST-only workers")
+        raise SystemExit(1)
+
+# torch's intra-op thread count, restored in every worker (see when_ready)
+torch_threads = None
+
+def when_ready(server):
+    # The app loads its model on first use; with preload_app, load it before the workers fork.
+    # torch's OpenMP pool does not survive fork once the master has used it (workers hang on
+    # their first inference), so the master loads on one thread and runs nothing in parallel.
+    # onnxruntime starts its thread pool with the session: that backend loads in each worker.
+    global torch_threads
+    if not server.cfg.preload_app:
+        return
+    from app import ensure_model, INFERENCE_BACKEND
+    if INFERENCE_BACKEND == 'onnx':
+        return
+    import torch
+    torch_threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    ensure_model()
+
+def post_fork(server, worker):
+    if torch_threads is not None:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the collector's generations: collections in the
+    # workers would otherwise write to these objects' headers and copy the master's pages
+    gc.freeze()
+
+def post_worker_init(worker):
+    # The only worker (see on_starting) monitors the bed cameras and serves their event feeds
+    from app import start_ward_monitor
+    start_ward_monitor()
+    worker.log.info("Worker ready (pid: %s)", worker.pid)
@@ -0,0 +1,259 @@
+"""Posture classifier: checkpoint loading, preprocessing and batched inference"""
+import io
+import os
+import copy
+import json
+import warnings
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torchvision import models
+import torchvision.transforms as T
+import torchvision.transforms.functional as TF
+from PIL import Image
+import cv2
+from engine import (DEFAULT_CLASSES, RESIZE_SIZE, IMAGENET_MEAN, IMAGENET_STD, INFERENCE_BATCH_SIZE,
+                    TORCH_BACKENDS, INFERENCE_BACKEND, list_images, to_results, iter_batched)
+
+# Fold the 3-channel stem into 1 channel at load time (inputs become 1xHxW)
+SINGLE_CHANNEL_STEM = os.environ.get('SINGLE_CHANNEL_STEM', '1') == '1'
+
+# Folder of sample images (pred.py layout) used to calibrate the int8 backend
+CALIBRATION_DIR = os.environ.get('CALIBRATION_DIR')
+CALIBRATION_LIMIT = int(os.environ.get('CALIBRATION_LIMIT', 128))
+
+def load_checkpoint(weights_path):
+    try:
+        ckpt = torch.load(weights_path, map_location="cpu")
+        classes = ckpt.get("classes", DEFAULT_CLASSES)
+        img_size = int(ckpt.get("img_size", 224))
+        state_dict = ckpt["state_dict"]
+        return state_dict, classes, img_size
+    except Exception as e:
+        print(f"Error loading checkpoint: {e}")
+        # Return default values if model loading fails
+        return None, DEFAULT_CLASSES, 224
+
+def build_model(num_classes):
+    model = models.resnet18(weights=None)
+    model.fc = nn.Linear(model.fc.in_features, num_classes)
+    model.eval()
+    return model
+
+class GrayscaleStem(nn.Module):
+    """ResNet conv1 folded to take one [0, 1] grey channel instead of three normalized copies.
+
+    Per channel the normalized input is x / std_c - mean_c / std_c, so the conv
+    splits into a 1-channel conv over x plus a constant term. The constant term
+    is not uniform near the borders (padding is zero in normalized space), so it
+    is precomputed once as a bias map for the fixed crop size. When the following
+    eval-mode BatchNorm is passed in, it is folded into the weights and bias map too.
+    """
+
+    def __init__(self, conv, img_size, mean=IMAGENET_MEAN, std=IMAGENET_STD, bn=None):
+        super().__init__()
+        weight = conv.weight.detach()
+        mean = torch.tensor(mean, dtype=weight.dtype).view(1, -1, 1, 1)
+        std = torch.tensor(std, dtype=weight.dtype).view(1, -1, 1, 1)
+
+        self.conv = nn.Conv2d(1, conv.out_channels, conv.kernel_size, conv.stride, conv.padding, bias=False)
+        self.conv.weight.data.copy_((weight / std).sum(dim=1, keepdim=True))
+
+        offset_weight = (weight * mean / std).sum(dim=1, keepdim=True)
+        inside = torch.ones(1, 1, img_size, img_size, dtype=weight.dtype)
+        with torch.no_grad():
+            bias_map = -F.conv2d(inside, offset_weight, stride=conv.stride, padding=conv.padding)
+
+        if bn is not None:
+            scale = bn.weight.detach() / torch.sqrt(bn.running_var + bn.eps)
+            shift = bn.bias.detach() - bn.running_mean * scale
+            self.conv.weight.data.mul_(scale.view(-1, 1, 1, 1))
+            bias_map = bias_map * scale.view(1, -1, 1, 1) + shift.view(1, -1, 1, 1)
+        self.register_buffer('bias_map', bias_map)
+
+    def forward(self, x):
+        return self.conv(x) + self.bias_map
+
+def fold_grayscale_stem(model, img_size):
+    """Replace model.conv1 and model.bn1 in place with the single-channel equivalent (eval only)"""
+    model.conv1 = GrayscaleStem(model.conv1, img_size, bn=model.bn1)
+    model.bn1 = nn.Identity()
+    return model
+
+def input_channels(model):
+    return 1 if isinstance(getattr(model, 'conv1', None), GrayscaleStem) else 3
+
+def load_calibration_batch(folder, transform, limit=CALIBRATION_LIMIT):
+    files = list_images(folder)[:limit]
+    if not files:
+        raise ValueError(f"No calibration images found in {folder}")
+    return torch.stack([transform(Image.open(p).convert("L")) for p in files])
+
+def compile_backend(model, backend, example, calibration=None):
+    """Convert an eager fp32 model to the requested inference backend"""
+    if backend == 'eager':
+        return model
+    if backend == 'torchscript':
+        with torch.no_grad():
+            return torch.jit.freeze(torch.jit.trace(model, example))
+    if backend == 'int8':
+        if calibration is None:
+            raise ValueError("int8 backend needs calibration images (set CALIBRATION_DIR)")
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+        engines = torch.backends.quantized.supported_engines
+        engine = 'x86' if 'x86' in engines else ('fbgemm' if 'fbgemm' in engines else 'qnnpack')
+        torch.backends.quantized.engine = engine
+        with warnings.catch_warnings():
+            # torch.ao.quantization emits deprecation notices on every call
+            warnings.simplefilter("ignore")
+            prepared = prepare_fx(copy.deepcopy(model), get_default_qconfig_mapping(engine), (example,))
+            with torch.no_grad():
+                for i in range(0, len(calibration), INFERENCE_BATCH_SIZE):
+                    prepared(calibration[i:i + INFERENCE_BATCH_SIZE])
+            return convert_fx(prepared)
+    raise ValueError(f"Unknown inference backend: {backend} (expected one of {', '.join(TORCH_BACKENDS)})")
+
+def load_model(weights_path, single_channel_stem=SINGLE_CHANNEL_STEM, backend=INFERENCE_BACKEND,
+               calibration_dir=CALIBRATION_DIR):
+    """Load a checkpoint into a ready-to-run model, returning (model, classes, img_size, channels)"""
+    state_dict, classes, img_size = load_checkpoint(weights_path)
+    if not state_dict:
+        raise Exception("State dict is None")
+    if backend == 'int8':
+        # The folded stem's float bias map can't be fused into the int8 kernels,
+        # which makes it slower than quantizing the original 3-channel stem
+        single_channel_stem = False
+
+    model = build_model(len(classes))
+    model.load_state_dict(state_dict)
+    if single_channel_stem:
+        fold_grayscale_stem(model, img_size)
+    model.eval()
+    channels = input_channels(model)
+
+    if backend != 'eager':
+        try:
+            calibration = None
+            if backend == 'int8' and calibration_dir:
+                calibration = load_calibration_batch(calibration_dir, get_eval_transform(img_size, channels))
+            example = torch.zeros(1, channels, img_size, img_size)
+            model = compile_backend(model, backend, example, calibration)
+        except Exception as e:
+            print(f"⚠️  Could not build {backend} backend ({e}), using eager fp32")
+    return model, classes, img_size, channels
+
+def share_memory(model):
+    """Move the model's parameters and buffers into shared memory; returns the bytes moved.
+
+    Forked workers then map the master's copy even if their allocator writes
+    next to a small tensor. Constants folded into a frozen TorchScript graph and
+    int8 packed weights are not parameters; those stay copy-on-write.
+    """
+    moved = 0
+    for tensor in [*model.parameters(), *model.buffers()]:
+        if not tensor.is_shared():
+            tensor.share_memory_()
+            moved += tensor.numel() * tensor.element_size()
+    return moved
+
+def get_eval_transform(img_size, channels=3):
+    if channels == 1:
+        return T.Compose([
+            T.Grayscale(num_output_channels=1),
+            T.Resize(RESIZE_SIZE),
+            T.CenterCrop(img_size),
+            T.ToTensor(),
+        ])
+    return T.Compose([
+        T.Grayscale(num_output_channels=3),
+        T.Resize(RESIZE_SIZE),
+        T.CenterCrop(img_size),
+        T.ToTensor(),
+        T.Normalize(mean=IMAGENET_MEAN,
+                    std=IMAGENET_STD),
+    ])
+
+def _to_gray(frame):
+    if frame.ndim == 2:
+        return frame
+    # Same ITU-R 601-2 luma weights PIL uses for convert("L")
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+def preprocess_frames(frames, img_size, channels=3):
+    """Turn raw OpenCV BGR frames into an NxCxHxW batch without going through PIL.
+
+    Equivalent to frame -> PIL "L" image -> get_eval_transform(img_size, channels),
+    to within one grey level of rounding in the antialiased resize.
+    """
+    # Resize frame by frame (stacking full-resolution frames costs more than it saves),
+    # then convert and normalize the small crops as one batch
+    x = torch.cat([
+        TF.center_crop(TF.resize(torch.from_numpy(_to_gray(f))[None, None], RESIZE_SIZE, antialias=True), img_size)
+        for f in frames
+    ])
+    x = x.float().div_(255.0)
+    if channels == 1:
+        # Normalization is folded into GrayscaleStem
+        return x
+    out = x.expand(-1, len(IMAGENET_MEAN), -1, -1).clone()
+    for c, (mean, std) in enumerate(zip(IMAGENET_MEAN, IMAGENET_STD)):
+        out[:, c].sub_(mean).div_(std)
+    return out
+
+def get_frame_preprocess(img_size, channels=3):
+    """Batch preprocessor for raw video frames, for use with iter_predictions"""
+    return lambda frames: preprocess_frames(frames, img_size, channels)
+
+def batch_transform(transform):
+    """Wrap a per-image PIL transform as a batch preprocessor"""
+    return lambda images: torch.stack([transform(img) for img in images])
+
+def predict_batch(model, x, class_names):
+    """Run one forward pass over a stacked batch, returning (label, confidence, probs) per row"""
+    with torch.no_grad():
+        logits = model(torch.as_tensor(x))
+        probs = torch.softmax(logits, dim=1).cpu().numpy()
+    return to_results(probs, class_names)
+
+def iter_predictions(model, preprocess, items, class_names, batch_size=INFERENCE_BATCH_SIZE):
+    """Classify (key, input) pairs in batches, yielding (key, (label, confidence, probs)) in input order.
+
+    preprocess maps a list of inputs to an NxCxHxW tensor.
+    """
+    return iter_batched(lambda inputs: predict_batch(model, preprocess(inputs), class_names), items, batch_size)
+
+def predict_all(model, preprocess, inputs, class_names, batch_size=INFERENCE_BATCH_SIZE):
+    """Classify a list of inputs, returning results in the same order"""
+    return [result for _, result in iter_predictions(model, preprocess, enumerate(inputs), class_names, batch_size)]
+
+def predict_one(model, transform, img_data, class_names):
+    try:
+        if isinstance(img_data, str):
+            img = Image.open(img_data).convert("L")
+        else:
+            img = Image.open(io.BytesIO(img_data)).convert("L")
+
+        return predict_all(model, batch_transform(transform), [img], class_names)[0]
+    except Exception as e:
+        raise Exception(f"Prediction error: {str(e)}")
+
+def export_onnx(weights_path, output_path, opset=17):
+    """Export the eager model to ONNX, storing classes, img_size and input channels as metadata"""
+    import onnx
+
+    model, classes, img_size, channels = load_model(weights_path, backend='eager')
+    example = torch.zeros(1, channels, img_size, img_size)
+    torch.onnx.export(model, (example,), output_path, input_names=['input'], output_names=['logits'],
+                      dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+                      opset_version=opset, dynamo=False)
+
+    onnx_model = onnx.load(output_path)
+    metadata = {'classes': json.dumps(classes), 'img_size': str(img_size), 'input_channels': str(channels)}
+    for key, value in metadata.items():
+        entry = onnx_model.metadata_props.add()
+        entry.key = key
+        entry.value = value
+    onnx.save(onnx_model, output_path)
+    return classes, img_size, channels
@@ -175,18 +175,46 @@
         }
     };
 
-    // Process a single interval
-    ThermalVisionApp.prototype.processInterval = async function (startTime, endTime) {
+    // Upload the selected video once; intervals are then analyzed against its handle
+    ThermalVisionApp.prototype.openVideoSession = async function () {
         const formData = new FormData();
         formData.append('file', this.selectedFile);
-        formData.append('start_time', startTime.toString());
-        formData.append('end_time', endTime.toString());
 
-        const response = await fetch(`${this.API_BASE}/predict_video_interval`, {
+        const response = await fetch(`${this.API_BASE}/api/videos`, {
             method: 'POST',
             body: formData
         });
 
+        if (!response.ok) {
+            const errorText = await response.text();
+            throw new Error(`Video upload failed: ${response.status} - ${errorText}`);
+        }
+
+        const data = await response.json();
+        this.videoSession = { file: this.selectedFile, id: data.video_id };
+        console.log(`📤 Video uploaded once as session ${data.video_id.slice(0, 12)}…`);
+        return data.video_id;
+    };
+
+    // Process a single interval
+    ThermalVisionApp.prototype.processInterval = async function (startTime, endTime) {
+        if (!this.videoSession || this.videoSession.file !== this.selectedFile) {
+            await this.openVideoSession();
+        }
+
+        const requestInterval = () => fetch(`${this.API_BASE}/api/videos/${this.videoSession.id}/interval`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ start_time: startTime, end_time: endTime })
+        });
+
+        let response = await requestInterval();
+        if (response.status === 404) {
+            // Session expired on the server: upload again and retry once
+            await this.openVideoSession();
+            response = await requestInterval();
+        }
+
         if (!response.ok) {
             const errorText = await response.text();
             throw new Error(`Interval processing failed: ${response.status} - ${errorText}`);
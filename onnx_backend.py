@@ -0,0 +1,104 @@
+"""onnxruntime inference backend: serves the exported classifier without importing torch.
+
+Mirrors the public functions of inference.py. Preprocessing reproduces
+get_eval_transform with PIL and NumPy so outputs match the torch path.
+"""
+import io
+import json
+import os
+import numpy as np
+import cv2
+from PIL import Image
+import onnxruntime as ort
+from engine import (DEFAULT_CLASSES, RESIZE_SIZE, IMAGENET_MEAN, IMAGENET_STD, INFERENCE_BATCH_SIZE,
+                    to_results, iter_batched)
+
+_MEAN = np.array(IMAGENET_MEAN, dtype=np.float32).reshape(1, -1, 1, 1)
+_STD = np.array(IMAGENET_STD, dtype=np.float32).reshape(1, -1, 1, 1)
+
+class OnnxModel:
+    """onnxruntime session plus the metadata written by inference.export_onnx"""
+
+    def __init__(self, path):
+        self.session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.classes = json.loads(meta['classes']) if 'classes' in meta else DEFAULT_CLASSES
+        self.img_size = int(meta.get('img_size', 224))
+        self.channels = int(meta.get('input_channels', 3))
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x):
+        return self.session.run(None, {self.input_name: x})[0]
+
+def load_model(weights_path):
+    """Load an exported .onnx model, returning (model, classes, img_size, channels)"""
+    if not os.path.exists(weights_path):
+        raise FileNotFoundError(f"ONNX model {weights_path} not found (run 'python app.py export-onnx')")
+    model = OnnxModel(weights_path)
+    return model, model.classes, model.img_size, model.channels
+
+def share_memory(model):
+    """onnxruntime owns its initializers, so forked workers share them copy-on-write only"""
+    return 0
+
+def _resize_crop(img, img_size):
+    # Same geometry and resampling as T.Resize(RESIZE_SIZE) + T.CenterCrop(img_size) on a PIL image
+    w, h = img.size
+    if w <= h:
+        new_w, new_h = RESIZE_SIZE, int(RESIZE_SIZE * h / w)
+    else:
+        new_w, new_h = int(RESIZE_SIZE * w / h), RESIZE_SIZE
+    img = img.resize((new_w, new_h), Image.BILINEAR)
+    left = int(round((new_w - img_size) / 2.0))
+    top = int(round((new_h - img_size) / 2.0))
+    return np.asarray(img.crop((left, top, left + img_size, top + img_size)), dtype=np.float32) / 255.0
+
+def _normalize(x, channels):
+    # x: NxHxW grey values in [0, 1]
+    x = x[:, None]
+    if channels == 1:
+        return x
+    return ((x - _MEAN) / _STD).astype(np.float32)
+
+def get_eval_transform(img_size, channels=3):
+    return lambda img: _normalize(_resize_crop(img.convert("L"), img_size)[None], channels)[0]
+
+def preprocess_frames(frames, img_size, channels=3):
+    """Turn raw OpenCV BGR frames into an NxCxHxW float32 batch"""
+    gray = [f if f.ndim == 2 else cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
+    return _normalize(np.stack([_resize_crop(Image.fromarray(g), img_size) for g in gray]), channels)
+
+def get_frame_preprocess(img_size, channels=3):
+    """Batch preprocessor for raw video frames, for use with iter_predictions"""
+    return lambda frames: preprocess_frames(frames, img_size, channels)
+
+def batch_transform(transform):
+    """Wrap a per-image transform as a batch preprocessor"""
+    return lambda images: np.stack([transform(img) for img in images])
+
+def predict_batch(model, x, class_names):
+    """Run one forward pass over a stacked batch, returning (label, confidence, probs) per row"""
+    logits = model(np.ascontiguousarray(x, dtype=np.float32))
+    logits = logits - logits.max(axis=1, keepdims=True)
+    probs = np.exp(logits)
+    probs /= probs.sum(axis=1, keepdims=True)
+    return to_results(probs, class_names)
+
+def iter_predictions(model, preprocess, items, class_names, batch_size=INFERENCE_BATCH_SIZE):
+    """Classify (key, input) pairs in batches, yielding (key, (label, confidence, probs)) in input order"""
+    return iter_batched(lambda inputs: predict_batch(model, preprocess(inputs), class_names), items, batch_size)
+
+def predict_all(model, preprocess, inputs, class_names, batch_size=INFERENCE_BATCH_SIZE):
+    """Classify a list of inputs, returning results in the same order"""
+    return [result for _, result in iter_predictions(model, preprocess, enumerate(inputs), class_names, batch_size)]
+
+def predict_one(model, transform, img_data, class_names):
+    try:
+        if isinstance(img_data, str):
+            img = Image.open(img_data).convert("L")
+        else:
+            img = Image.open(io.BytesIO(img_data)).convert("L")
+
+        return predict_all(model, batch_transform(transform), [img], class_names)[0]
+    except Exception as e:
+        raise Exception(f"Prediction error: {str(e)}")
@@ -0,0 +1,246 @@
+"""Who is online, tracked in memory and persisted to the nurses table in batches.
+
+Every client heartbeats every 20 seconds, and each heartbeat used to be an
+UPDATE and a commit on `nurses`. Now a heartbeat only records the time in a
+dict. Expiry deadlines sit in a min-heap, so finding users whose heartbeat
+stopped costs nothing until one actually expires. A background thread writes
+the heartbeat times gathered since its last pass in a single transaction every
+PRESENCE_PERSIST_SECONDS.
+
+Worker processes share presence through the table. Each pass also reads the
+users other workers have marked online, keeping their newest last_seen. Going
+online and going offline are written immediately with conditional UPDATEs, so
+exactly one worker sees a transition succeed and announces it.
+"""
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Users without a heartbeat for this long are shown offline
+PRESENCE_TIMEOUT_SECONDS = float(os.environ.get('PRESENCE_TIMEOUT_SECONDS', 60))
+
+# How often heartbeat times are written to the nurses table and other workers' are read back
+PRESENCE_PERSIST_SECONDS = float(os.environ.get('PRESENCE_PERSIST_SECONDS', 5))
+
+# Statements of a sync pass (also checked by `python app.py explain-db`)
+# Never moves last_seen backwards: another worker may have a newer heartbeat
+HEARTBEAT_QUERY = ("UPDATE nurses SET is_online = 1, last_seen = ?1 "
+                   "WHERE username = ?2 AND (last_seen IS NULL OR last_seen < ?1)")
+ONLINE_QUERY = "SELECT username, last_seen FROM nurses WHERE is_online = 1"
+EXPIRE_QUERY = ("UPDATE nurses SET is_online = 0 WHERE username = ? AND is_online = 1 "
+                "AND (last_seen IS NULL OR last_seen < ?) RETURNING username")
+
+def to_iso(ts):
+    return datetime.fromtimestamp(ts).isoformat()
+
+def from_iso(value):
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+class PresenceTracker:
+    def __init__(self, connect, on_change=None, timeout=PRESENCE_TIMEOUT_SECONDS,
+                 persist_seconds=PRESENCE_PERSIST_SECONDS):
+        self.connect = connect
+        # on_change(username, is_online), called by the worker that made the transition
+        self.on_change = on_change
+        self.timeout = timeout
+        self.persist_seconds = persist_seconds
+        self.beats = 0
+        self.transactions = 0
+        self.expired = 0
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._last_seen = {}     # username -> last heartbeat (epoch seconds)
+        self._heap = []          # (expires_at, username); stale entries are skipped
+        self._dirty = set()      # heartbeats not written yet
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # --- heartbeats ---
+
+    def beat(self, username):
+        """Record a heartbeat. Only a user not known to be online costs a database round trip."""
+        now = time.time()
+        with self._lock:
+            self.beats += 1
+            known = username in self._last_seen
+            if known:
+                self._touch(username, now)
+                self._dirty.add(username)
+        self.start()
+        if known:
+            return
+
+        conn = self.connect()
+        try:
+            came_online = conn.execute(
+                "UPDATE nurses SET is_online = 1, last_seen = ? WHERE username = ? AND is_online = 0 RETURNING username",
+                (to_iso(now), username)).fetchone() is not None
+            exists = came_online or conn.execute("SELECT 1 FROM nurses WHERE username = ?", (username,)).fetchone()
+            conn.commit()
+            self.transactions += 1
+        finally:
+            conn.close()
+        if not exists:
+            return
+        with self._lock:
+            self._touch(username, now)
+            self._dirty.add(username)
+        if came_online:
+            self._changed(username, True)
+
+    def login(self, username):
+        """Mark online and write it through (login is announced even if already online)"""
+        now = time.time()
+        conn = self.connect()
+        try:
+            conn.execute("UPDATE nurses SET is_online = 1, last_seen = ? WHERE username = ?", (to_iso(now), username))
+            conn.commit()
+            self.transactions += 1
+        finally:
+            conn.close()
+        with self._lock:
+            self._touch(username, now)
+        self.start()
+
+    def logout(self, username):
+        conn = self.connect()
+        try:
+            conn.execute("UPDATE nurses SET is_online = 0, last_seen = NULL WHERE username = ?", (username,))
+            conn.commit()
+            self.transactions += 1
+        finally:
+            conn.close()
+        with self._lock:
+            self._last_seen.pop(username, None)
+            self._dirty.discard(username)
+
+    def _touch(self, username, ts):
+        # Caller holds the lock
+        self._last_seen[username] = ts
+        heapq.heappush(self._heap, (ts + self.timeout, username))
+        if len(self._heap) > 4 * len(self._last_seen) + 64:
+            # Mostly superseded entries: rebuild from the live deadlines
+            self._heap = [(seen + self.timeout, name) for name, seen in self._last_seen.items()]
+            heapq.heapify(self._heap)
+
+    # --- reading ---
+
+    def is_online(self, username):
+        with self._lock:
+            seen = self._last_seen.get(username)
+        return seen is not None and time.time() - seen <= self.timeout
+
+    def last_seen(self, username):
+        with self._lock:
+            seen = self._last_seen.get(username)
+        return to_iso(seen) if seen is not None else None
+
+    def apply(self, users):
+        """Overwrite is_online/last_seen of nurses rows with the live view"""
+        now = time.time()
+        with self._lock:
+            live = {user['username']: self._last_seen.get(user['username']) for user in users}
+        for user in users:
+            seen = live[user['username']]
+            if seen is not None:
+                user['is_online'] = 1 if now - seen <= self.timeout else 0
+                user['last_seen'] = to_iso(seen)
+            elif user['is_online'] and now - (from_iso(user['last_seen']) or 0) > self.timeout:
+                # Not merged yet and already silent too long: the next sync expires it
+                user['is_online'] = 0
+        return users
+
+    # --- background pass ---
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='presence', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except sqlite3.Error as e:
+                print(f"Presence sync error: {e}")
+            time.sleep(self.persist_seconds)
+
+    def sync(self):
+        """Write buffered heartbeats, merge other workers' users and expire the silent ones"""
+        with self._lock:
+            dirty = [(to_iso(self._last_seen[name]), name) for name in self._dirty if name in self._last_seen]
+            self._dirty.clear()
+
+        conn = self.connect()
+        try:
+            if dirty:
+                conn.executemany(HEARTBEAT_QUERY, dirty)
+            online = conn.execute(ONLINE_QUERY).fetchall()
+            conn.commit()
+            self.transactions += 1
+
+            with self._lock:
+                for username, value in online:
+                    seen = from_iso(value)
+                    if seen is not None and seen > self._last_seen.get(username, 0):
+                        self._touch(username, seen)
+                    elif seen is None and username not in self._last_seen:
+                        # Online without a heartbeat time: give it one timeout from now
+                        self._touch(username, time.time())
+                expired = self._pop_expired(time.time())
+
+            went_offline = []
+            for username, seen in expired:
+                cutoff = to_iso(seen + 0.001)
+                if conn.execute(EXPIRE_QUERY, (username, cutoff)).fetchone():
+                    went_offline.append(username)
+            if expired:
+                conn.commit()
+                self.transactions += 1
+        finally:
+            conn.close()
+
+        self.expired += len(went_offline)
+        for username in went_offline:
+            self._changed(username, False)
+
+    def _pop_expired(self, now):
+        """(username, last_seen) of users whose deadline passed; caller holds the lock"""
+        expired = []
+        while self._heap and self._heap[0][0] < now:
+            expires_at, username = heapq.heappop(self._heap)
+            seen = self._last_seen.get(username)
+            if seen is None or seen + self.timeout != expires_at:
+                continue  # superseded by a later heartbeat, or logged out
+            del self._last_seen[username]
+            self._dirty.discard(username)
+            expired.append((username, seen))
+        return expired
+
+    def _changed(self, username, is_online):
+        if self.on_change is not None:
+            try:
+                self.on_change(username, is_online)
+            except Exception as e:
+                print(f"Error announcing presence of {username}: {e}")
+
+    def stats(self):
+        with self._lock:
+            online = len(self._last_seen)
+            pending = len(self._dirty)
+        return {
+            'online': online,
+            'pending_writes': pending,
+            'heartbeats': self.beats,
+            'transactions': self.transactions,
+            'expired': self.expired,
+        }
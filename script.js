@@ -22,6 +22,10 @@ class ThermalVisionApp {
             HISTORY: 'thermalvision_history'
         };
 
+        // History table: rows per /api/history and /api/alerts page
+        this.HISTORY_PAGE_SIZE = 100;
+        this.historyFeeds = null;
+
         // ALERT QUEUE SYSTEM
         this.alertQueue = [];
         this.isProcessingAlert = false;
@@ -201,6 +205,7 @@ class ThermalVisionApp {
                 this.isAuthenticated = true;
                 this.updateUIForUserRole();
                 this.showPage('analysis-page');
+                this.connectEventChannel();
                 console.log('✅ User authenticated:', this.currentUser.username);
             } catch (error) {
                 console.error('❌ Auth token corrupted:', error);
@@ -254,6 +259,7 @@ class ThermalVisionApp {
 
             localStorage.setItem('currentUser', JSON.stringify(this.currentUser));
             this.isAuthenticated = true;
+            this.connectEventChannel();
 
             // Enable audio after user interaction (login)
             this.enableAudio();
@@ -269,6 +275,35 @@ class ThermalVisionApp {
         }
     }
 
+    // Server-pushed alert changes (EventSource reconnects and resumes with Last-Event-ID by itself)
+    connectEventChannel() {
+        if (this.eventSource || typeof EventSource === 'undefined') return;
+
+        const username = encodeURIComponent(this.currentUser.username);
+        this.eventSource = new EventSource(`${this.API_BASE}/api/events?username=${username}&types=alert,alert_acknowledged,alert_deleted,history_cleared,reset`);
+
+        const refreshHistory = () => {
+            // Coalesce bursts of events into one reload of the history table
+            clearTimeout(this.historyRefreshTimer);
+            this.historyRefreshTimer = setTimeout(() => {
+                if (document.getElementById('history-page').classList.contains('active')) {
+                    this.loadHistoryData();
+                }
+            }, 300);
+        };
+
+        ['alert', 'alert_acknowledged', 'alert_deleted', 'history_cleared', 'reset'].forEach(type => {
+            this.eventSource.addEventListener(type, refreshHistory);
+        });
+    }
+
+    disconnectEventChannel() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+
     // Show navigation tabs after successful login
     showNavigationTabs() {
         const navTabs = document.querySelectorAll('.nav-tab');
@@ -310,6 +345,7 @@ class ThermalVisionApp {
     }
 
     logout() {
+        this.disconnectEventChannel();
         this.currentUser = null;
         this.currentPatient = null;
         this.isAuthenticated = false;
@@ -1285,11 +1321,12 @@ class ThermalVisionApp {
 
         if (exportBtn) exportBtn.addEventListener('click', () => this.exportHistory());
         if (clearBtn) clearBtn.addEventListener('click', () => this.clearHistory());
-        if (searchInput) searchInput.addEventListener('input', () => this.loadHistoryData());
+        // Filters apply to the pages already loaded; Load more fetches older records
+        if (searchInput) searchInput.addEventListener('input', () => this.renderHistory());
 
         filters.forEach(filterId => {
             const filter = document.getElementById(filterId);
-            if (filter) filter.addEventListener('change', () => this.loadHistoryData());
+            if (filter) filter.addEventListener('change', () => this.renderHistory());
         });
     }
 
@@ -1302,41 +1339,106 @@ class ThermalVisionApp {
         try {
             this.showLoading(true);
 
-            // Fetch from backend
-            const [historyRes, alertsRes] = await Promise.all([
-                fetch(`${this.API_BASE}/api/history`),
-                fetch(`${this.API_BASE}/api/alerts`)
+            // Start again from the newest page of both tables
+            const feeds = {
+                history: { path: '/api/history', key: 'history', isAlert: false, records: [], cursor: null, done: false },
+                alerts: { path: '/api/alerts', key: 'alerts', isAlert: true, records: [], cursor: null, done: false },
+                totals: { history: 0, alerts: 0 }
+            };
+            this.historyFeeds = feeds;
+
+            const [historyCount, alertsCount] = await Promise.all([
+                fetch(`${this.API_BASE}/api/history/count`).then(res => res.json()),
+                fetch(`${this.API_BASE}/api/alerts/count`).then(res => res.json()),
+                this.fetchHistoryPage(feeds.history),
+                this.fetchHistoryPage(feeds.alerts)
             ]);
+            if (this.historyFeeds !== feeds) return; // reloaded meanwhile
 
-            const historyData = await historyRes.json();
-            const alertsData = await alertsRes.json();
+            feeds.totals = { history: historyCount.count || 0, alerts: alertsCount.count || 0 };
+            this.renderHistory();
 
-            const history = Array.isArray(historyData) ? historyData : [];
-            const alerts = alertsData.alerts ? alertsData.alerts : [];
+        } catch (error) {
+            console.error('❌ Error loading history:', error);
+            this.showNotification('Failed to load history from server', 'error');
+        } finally {
+            this.showLoading(false);
+        }
+    }
 
-            // Combine and sort records
-            let allRecords = [...history, ...alerts.map(alert => ({
-                ...alert,
-                isAlert: true
-            }))].sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
+    async fetchHistoryPage(feed) {
+        const params = new URLSearchParams({ limit: this.HISTORY_PAGE_SIZE });
+        if (feed.cursor) params.set('cursor', feed.cursor);
 
-            // Cache records for view details
-            this.cachedRecords = allRecords;
+        const res = await fetch(`${this.API_BASE}${feed.path}?${params}`);
+        const data = await res.json();
+        const rows = data[feed.key] || [];
 
-            // Apply filters
-            allRecords = this.applyFilters(allRecords);
+        feed.records.push(...(feed.isAlert ? rows.map(alert => ({ ...alert, isAlert: true })) : rows));
+        feed.cursor = data.next_cursor || null;
+        feed.done = !feed.cursor;
+    }
 
-            this.displayHistoryTable(allRecords);
-            this.updateHistoryStats(allRecords);
+    async loadMoreHistory() {
+        const feeds = this.historyFeeds;
+        if (!feeds) return;
 
+        try {
+            this.showLoading(true);
+            await Promise.all([feeds.history, feeds.alerts]
+                .filter(feed => !feed.done)
+                .map(feed => this.fetchHistoryPage(feed)));
+            if (this.historyFeeds === feeds) this.renderHistory();
         } catch (error) {
-            console.error('❌ Error loading history:', error);
-            this.showNotification('Failed to load history from server', 'error');
+            console.error('❌ Error loading more history:', error);
+            this.showNotification('Failed to load more history', 'error');
         } finally {
             this.showLoading(false);
         }
     }
 
+    renderHistory() {
+        const feeds = this.historyFeeds;
+        if (!feeds) return;
+
+        // Both tables are paged newest first, so only records newer than the oldest one loaded
+        // from a table with more pages are known to be in order
+        const boundary = Math.max(...[feeds.history, feeds.alerts]
+            .filter(feed => !feed.done && feed.records.length)
+            .map(feed => new Date(feed.records[feed.records.length - 1].timestamp).getTime()));
+
+        let allRecords = [...feeds.history.records, ...feeds.alerts.records]
+            .filter(record => !(new Date(record.timestamp).getTime() < boundary))
+            .sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
+
+        // Cache records for view details
+        this.cachedRecords = allRecords;
+
+        // Apply filters
+        allRecords = this.applyFilters(allRecords);
+
+        this.displayHistoryTable(allRecords);
+        this.updateHistoryStats(allRecords, feeds.totals);
+        this.updateLoadMoreButton(!(feeds.history.done && feeds.alerts.done));
+    }
+
+    updateLoadMoreButton(hasMore) {
+        let button = document.getElementById('loadMoreHistoryBtn');
+        if (!button) {
+            const container = document.querySelector('.history-table-container');
+            if (!container) return;
+            button = document.createElement('button');
+            button.id = 'loadMoreHistoryBtn';
+            button.className = 'btn btn-secondary';
+            button.innerHTML = '<i class="fas fa-chevron-down"></i> Load more';
+            button.style.display = 'none';
+            button.style.margin = '16px auto';
+            button.addEventListener('click', () => this.loadMoreHistory());
+            container.insertAdjacentElement('afterend', button);
+        }
+        button.style.display = hasMore ? 'block' : 'none';
+    }
+
     applyFilters(records) {
         let filteredRecords = [...records];
 
@@ -1429,7 +1531,7 @@ class ThermalVisionApp {
         document.getElementById('alertTypeFilter').value = 'all';
         document.getElementById('positionFilter').value = 'all';
 
-        this.loadHistoryData();
+        this.renderHistory();
         this.showNotification('Filters cleared', 'info');
     }
 
@@ -1509,15 +1611,15 @@ class ThermalVisionApp {
             document.querySelector('.history-filters').appendChild(filterInfo);
         }
 
-        // Simplified display since we don't have total count easily without another fetch
-        // or we could pass total count to this function. 
-        // For now, just show the count of displayed records.
-        filterInfo.textContent = `Showing ${records.length} records`;
+        const totals = this.historyFeeds?.totals;
+        const total = totals ? totals.history + totals.alerts : records.length;
+        filterInfo.textContent = `Showing ${records.length} of ${total} records`;
     }
 
-    updateHistoryStats(records) {
-        document.getElementById('totalAlerts').textContent = records.length;
-        document.getElementById('criticalAlerts').textContent = records.filter(r => r.type === 'critical' || r.isAlert).length;
+    updateHistoryStats(records, totals) {
+        // Totals come from the count endpoints, not from the pages loaded so far
+        document.getElementById('totalAlerts').textContent = totals ? totals.history + totals.alerts : records.length;
+        document.getElementById('criticalAlerts').textContent = totals ? totals.alerts : records.filter(r => r.type === 'critical' || r.isAlert).length;
 
         // Count unique patients
         const uniquePatients = new Set(records.map(r => r.patientId).filter(id => id));
@@ -0,0 +1,249 @@
+"""Capture -> inference -> emit pipeline behind the NDJSON analysis streams.
+
+Capture and inference run on their own threads, connected to the emitter (the
+response generator) by bounded queues, so a slow model call or alert write no
+longer stalls reading from the source. Files are analyzed frame for frame with
+back-pressure; live sources are drained continuously by a LatestFrameReader
+and only the newest frame is analyzed. Each result carries the time from
+capture to prediction.
+"""
+import itertools
+import os
+import queue
+import threading
+import time
+
+from video_io import LatestFrameReader, iter_timed_samples
+
+# Bound of each queue between stages (live sources always keep a single pending frame)
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', 8))
+
+# Seconds of video between analyzed frames
+SAMPLE_INTERVAL = 1.0
+
+_END = object()
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+class StreamPipeline:
+    """Iterate over (timestamp, frame_number, prediction, confidence, latency_ms) for one opened capture.
+
+    paced=True treats a live source as a camera even if it is a local file,
+    reading it at its own frame rate.
+    """
+
+    _ids = itertools.count(1)
+    _active = {}
+    _active_lock = threading.Lock()
+
+    def __init__(self, cap, fps, predict, live=False, source=None, queue_size=PIPELINE_QUEUE_SIZE, paced=False):
+        self.id = next(self._ids)
+        self.cap = cap
+        self.fps = fps
+        self.predict = predict
+        self.live = live
+        self.paced = paced
+        self.source = source
+        self.frames = queue.Queue(maxsize=1 if live else queue_size)
+        self.results = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.started_at = time.time()
+        self.captured = 0
+        self.dropped = 0
+        self.inferred = 0
+        self.emitted = 0
+        self.last_latency_ms = None
+        self._threads = [
+            threading.Thread(target=self._capture_live if live else self._capture, name=f'stream-{self.id}-capture', daemon=True),
+            threading.Thread(target=self._infer, name=f'stream-{self.id}-inference', daemon=True),
+        ]
+
+    def start(self):
+        with self._active_lock:
+            self._active[self.id] = self
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def close(self, timeout=5.0):
+        self.stop_event.set()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join(timeout)
+        with self._active_lock:
+            self._active.pop(self.id, None)
+
+    def __iter__(self):
+        while True:
+            item = self._get(self.results)
+            if item is _END or item is None:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            self.emitted += 1
+            yield item
+
+    # --- queue helpers ---
+
+    def _put(self, q, item):
+        """Blocking put that gives up once the pipeline is stopped"""
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _put_latest(self, q, item):
+        """Non-blocking put that evicts stale frames so the newest one is analyzed next"""
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _get(self, q):
+        while not self.stop_event.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    # --- stages ---
+
+    def _capture(self):
+        try:
+            for timestamp, frame_number, frame in iter_timed_samples(self.cap, self.fps, SAMPLE_INTERVAL):
+                self.captured += 1
+                if not self._put(self.frames, (timestamp, frame_number, frame, time.time())):
+                    break
+        except Exception as e:
+            self._put(self.frames, _Failure(e))
+        finally:
+            self.cap.release()
+            self._put(self.frames, _END)
+
+    def _capture_live(self):
+        # The reader grabs every frame as it arrives; once per interval the newest one is taken
+        reader = LatestFrameReader(self.cap, paced=self.paced)
+        next_sample = time.time()
+        try:
+            while not self.stop_event.is_set():
+                item = reader.read()
+                if item is None:
+                    break
+                frame_number, grabbed_at, msec, frame = item
+                timestamp = msec / 1000.0 if msec > 0 else (frame_number / self.fps)
+                self.captured += 1
+                self._put_latest(self.frames, (timestamp, frame_number, frame, grabbed_at))
+
+                next_sample += SAMPLE_INTERVAL
+                delay = next_sample - time.time()
+                if delay > 0:
+                    self.stop_event.wait(delay)
+                else:
+                    next_sample = time.time()
+        except Exception as e:
+            self._put(self.frames, _Failure(e))
+        finally:
+            reader.release()
+            self._put(self.frames, _END)
+
+    def _infer(self):
+        while True:
+            item = self._get(self.frames)
+            if item is None:
+                return
+            if item is _END or isinstance(item, _Failure):
+                self._put(self.results, item)
+                return
+            timestamp, frame_number, frame, captured_at = item
+            try:
+                prediction, confidence, _ = self.predict(frame)
+            except Exception as e:
+                self._put(self.results, _Failure(e))
+                return
+            self.inferred += 1
+            self.last_latency_ms = round((time.time() - captured_at) * 1000, 1)
+            if not self._put(self.results, (timestamp, frame_number, prediction, confidence, self.last_latency_ms)):
+                return
+
+    def stats(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'live': self.live,
+            'running_seconds': round(time.time() - self.started_at, 1),
+            'capture_queue': self.frames.qsize(),
+            'result_queue': self.results.qsize(),
+            'captured': self.captured,
+            'dropped': self.dropped,
+            'inferred': self.inferred,
+            'emitted': self.emitted,
+            'last_latency_ms': self.last_latency_ms,
+        }
+
+    @classmethod
+    def active_stats(cls):
+        with cls._active_lock:
+            pipelines = list(cls._active.values())
+        return [p.stats() for p in pipelines]
+
+class NoMovementDetector:
+    """Flags a patient who has stayed in the same position for threshold seconds.
+
+    update() returns the stable duration when an alert should fire; a position
+    that stays unchanged re-alerts at most once every threshold seconds.
+    """
+
+    def __init__(self, threshold=5.0):
+        self.threshold = threshold
+        self.previous_position = None
+        self.stable_start_time = 0
+        # Track alerts to avoid duplicates for same event
+        self.last_alert_time = -10
+
+    def update(self, timestamp, prediction):
+        if prediction == self.previous_position:
+            # Position is stable
+            stable_duration = timestamp - self.stable_start_time
+            if stable_duration >= self.threshold and (timestamp - self.last_alert_time) > self.threshold:
+                self.last_alert_time = timestamp
+                return stable_duration
+        else:
+            # Position changed, reset counter
+            self.previous_position = prediction
+            self.stable_start_time = timestamp
+        return None
+
+def frame_event(timestamp, frame_number, prediction, confidence, latency_ms):
+    minutes = int(timestamp // 60)
+    seconds = int(timestamp % 60)
+    return {
+        'type': 'frame',
+        'timestamp': timestamp,
+        'timestamp_formatted': f"{minutes:02}:{seconds:02}",
+        'frame': frame_number,
+        'prediction': prediction,
+        'confidence': confidence,
+        'latency_ms': latency_ms
+    }
+
+def alert_event(alert_id, timestamp, position, duration):
+    return {
+        'type': 'alert',
+        'alert_id': alert_id,
+        'timestamp': timestamp,
+        'position': position,
+        'duration': duration,
+        'message': f'Patient in {position} for {duration:.1f}s'
+    }
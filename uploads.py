@@ -0,0 +1,158 @@
+"""Uploads written to disk once, while the request body is being parsed.
+
+Werkzeug spools large form files to an anonymous temp file, and the video
+endpoints then copied it again with file.save() just to get a path OpenCV can
+open. UploadRequest spools straight to a named file instead, hashing the bytes
+as they arrive, so analysis can open the upload in place and the result cache
+does not have to re-read it. Spooled files are removed at request teardown
+unless a view detaches them.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from flask import Request, request
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+# Uploads smaller than this stay in memory, as with werkzeug's default
+SPOOL_MIN_BYTES = 500 * 1024
+
+# Upper bound on the non-file fields of a form parsed by receive_multipart
+MAX_FORM_MEMORY = 500 * 1024
+
+SAFE_SUFFIX = re.compile(r'^\.[A-Za-z0-9]{1,8}$')
+
+def _suffix(filename):
+    suffix = os.path.splitext(filename or '')[1]
+    return suffix if SAFE_SUFFIX.match(suffix) else ''
+
+class SpooledUpload:
+    """Named temp file that keeps a running SHA-256 of everything written to it"""
+
+    def __init__(self, directory=None, suffix=''):
+        self.file = tempfile.NamedTemporaryFile(dir=directory, suffix=suffix, delete=False)
+        self.name = self.file.name
+        self._sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self._sha256.update(data)
+        return self.file.write(data)
+
+    def hexdigest(self):
+        return self._sha256.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __iter__(self):
+        return iter(self.file)
+
+class UploadRequest(Request):
+    # Turned off only to measure the old copy-after-parse behaviour
+    spool_to_disk = True
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not self.spool_to_disk or (total_content_length is not None and total_content_length < SPOOL_MIN_BYTES):
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        upload = SpooledUpload(suffix=_suffix(filename))
+        self.spooled_uploads.append(upload)
+        return upload
+
+    @property
+    def spooled_uploads(self):
+        if '_spooled_uploads' not in self.__dict__:
+            self.__dict__['_spooled_uploads'] = []
+        return self.__dict__['_spooled_uploads']
+
+def upload_path(file):
+    """Path of an uploaded FileStorage on disk, writing it out only if it was kept in memory"""
+    stream = file.stream
+    if not isinstance(stream, SpooledUpload):
+        stream = SpooledUpload(suffix=_suffix(file.filename))
+        request.spooled_uploads.append(stream)
+        file.save(stream)
+        file.stream = stream
+    stream.flush()
+    return stream.name
+
+def detach_upload(file):
+    """Like upload_path, but the caller becomes responsible for deleting the file.
+
+    Needed for streamed responses, whose generator can outlive request teardown.
+    """
+    path = upload_path(file)
+    request.spooled_uploads.remove(file.stream)
+    file.stream.close()
+    return path
+
+def upload_sha256(file):
+    """SHA-256 of an upload computed while it was spooled, or None"""
+    return file.stream.hexdigest() if isinstance(file.stream, SpooledUpload) else None
+
+def cleanup_uploads(exc=None):
+    """teardown_request hook removing the current request's spooled files"""
+    for upload in getattr(request, 'spooled_uploads', ()):
+        try:
+            upload.close()
+            os.remove(upload.name)
+        except OSError:
+            pass
+
+async def receive_multipart(content_type, chunks):
+    """Parse a multipart/form-data body arriving as an async iterator of bytes.
+
+    The ASGI counterpart of UploadRequest: every file part is spooled to a
+    SpooledUpload as it arrives. Returns (fields, files) where files maps field
+    names to closed SpooledUploads that the caller must delete.
+    """
+    mimetype, options = parse_options_header(content_type or '')
+    boundary = options.get('boundary')
+    if mimetype != 'multipart/form-data' or not boundary:
+        return {}, {}
+
+    decoder = MultipartDecoder(boundary.encode(), max_form_memory_size=MAX_FORM_MEMORY)
+    fields, files = {}, {}
+    part, is_file, field_data = None, False, bytearray()
+
+    def consume():
+        nonlocal part, is_file
+        while True:
+            event = decoder.next_event()
+            if isinstance(event, (NeedData, Epilogue)):
+                return
+            if isinstance(event, File):
+                # Only the first file of each field is kept
+                is_file = True
+                part = None if event.name in files else SpooledUpload(suffix=_suffix(event.filename))
+                if part is not None:
+                    files[event.name] = part
+            elif isinstance(event, Field):
+                is_file = False
+                part = event.name
+                field_data.clear()
+            elif isinstance(event, Data):
+                if is_file:
+                    if part is not None:
+                        part.write(event.data)
+                        if not event.more_data:
+                            part.close()
+                else:
+                    field_data.extend(event.data)
+                    if not event.more_data:
+                        fields.setdefault(part, field_data.decode('utf-8', 'replace'))
+
+    try:
+        async for chunk in chunks:
+            decoder.receive_data(chunk)
+            consume()
+        decoder.receive_data(None)
+        consume()
+    except BaseException:
+        for upload in files.values():
+            upload.close()
+            if os.path.exists(upload.name):
+                os.remove(upload.name)
+        raise
+    return fields, files
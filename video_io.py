@@ -0,0 +1,265 @@
+"""Video decoding helpers shared by the analysis endpoints.
+
+cv2 and numpy are imported by the functions that decode, so importing this module stays cheap.
+"""
+import os
+import threading
+import time
+
+# How skipped frames are passed over when sampling a video:
+#   grab - demux/decode them with cap.grab() but never retrieve or color-convert them
+#   seek - jump straight to each sampled frame (only pays off with short keyframe intervals)
+VIDEO_DECODE_MODE = os.environ.get('VIDEO_DECODE_MODE', 'grab')
+
+def iter_sampled_frames(cap, step, start_frame=0, end_frame=None, mode=VIDEO_DECODE_MODE):
+    """Yield (frame_number, frame) for every step-th frame in [start_frame, end_frame).
+
+    Only the sampled frames are retrieved from the decoder, which is where
+    cap.read() spends most of its time on frames that are thrown away.
+    """
+    import cv2
+    step = max(1, int(step))
+    if mode == 'seek':
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        stop = min(end_frame, total) if end_frame is not None else total
+        for frame_number in range(start_frame, stop, step):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame_number, frame
+        return
+
+    current_frame = start_frame
+    while cap.isOpened() and (end_frame is None or current_frame < end_frame):
+        if (current_frame - start_frame) % step == 0:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield current_frame, frame
+        elif not cap.grab():
+            break
+        current_frame += 1
+
+def iter_timed_samples(cap, fps, interval=1.0):
+    """Yield (timestamp, frame_number, frame) for the first frame at or after every interval seconds of video.
+
+    Timestamps come from the container (CAP_PROP_POS_MSEC), falling back to
+    frame_number / fps for live or buggy streams.
+    """
+    import cv2
+    current_frame = 0
+    next_process_time = 0.0
+    while cap.isOpened():
+        # grab() only; frames that won't be analyzed are never retrieved/color-converted
+        if not cap.grab():
+            break
+        msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+        timestamp = msec / 1000.0 if msec > 0 else (current_frame / fps)
+        if timestamp >= next_process_time:
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            next_process_time += interval
+            yield timestamp, current_frame, frame
+        current_frame += 1
+
+# Worker processes for decoding long uploads in parallel segments (0 or 1 decodes serially)
+VIDEO_DECODE_WORKERS = int(os.environ.get('VIDEO_DECODE_WORKERS', 0))
+# Shorter videos are not worth the cost of shipping work to the pool
+PARALLEL_MIN_SECONDS = float(os.environ.get('PARALLEL_MIN_SECONDS', 60))
+
+_pool = None
+
+def get_decode_pool(workers=VIDEO_DECODE_WORKERS):
+    """Process pool shared by all requests, created on first use.
+
+    Workers are spawned, not forked: a child forked after the model has run
+    inherits torch's OpenMP pool in a broken state and hangs. decode_segment
+    loads its own backend, so nothing is needed from the parent.
+    """
+    global _pool
+    if _pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+def plan_segments(total_frames, step, segments):
+    """Split [0, total_frames) into contiguous [start, end) ranges for parallel decoding.
+
+    Every start is a multiple of step, so each segment samples exactly the frame
+    numbers the serial pass would have sampled from that range.
+    """
+    step = max(1, int(step))
+    samples = -(-total_frames // step)
+    per_segment = max(1, -(-samples // max(1, segments)))
+    return [(start, min(start + per_segment * step, total_frames))
+            for start in range(0, total_frames, per_segment * step)]
+
+def open_at(path, start_frame):
+    """Open a capture positioned at start_frame, falling back to grabbing forward if the seek is inexact"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != start_frame:
+            cap.release()
+            cap = cv2.VideoCapture(path)
+            for _ in range(start_frame):
+                if not cap.grab():
+                    break
+    return cap
+
+def decode_segment(path, start_frame, end_frame, step, backend_name, img_size, channels, chunk_size=32):
+    """Decode and preprocess one segment in a worker process.
+
+    Returns (frame_numbers, NxCxHxW float32 array). Frames are preprocessed
+    chunk by chunk so full-resolution frames never pile up in the worker.
+    """
+    import numpy as np
+    from engine import load_backend
+    backend = load_backend(backend_name)
+    cap = open_at(path, start_frame)
+    frame_numbers, chunks, pending = [], [], []
+    try:
+        for frame_number, frame in iter_sampled_frames(cap, step, start_frame, end_frame, mode='grab'):
+            frame_numbers.append(frame_number)
+            pending.append(frame)
+            if len(pending) == chunk_size:
+                chunks.append(np.asarray(backend.preprocess_frames(pending, img_size, channels)))
+                pending = []
+        if pending:
+            chunks.append(np.asarray(backend.preprocess_frames(pending, img_size, channels)))
+    finally:
+        cap.release()
+    batch = np.concatenate(chunks) if chunks else np.empty((0, channels, img_size, img_size), np.float32)
+    return frame_numbers, batch
+
+def iter_parallel_frames(path, total_frames, step, backend_name, img_size, channels, workers=VIDEO_DECODE_WORKERS):
+    """Yield (frame_number, preprocessed CxHxW array) in frame order, decoding segments across the pool.
+
+    Segments complete out of order but are consumed in order, so downstream
+    batching sees the same sequence as iter_sampled_frames.
+    """
+    pool = get_decode_pool(workers)
+    futures = [pool.submit(decode_segment, path, start, end, step, backend_name, img_size, channels)
+               for start, end in plan_segments(total_frames, step, workers)]
+    try:
+        for future in futures:
+            frame_numbers, batch = future.result()
+            yield from zip(frame_numbers, batch)
+    finally:
+        for future in futures:
+            future.cancel()
+
+class FrameReader:
+    """Random access to the frames of a file that decodes forward whenever it can.
+
+    Requests for ascending frame numbers (e.g. consecutive analysis windows)
+    are served by grabbing ahead from the current position; the capture only
+    seeks when asked for an earlier frame or one more than max_skip frames ahead.
+    """
+
+    def __init__(self, path, max_skip=300):
+        import cv2
+        self.path = path
+        self.max_skip = max_skip
+        self.cap = cv2.VideoCapture(path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.position = 0
+
+    def iter_frames(self, frame_numbers):
+        """Yield (frame_number, frame) for the given frame numbers, in ascending order"""
+        import cv2
+        for frame_number in sorted(frame_numbers):
+            if frame_number < self.position or frame_number - self.position > self.max_skip:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                self.position = frame_number
+            while self.position < frame_number:
+                if not self.cap.grab():
+                    return
+                self.position += 1
+            ret, frame = self.cap.read()
+            if not ret:
+                return
+            self.position += 1
+            yield frame_number, frame
+
+    def release(self):
+        self.cap.release()
+
+class LatestFrameReader:
+    """Keeps a live capture drained on a background thread so reads return the newest frame.
+
+    OpenCV buffers frames that are not grabbed in time, so a reader that falls
+    behind analyzes ever older images. Here every frame is grabbed as it arrives
+    and only frames someone asked for are retrieved (decoded to BGR). All calls
+    on the capture happen on the drain thread.
+
+    paced=True grabs at the source's own frame rate, so a local file can stand
+    in for a camera.
+    """
+
+    def __init__(self, cap, paced=False):
+        import cv2
+        self.cap = cap
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        self.paced = paced and self.fps > 0
+        self.grabbed = 0  # frames grabbed so far
+        self.ended = False
+        self._wanted = False
+        self._latest = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._drain, name='latest-frame-reader', daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        import cv2
+        start = time.time()
+        try:
+            while not self._stop.is_set():
+                if self.paced:
+                    delay = start + self.grabbed / self.fps - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                if not self.cap.grab():
+                    break
+                grabbed_at = time.time()
+                with self._cond:
+                    self.grabbed += 1
+                    if self._wanted:
+                        ret, frame = self.cap.retrieve()
+                        self._latest = (self.grabbed - 1, grabbed_at, self.cap.get(cv2.CAP_PROP_POS_MSEC), frame) if ret else None
+                        self._wanted = False
+                        self._cond.notify_all()
+        finally:
+            with self._cond:
+                self.ended = True
+                self._cond.notify_all()
+            self.cap.release()
+
+    def read(self, timeout=10.0):
+        """Return (frame_number, grabbed_at, msec, frame) for the next frame to arrive.
+
+        Returns None once the source has ended or if no frame arrived within timeout.
+        """
+        with self._cond:
+            if self.ended:
+                return None
+            self._wanted = True
+            if not self._cond.wait_for(lambda: not self._wanted or self.ended, timeout):
+                self._wanted = False
+                return None
+            if self._wanted:
+                return None
+            latest, self._latest = self._latest, None
+            return latest
+
+    def release(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=5.0)
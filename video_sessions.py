@@ -0,0 +1,144 @@
+"""Upload-once video sessions for repeated interval analysis of the same file.
+
+A client uploads a video once and gets back a handle (the SHA-256 of the file).
+Interval queries against the handle reuse one open decoder and a per-frame
+prediction cache, so overlapping or consecutive windows only infer frames no
+earlier query has classified. Session files live on disk so any worker process
+can serve a handle; they are removed once unused for VIDEO_SESSION_TTL seconds.
+"""
+import os
+import re
+import shutil
+import threading
+import time
+
+from result_cache import file_sha256
+from video_io import FrameReader
+
+# Seconds an unused session (and its video file) is kept around
+VIDEO_SESSION_TTL = float(os.environ.get('VIDEO_SESSION_TTL', 3600))
+
+VIDEO_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+class VideoSession:
+    def __init__(self, video_id, path):
+        self.video_id = video_id
+        self.path = path
+        self.reader = FrameReader(path)
+        self.fps = self.reader.fps
+        self.total_frames = self.reader.total_frames
+        self.duration = self.total_frames / self.fps if self.fps > 0 else 0
+        # frame_number -> (label, confidence)
+        self.predictions = {}
+        self.inferred_frames = 0
+        self.lock = threading.Lock()
+
+    def metadata(self):
+        return {
+            'video_id': self.video_id,
+            'duration': self.duration,
+            'fps': self.fps,
+            'total_frames': self.total_frames,
+        }
+
+    def predict_frames(self, frame_numbers, iter_predictions):
+        """Return {frame_number: (label, confidence)}, inferring only frames not seen before.
+
+        iter_predictions maps (frame_number, frame) pairs to (frame_number, result) pairs.
+        Frames past the end of the video are left out.
+        """
+        with self.lock:
+            os.utime(self.path)  # keep the session alive
+            missing = [n for n in frame_numbers if n not in self.predictions]
+            if missing:
+                for frame_number, (label, confidence, _) in iter_predictions(self.reader.iter_frames(missing)):
+                    self.predictions[frame_number] = (label, confidence)
+                    self.inferred_frames += 1
+            return {n: self.predictions[n] for n in frame_numbers if n in self.predictions}
+
+    def close(self):
+        with self.lock:
+            self.reader.release()
+
+class VideoSessionStore:
+    def __init__(self, directory, ttl=VIDEO_SESSION_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _find_file(self, video_id):
+        for name in os.listdir(self.directory):
+            if name.split('.', 1)[0] == video_id:
+                return os.path.join(self.directory, name)
+        return None
+
+    def create(self, upload_path, filename, video_id=None):
+        """Take ownership of an uploaded file and return its session.
+
+        video_id is the SHA-256 of the file if already known. Uploading the same
+        content again returns the existing session and its cache.
+        """
+        self.expire()
+        video_id = video_id or file_sha256(upload_path)
+        with self._lock:
+            session = self._sessions.get(video_id)
+            if session is None:
+                path = self._find_file(video_id)
+                if path is None:
+                    ext = os.path.splitext(filename)[1].lower()
+                    path = os.path.join(self.directory, video_id + ext)
+                    shutil.move(upload_path, path)
+                session = self._sessions[video_id] = VideoSession(video_id, path)
+        os.utime(session.path)
+        return session
+
+    def get(self, video_id):
+        """Session for a handle, reopening it from disk if another process created it"""
+        if not VIDEO_ID_PATTERN.match(video_id or ''):
+            return None
+        with self._lock:
+            session = self._sessions.get(video_id)
+            if session is None or not os.path.exists(session.path):
+                path = self._find_file(video_id)
+                if path is None:
+                    self._sessions.pop(video_id, None)
+                    return None
+                session = self._sessions[video_id] = VideoSession(video_id, path)
+        return session
+
+    def delete(self, video_id):
+        session = self.get(video_id)
+        if session is None:
+            return False
+        with self._lock:
+            self._sessions.pop(video_id, None)
+        session.close()
+        os.remove(session.path)
+        return True
+
+    def expire(self):
+        """Drop sessions whose video has not been used for ttl seconds"""
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                os.remove(path)
+            except OSError:
+                continue
+            with self._lock:
+                session = self._sessions.pop(name.split('.', 1)[0], None)
+            if session is not None:
+                session.close()
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            'open_sessions': len(sessions),
+            'cached_frames': sum(len(s.predictions) for s in sessions),
+            'inferred_frames': sum(s.inferred_frames for s in sessions),
+        }
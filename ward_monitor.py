@@ -0,0 +1,235 @@
+"""Ward monitor: every registered bed camera analyzed continuously inside one process.
+
+Each bed runs a live StreamPipeline supervised by its own thread. All beds
+share the caller's predict function (the app's micro-batching scheduler), so
+frames from different cameras are classified in the same batches. Alerts are
+raised and persisted server-side whether or not anyone is watching, and
+clients subscribe to a bed's event feed instead of owning the capture.
+
+A local video file can stand in for a camera: non-URL sources are read at
+their own frame rate and restarted when they end, like a reconnecting stream.
+"""
+import asyncio
+import queue
+import re
+import threading
+import time
+
+from stream_pipeline import StreamPipeline, NoMovementDetector, frame_event, alert_event
+
+# Seconds to wait before reopening a camera that failed or ended
+MONITOR_RECONNECT_SECONDS = 5.0
+
+# Events buffered per subscriber; a client that falls further behind loses the oldest
+SUBSCRIBER_QUEUE_SIZE = 100
+
+BED_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+def is_url(source):
+    return source.lower().startswith(('rtsp://', 'rtsps://', 'http://', 'https://'))
+
+class AsyncSubscriber:
+    """Subscriber queue owned by an asyncio event loop, fed from the bed's thread"""
+
+    def __init__(self, loop, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put_nowait(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+class BedMonitor:
+    def __init__(self, bed_id, source, patient_id, patient_name, predict, on_alert,
+                 alert_threshold=5.0, reconnect_seconds=MONITOR_RECONNECT_SECONDS):
+        self.bed_id = bed_id
+        self.source = source
+        self.patient_id = patient_id
+        self.patient_name = patient_name
+        self.predict = predict
+        self.on_alert = on_alert
+        self.alert_threshold = alert_threshold
+        self.reconnect_seconds = reconnect_seconds
+        self.status = 'starting'
+        self.last_event = None
+        self.alerts_raised = 0
+        self.pipeline = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'bed-{bed_id}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        pipeline = self.pipeline
+        if pipeline is not None:
+            pipeline.stop_event.set()
+        self._thread.join(timeout)
+        self._publish({'type': 'error', 'message': f'Monitoring of bed {self.bed_id} stopped'})
+
+    # --- subscriptions ---
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def subscribe_async(self, loop):
+        """Subscription for a coroutine: await the returned AsyncSubscriber's get()"""
+        subscriber = AsyncSubscriber(loop)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def _publish(self, event):
+        event = dict(event, bed_id=self.bed_id)
+        with self._lock:
+            self.last_event = event
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            while True:
+                try:
+                    q.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    # --- supervision ---
+
+    def _run(self):
+        import cv2
+        while not self._stop.is_set():
+            cap = cv2.VideoCapture(self.source)
+            if not cap.isOpened():
+                cap.release()
+                self.status = 'disconnected'
+                self._publish({'type': 'error', 'message': f'Could not open source for bed {self.bed_id}'})
+            else:
+                self.status = 'running'
+                try:
+                    self._monitor(cap)
+                except Exception as e:
+                    self._publish({'type': 'error', 'message': str(e)})
+                if self._stop.is_set():
+                    break
+                self.status = 'reconnecting'
+                self._publish({'type': 'error', 'message': f'Stream for bed {self.bed_id} ended, reconnecting'})
+            self._stop.wait(self.reconnect_seconds)
+        self.status = 'stopped'
+
+    def _monitor(self, cap):
+        import cv2
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if fps <= 0 or fps > 1000:
+            fps = 30
+        # Files standing in for cameras are replayed in real time
+        self.pipeline = StreamPipeline(cap, fps, self.predict, live=True, source=self.source,
+                                       paced=not is_url(self.source)).start()
+        detector = NoMovementDetector(self.alert_threshold)
+        start_time = None
+        try:
+            for timestamp, frame_number, prediction, confidence, latency_ms in self.pipeline:
+                if self._stop.is_set():
+                    break
+                # Timestamps relative to when this connection started
+                if start_time is None:
+                    start_time = timestamp
+                timestamp -= start_time
+
+                stable_duration = detector.update(timestamp, prediction)
+                if stable_duration is not None:
+                    alert_id = f"alert_{int(time.time() * 1000)}_{self.bed_id}"
+                    self.on_alert(alert_id, self.patient_id, self.patient_name, prediction, stable_duration)
+                    self.alerts_raised += 1
+                    self._publish(alert_event(alert_id, timestamp, prediction, stable_duration))
+
+                self._publish(frame_event(timestamp, frame_number, prediction, confidence, latency_ms))
+        finally:
+            self.pipeline.close()
+            self.pipeline = None
+
+    def info(self):
+        pipeline = self.pipeline
+        last = self.last_event or {}
+        return {
+            'bed_id': self.bed_id,
+            'source': self.source,
+            'patient_id': self.patient_id,
+            'patient_name': self.patient_name,
+            'status': self.status,
+            'subscribers': len(self._subscribers),
+            'alerts_raised': self.alerts_raised,
+            'last_prediction': last.get('prediction'),
+            'last_latency_ms': last.get('latency_ms'),
+            'pipeline': pipeline.stats() if pipeline is not None else None,
+        }
+
+class WardMonitor:
+    """Registry of bed -> camera monitors sharing one predict function"""
+
+    def __init__(self, predict, on_alert, alert_threshold=5.0, reconnect_seconds=MONITOR_RECONNECT_SECONDS):
+        self.predict = predict
+        self.on_alert = on_alert
+        self.alert_threshold = alert_threshold
+        self.reconnect_seconds = reconnect_seconds
+        self._beds = {}
+        self._lock = threading.Lock()
+
+    def add_bed(self, bed_id, source, patient_id=None, patient_name=None):
+        """Start (or restart with new settings) monitoring of one bed"""
+        if not isinstance(bed_id, str) or not BED_ID_PATTERN.match(bed_id):
+            raise ValueError('bed_id must be 1-64 letters, digits, "-" or "_"')
+        monitor = BedMonitor(bed_id, source, patient_id, patient_name, self.predict, self.on_alert,
+                             self.alert_threshold, self.reconnect_seconds)
+        with self._lock:
+            previous = self._beds.pop(bed_id, None)
+            self._beds[bed_id] = monitor
+        if previous is not None:
+            previous.stop()
+        return monitor.start()
+
+    def remove_bed(self, bed_id):
+        with self._lock:
+            monitor = self._beds.pop(bed_id, None)
+        if monitor is None:
+            return False
+        monitor.stop()
+        return True
+
+    def get(self, bed_id):
+        with self._lock:
+            return self._beds.get(bed_id)
+
+    def beds(self):
+        with self._lock:
+            monitors = list(self._beds.values())
+        return [m.info() for m in monitors]
+
+    def stop(self):
+        with self._lock:
+            monitors = list(self._beds.values())
+            self._beds.clear()
+        for monitor in monitors:
+            monitor.stop()
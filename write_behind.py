@@ -0,0 +1,288 @@
+"""Write-behind persistence of alert and history rows.
+
+Streams, the ward monitor and the alert/history endpoints used to open a
+connection, insert one row and commit before going on, so every alert cost a
+synchronous commit on the frame loop or request thread. Rows are now queued in
+memory and a writer thread inserts them in one transaction per batch, at most
+WRITE_BEHIND_MS after the first row of the batch was queued or as soon as
+WRITE_BEHIND_BATCH rows are waiting.
+
+Queued rows stay visible through pending() until their batch is committed, so
+readers can merge them in (read-your-writes). flush() waits for everything
+queued so far; it runs before anything that updates or deletes these rows and
+at interpreter exit, so a graceful shutdown loses nothing.
+
+put() binds every row's values before queuing it, and can reject a row whose
+key is already queued or stored, so the caller still gets the error a direct
+INSERT would have raised. A batch is retried only while the database is busy
+or locked; a row failing for any other reason is dropped (and logged) without
+holding up the rest.
+"""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Longest a queued row waits before its batch is committed (0 writes every row synchronously)
+WRITE_BEHIND_MS = float(os.environ.get('WRITE_BEHIND_MS', 200))
+
+# Rows that trigger a commit without waiting for WRITE_BEHIND_MS
+WRITE_BEHIND_BATCH = int(os.environ.get('WRITE_BEHIND_BATCH', 100))
+
+# Queue-to-commit latencies kept for stats()
+LATENCY_WINDOW = 1000
+
+# Primary result codes worth retrying a batch for
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+class DuplicateRowError(sqlite3.IntegrityError):
+    """put() of a row whose key is already queued or stored"""
+
+def is_transient(error):
+    """Whether a failed write may succeed if retried (database busy or locked)"""
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (SQLITE_BUSY, SQLITE_LOCKED)
+    return isinstance(error, sqlite3.OperationalError) and 'locked' in str(error)
+
+class PendingRow:
+    def __init__(self, table, row, on_commit):
+        self.table = table
+        self.row = row
+        self.on_commit = on_commit
+        self.queued_at = time.perf_counter()
+
+class WriteBehindQueue:
+    def __init__(self, connect, flush_ms=WRITE_BEHIND_MS, max_batch=WRITE_BEHIND_BATCH):
+        self.connect = connect
+        self.flush_seconds = flush_ms / 1000
+        self.max_batch = max_batch
+        self.queued = 0
+        self.committed = 0
+        self.failed = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._pending = []
+        self._inflight = []
+        self._cond = threading.Condition()
+        self._binder = sqlite3.connect(':memory:', check_same_thread=False)
+        self._flush_requested = False
+        self._writing = False
+        self._closed = False
+        self._writer = None
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self._reset)
+
+    def put(self, table, row, on_commit=None, key=None):
+        """Queue row (column -> value) for insertion into table; on_commit(rows) runs once it is committed.
+
+        on_commit is called once per batch, with every committed row of the batch
+        that was queued with it.
+
+        Raises the sqlite3 error binding the row would (e.g. an unsupported value
+        type) and, if key names a column, DuplicateRowError when a row with the
+        same key is already queued or stored.
+        """
+        item = PendingRow(table, row, on_commit)
+        while True:
+            with self._cond:
+                self._binder.execute(f"SELECT {', '.join('?' for _ in row)}", tuple(row.values()))
+                generation = self.batches
+            # The table is read without holding the lock, so producers don't queue up behind the disk
+            stored = key is not None and self._stored(table, key, row[key])
+            with self._cond:
+                if self.batches != generation:
+                    # A batch was committed meanwhile: it may have left the queue after the table was read
+                    continue
+                if stored or (key is not None and self._queued(table, key, row[key])):
+                    raise DuplicateRowError(f"{table} row with {key} {row[key]!r} already exists")
+                self.queued += 1
+                if self.flush_seconds > 0 and not self._closed:
+                    self._pending.append(item)
+                    self._start_writer()
+                    self._cond.notify_all()
+                    return
+                break
+        self._write([item])
+
+    def pending(self, table):
+        """Rows of table queued but not committed yet"""
+        with self._cond:
+            return [dict(item.row) for item in self._inflight + self._pending if item.table == table]
+
+    def _queued(self, table, key, value):
+        # Caller holds the lock; rows of the batch being written count until it is committed
+        return any(item.table == table and item.row.get(key) == value for item in self._inflight + self._pending)
+
+    def _stored(self, table, key, value):
+        conn = self.connect()
+        try:
+            return conn.execute(f"SELECT 1 FROM {table} WHERE {key} = ?", (value,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def flush(self, timeout=10.0):
+        """Commit everything queued so far; returns False if that took longer than timeout"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._pending or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._writer is None:
+                    break
+                self._cond.wait(remaining)
+            if self._writer is not None or not self._pending:
+                return not self._pending and not self._writing
+            batch, self._pending = self._pending, []
+        # No writer thread (closed or never started): write in the caller
+        self._write(batch)
+        return True
+
+    def close(self):
+        """Write out everything queued and stop the writer; later rows are written synchronously"""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        writer = self._writer
+        if writer is not None and writer is not threading.current_thread():
+            writer.join(5)
+
+    def _start_writer(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._writer.start()
+
+    def _run(self):
+        try:
+            self._loop()
+        finally:
+            # Whatever stopped this thread, let the next put() start a new one
+            with self._cond:
+                if self._writer is threading.current_thread():
+                    self._writer = None
+                self._cond.notify_all()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._flush_requested = False
+                    self._cond.wait()
+                if not self._pending:
+                    self._writer = None
+                    self._cond.notify_all()
+                    return
+                # Give the batch until flush_seconds after its first row to fill up
+                deadline = self._pending[0].queued_at + self.flush_seconds
+                while (len(self._pending) < self.max_batch and not self._flush_requested
+                       and not self._closed and time.perf_counter() < deadline):
+                    self._cond.wait(deadline - time.perf_counter())
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+                self._inflight = batch
+                self._writing = True
+            try:
+                self._write(batch)
+            except sqlite3.Error as e:
+                # Still busy or locked after the busy timeout: keep the rows and try again
+                print(f"Error saving {len(batch)} queued rows, retrying: {e}")
+                with self._cond:
+                    self._pending[:0] = batch
+                time.sleep(max(self.flush_seconds, 0.1))
+            except Exception as e:
+                # Not worth retrying (it would fail the same way): drop the batch, keep the writer running
+                print(f"Error saving {len(batch)} queued rows, dropping them: {e}")
+                with self._cond:
+                    self.failed += len(batch)
+            finally:
+                with self._cond:
+                    self._inflight = []
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def _write(self, batch):
+        committed = self._insert(batch)
+        now = time.perf_counter()
+        with self._cond:
+            self.batches += 1
+            self.committed += len(committed)
+            self.failed += len(batch) - len(committed)
+            self.latencies.extend(now - item.queued_at for item in committed)
+        callbacks = {}
+        for item in committed:
+            if item.on_commit is not None:
+                callbacks.setdefault(item.on_commit, []).append(item.row)
+        for on_commit, rows in callbacks.items():
+            try:
+                on_commit(rows)
+            except Exception as e:
+                print(f"Error after saving {len(rows)} queued rows: {e}")
+
+    def _insert(self, batch):
+        """Insert batch in one transaction; returns the rows committed.
+
+        Raises only errors worth retrying the whole batch for (see is_transient).
+        """
+        groups = {}
+        for item in batch:
+            groups.setdefault((item.table, tuple(item.row)), []).append(item)
+        conn = self.connect()
+        try:
+            try:
+                for (table, columns), items in groups.items():
+                    conn.executemany(self._statement(table, columns), [tuple(item.row.values()) for item in items])
+                conn.commit()
+                return batch
+            except Exception as e:
+                conn.rollback()
+                if is_transient(e):
+                    raise
+            # One bad row (a duplicate id, a value that can't be stored) must not lose the rest of the batch
+            committed = []
+            for item in batch:
+                try:
+                    conn.execute(self._statement(item.table, tuple(item.row)), tuple(item.row.values()))
+                    committed.append(item)
+                except Exception as e:
+                    if is_transient(e):
+                        raise
+                    print(f"Error saving {item.table} row {item.row.get('id')}, dropping it: {e}")
+            conn.commit()
+            return committed
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _statement(table, columns):
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+    def _reset(self):
+        # A forked child starts with an empty queue and its own writer thread
+        self._pending = []
+        self._inflight = []
+        self._cond = threading.Condition()
+        self._binder = sqlite3.connect(':memory:', check_same_thread=False)
+        self._writer = None
+        self._writing = False
+
+    def stats(self):
+        with self._cond:
+            latencies = sorted(self.latencies)
+            queued_now = len(self._pending)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+
+        return {
+            'pending': queued_now,
+            'queued': self.queued,
+            'committed': self.committed,
+            'failed': self.failed,
+            'batches': self.batches,
+            'avg_batch_size': round(self.committed / self.batches, 1) if self.batches else 0,
+            'flush_latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'max': percentile(1.0)},
+        }